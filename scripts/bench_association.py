@@ -0,0 +1,83 @@
+"""
+scripts/bench_association.py
+============================
+Benchmark frequent itemset mining: mlxtend (apriori / fpgrowth) vs Eclat nội bộ
+trên basket tổng hợp với số đơn tăng dần.
+
+Ví dụ:
+  python scripts/bench_association.py --orders 1000 10000 100000 --items 500
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.features.basket import SparseBasket
+from src.mining.association import find_frequent_itemsets
+
+
+def synthetic_basket(n_orders: int, n_items: int, avg_len: float, seed: int) -> SparseBasket:
+    """Basket ngẫu nhiên: độ dài đơn ~ Poisson, độ phổ biến item ~ Zipf."""
+    rng = np.random.default_rng(seed)
+    lengths = np.maximum(rng.poisson(avg_len, size=n_orders), 1)
+    popularity = 1.0 / np.arange(1, n_items + 1) ** 1.1
+    popularity /= popularity.sum()
+    rows = np.repeat(np.arange(n_orders), lengths)
+    cols = rng.choice(n_items, size=len(rows), p=popularity)
+    mat = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=bool), (rows, cols)), shape=(n_orders, n_items)
+    )
+    mat.sum_duplicates()
+    orders = pd.Index([f"O-{i}" for i in range(n_orders)], name="Order ID")
+    items = pd.Index([f"item_{j}" for j in range(n_items)], name="item")
+    return SparseBasket(mat.astype(bool), orders, items)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--orders", type=int, nargs="+", default=[1_000, 10_000, 50_000, 100_000])
+    parser.add_argument("--items", type=int, default=500)
+    parser.add_argument("--avg-len", type=float, default=4.0)
+    parser.add_argument("--min-support", type=float, default=0.001)
+    parser.add_argument("--algorithms", nargs="+", default=["fpgrowth", "eclat"])
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    records = []
+    for n_orders in args.orders:
+        basket = synthetic_basket(n_orders, args.items, args.avg_len, args.seed)
+        reference = None
+        for algo in args.algorithms:
+            start = time.perf_counter()
+            freq = find_frequent_itemsets(basket, min_support=args.min_support, algorithm=algo)
+            elapsed = time.perf_counter() - start
+
+            found = dict(zip(freq["itemsets"], freq["support"]))
+            if reference is None:
+                reference = found
+            match = found.keys() == reference.keys() and all(
+                np.isclose(found[k], reference[k]) for k in found
+            )
+            records.append({
+                "n_orders": n_orders,
+                "algorithm": algo,
+                "n_itemsets": len(freq),
+                "seconds": round(elapsed, 4),
+                "match_first": match,
+            })
+            print(f"[BENCH] orders={n_orders:>9,} {algo:<9} itemsets={len(freq):>7} {elapsed:8.3f}s")
+
+    print()
+    print(pd.DataFrame(records).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+"""
+scripts/bench_basket.py
+=======================
+Đo RAM đỉnh (peak RSS) khi dựng basket: build_basket_chunked (theo khối, trần
+streaming.max_memory_mb) so với nạp cả CSV + build_basket_sparse, trên CSV
+giao dịch tổng hợp với số dòng tăng dần. Mỗi lần đo chạy trong một process
+riêng nên RSS đỉnh không lẫn giữa các lần.
+
+  python scripts/bench_basket.py --sizes 100000 1000000 5000000 --max-memory-mb 64
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.features.basket import build_basket_chunked, build_basket_sparse
+from src.utils.memory import peak_rss_mb
+
+
+def write_synthetic_csv(path: str, n_rows: int, n_items: int = 2000, seed: int = 42) -> None:
+    """~4 dòng / đơn, item ~ Zipf; ghi theo khối để không giữ cả file trong RAM."""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_items + 1) ** 1.1
+    popularity /= popularity.sum()
+    block = 500_000
+    for start in range(0, n_rows, block):
+        n = min(block, n_rows - start)
+        rows = np.arange(start, start + n)
+        pd.DataFrame({
+            "Order ID": [f"O-{i}" for i in rows // 4],
+            "Product Name": [f"Product {j}" for j in rng.choice(n_items, size=n, p=popularity)],
+            "Sales": rng.gamma(2.0, 50.0, size=n).round(2),
+        }).to_csv(path, mode="a", header=start == 0, index=False)
+
+
+def _run(mode: str, csv_path: str, out_dir: str, max_memory_mb: float, queue) -> None:
+    """Worker: dựng basket một lần, gửi (giây, RSS đỉnh MB) về process cha."""
+    start = time.perf_counter()
+    if mode == "chunked":
+        build_basket_chunked(csv_path, out_dir, max_memory_mb=max_memory_mb)
+    else:
+        build_basket_sparse(pd.read_csv(csv_path))
+    queue.put((time.perf_counter() - start, peak_rss_mb()))
+
+
+def measure(mode: str, csv_path: str, out_dir: str, max_memory_mb: float) -> tuple:
+    ctx = mp.get_context("spawn")
+    queue = ctx.Queue()
+    proc = ctx.Process(target=_run, args=(mode, csv_path, out_dir, max_memory_mb, queue))
+    proc.start()
+    result = queue.get()
+    proc.join()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000, 1_000_000, 3_000_000])
+    parser.add_argument("--max-memory-mb", type=float, default=64)
+    parser.add_argument("--in-memory-max", type=int, default=3_000_000,
+                        help="chỉ chạy bản nạp cả CSV tới cỡ này")
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_basket_")
+    try:
+        print(f"{'rows':>12} {'csv MB':>8} {'chunked':>9} {'RSS MB':>8} {'in-memory':>10} {'RSS MB':>8}")
+        for n_rows in args.sizes:
+            csv_path = os.path.join(tmp, f"orders_{n_rows}.csv")
+            write_synthetic_csv(csv_path, n_rows)
+            size_mb = os.path.getsize(csv_path) / 1024 ** 2
+
+            t_chunk, rss_chunk = measure("chunked", csv_path, os.path.join(tmp, "shards"), args.max_memory_mb)
+            t_mem, rss_mem = "-", "-"
+            if n_rows <= args.in_memory_max:
+                seconds, rss = measure("in-memory", csv_path, "", args.max_memory_mb)
+                t_mem, rss_mem = f"{seconds:.2f}s", f"{rss:.0f}"
+
+            print(f"{n_rows:>12,} {size_mb:>8.0f} {t_chunk:>8.2f}s {rss_chunk:>8.0f} {t_mem:>10} {rss_mem:>8}")
+            os.remove(csv_path)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""
+scripts/bench_recommender.py
+============================
+Benchmark độ trễ / thông lượng của RuleIndex.recommend (trong process) và
+của HTTP server (make_server) trên rule tổng hợp.
+
+  python scripts/bench_recommender.py --items 20000 --rules 200000
+"""
+
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.request import urlopen
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.mining.recommender import RuleIndex, make_server
+
+
+def synthetic_rules(n_items: int, n_rules: int, seed: int) -> pd.DataFrame:
+    """Rules ngẫu nhiên: antecedent 1–3 item, consequent 1 item (Zipf)."""
+    rng = np.random.default_rng(seed)
+    popularity = 1.0 / np.arange(1, n_items + 1)
+    popularity /= popularity.sum()
+    names = np.asarray([f"item_{i}" for i in range(n_items)], dtype=object)
+    sizes = rng.integers(1, 4, size=n_rules)
+    draws = rng.choice(n_items, size=(n_rules, 4), p=popularity)
+    ante, cons = [], []
+    for size, row in zip(sizes, draws):
+        ante.append(frozenset(names[row[:size]]))
+        cons.append(frozenset([names[row[3]]]) - ante[-1] or frozenset([names[(row[3] + 1) % n_items]]))
+    return pd.DataFrame({
+        "antecedents": ante,
+        "consequents": cons,
+        "lift": rng.uniform(1.0, 5.0, size=n_rules),
+        "confidence": rng.uniform(0.1, 1.0, size=n_rules),
+    })
+
+
+def _percentiles(samples_ms: list) -> str:
+    p50, p99 = np.percentile(samples_ms, [50, 99])
+    return f"p50={p50:.4f}ms p99={p99:.4f}ms"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--items", type=int, default=20_000)
+    parser.add_argument("--rules", type=int, default=200_000)
+    parser.add_argument("--queries", type=int, default=20_000)
+    parser.add_argument("--cart-size", type=int, default=5)
+    parser.add_argument("--http-requests", type=int, default=2_000)
+    parser.add_argument("--http-threads", type=int, default=8)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rules = synthetic_rules(args.items, args.rules, args.seed)
+    start = time.perf_counter()
+    index = RuleIndex(rules)
+    print(f"[BENCH] build index: {len(index)} rules in {time.perf_counter() - start:.2f}s")
+
+    rng = np.random.default_rng(args.seed + 1)
+    popularity = 1.0 / np.arange(1, args.items + 1)
+    popularity /= popularity.sum()
+    carts = [
+        [f"item_{i}" for i in rng.choice(args.items, size=args.cart_size, p=popularity)]
+        for _ in range(args.queries)
+    ]
+
+    # ── in-process ──────────────────────────────────────────────────
+    latencies = []
+    start = time.perf_counter()
+    for cart in carts:
+        t0 = time.perf_counter()
+        index.recommend(cart, k=5)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    elapsed = time.perf_counter() - start
+    print(f"[BENCH] recommend(): {args.queries / elapsed:,.0f} req/s, {_percentiles(latencies)}")
+
+    # ── HTTP ───────────────────────────────────────────────────────
+    server = make_server(index, port=0)
+    port = server.server_address[1]
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    def _call(cart):
+        t0 = time.perf_counter()
+        query = "&".join(f"item={c}" for c in cart)
+        with urlopen(f"http://127.0.0.1:{port}/recommend?{query}&k=5") as resp:
+            json.loads(resp.read())
+        return (time.perf_counter() - t0) * 1000
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.http_threads) as pool:
+        http_latencies = list(pool.map(_call, carts[:args.http_requests]))
+    elapsed = time.perf_counter() - start
+    print(f"[BENCH] HTTP ({args.http_threads} threads): {len(http_latencies) / elapsed:,.0f} req/s, "
+          f"{_percentiles(http_latencies)}")
+
+    server.shutdown()
+    server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+scripts/bench_rfm.py
+====================
+Benchmark build_rfm (vectorized) so với bản groupby + lambda cũ trên dữ liệu
+giao dịch tổng hợp, từ 10k tới 50M dòng.
+
+  python scripts/bench_rfm.py --sizes 10000 100000 1000000 10000000 50000000
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.features.rfm import build_rfm
+
+
+def legacy_build_rfm(df: pd.DataFrame) -> pd.DataFrame:
+    """Bản gốc: copy frame, parse lại ngày, lambda theo từng khách hàng."""
+    df = df.copy()
+    df["Order Date"] = pd.to_datetime(df["Order Date"], dayfirst=True, errors="coerce")
+    df = df.dropna(subset=["Order Date"])
+    snapshot_date = df["Order Date"].max() + pd.Timedelta(days=1)
+    rfm = (
+        df.groupby("Customer ID", observed=True)
+        .agg({
+            "Order Date": lambda x: (snapshot_date - x.max()).days,
+            "Order ID": "nunique",
+            "Sales": "sum",
+        })
+        .reset_index()
+    )
+    rfm.columns = ["Customer ID", "Recency", "Frequency", "Monetary"]
+    return rfm
+
+
+def synthetic_orders(n_rows: int, seed: int = 42) -> pd.DataFrame:
+    """~5 dòng / đơn, ~10 đơn / khách hàng, ngày trong 4 năm."""
+    rng = np.random.default_rng(seed)
+    n_orders = max(n_rows // 5, 1)
+    n_customers = max(n_orders // 10, 1)
+    order = rng.integers(0, n_orders, size=n_rows)
+    customer_of_order = rng.integers(0, n_customers, size=n_orders)
+    day_of_order = rng.integers(0, 4 * 365, size=n_orders)
+    return pd.DataFrame({
+        "Customer ID": pd.Categorical.from_codes(customer_of_order[order] % n_customers,
+                                                 [f"C{i:08d}" for i in range(n_customers)]),
+        "Order ID": order,
+        "Order Date": np.datetime64("2015-01-01") + day_of_order[order].astype("timedelta64[D]"),
+        "Sales": rng.gamma(2.0, 50.0, size=n_rows),
+    })
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000, 10_000_000])
+    parser.add_argument("--legacy-max", type=int, default=1_000_000,
+                        help="chỉ chạy bản cũ tới cỡ này (lambda theo nhóm rất chậm)")
+    parser.add_argument("--windows", type=int, nargs="*", default=[90, 180, 365])
+    args = parser.parse_args()
+
+    print(f"{'rows':>12} {'customers':>10} {'vectorized':>11} {'+windows':>9} {'legacy':>9} {'speedup':>8}")
+    for n_rows in args.sizes:
+        df = synthetic_orders(n_rows)
+
+        start = time.perf_counter()
+        rfm = build_rfm(df)
+        t_new = time.perf_counter() - start
+
+        start = time.perf_counter()
+        build_rfm(df, windows=args.windows)
+        t_win = time.perf_counter() - start
+
+        t_old, speedup = "-", ""
+        if n_rows <= args.legacy_max:
+            start = time.perf_counter()
+            expected = legacy_build_rfm(df)
+            elapsed_old = time.perf_counter() - start
+            pd.testing.assert_frame_equal(
+                rfm.astype({"Customer ID": str}),
+                expected.astype({"Customer ID": str}),
+                check_dtype=False,
+            )
+            t_old = f"{elapsed_old:.2f}s"
+            speedup = f"{elapsed_old / t_new:.1f}x"
+
+        print(f"{n_rows:>12,} {len(rfm):>10,} {t_new:>10.2f}s {t_win:>8.2f}s {t_old:>9} {speedup:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+scripts/ingest_csv.py
+=====================
+Chuyển raw CSV dung lượng lớn thẳng sang parquet gọn (ngày → timestamp, cột
+chuỗi lặp nhiều → dictionary) theo khối, không dựng DataFrame pandas.
+
+  python scripts/ingest_csv.py                       # paths.raw_data → data/processed/raw.parquet
+  python scripts/ingest_csv.py --csv big.csv --out data/processed/big.parquet
+
+Sau đó đặt paths.raw_data trỏ tới file parquet để run_pipeline.py đọc trực tiếp.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils.config import load_config
+from src.data.loader import csv_to_parquet
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CSV → parquet ingestion")
+    parser.add_argument("--csv", help="file CSV nguồn (mặc định paths.raw_data)")
+    parser.add_argument("--out", help="file parquet đích (mặc định <processed_dir>/raw.parquet)")
+    args = parser.parse_args()
+
+    cfg = load_config(os.path.join(ROOT, "configs", "params.yaml"))
+    ingest_cfg = cfg.get("ingest", {})
+    clean_cfg = cfg.get("cleaning", {})
+    schema_cfg = cfg.get("schema", {})
+
+    csv_path = args.csv or os.path.join(ROOT, cfg["paths"]["raw_data"])
+    out_path = args.out or os.path.join(ROOT, cfg["paths"]["processed_dir"], "raw.parquet")
+    os.makedirs(os.path.dirname(out_path), exist_ok=True)
+
+    start = time.perf_counter()
+    info = csv_to_parquet(
+        csv_path,
+        out_path,
+        date_cols=clean_cfg.get("date_cols", ["Order Date", "Ship Date"]),
+        date_format=clean_cfg.get("date_format", "%d/%m/%Y"),
+        categorical=schema_cfg.get("categorical"),
+        block_size_mb=ingest_cfg.get("block_size_mb", 16),
+        row_group_size=schema_cfg.get("row_group_size", 100_000),
+    )
+    elapsed = time.perf_counter() - start
+    size_in = os.path.getsize(csv_path) / 1024 ** 2
+    size_out = os.path.getsize(out_path) / 1024 ** 2
+    print(f"[INFO] {info['n_rows']} dòng, {info['n_batches']} khối trong {elapsed:.2f}s "
+          f"({size_in / max(elapsed, 1e-9):.1f} MB/s)")
+    print(f"[SAVED] {out_path} ({size_in:.1f} MB CSV → {size_out:.1f} MB parquet)")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,6 +7,7 @@ Output:
   - outputs/tables/top_rules.csv
   - outputs/figures/top_products.png
   - outputs/figures/rules_support_confidence.png
+  - outputs/models/rule_index.pkl   (cho scripts/serve_recommender.py)
 """
 
 import os
@@ -17,25 +18,29 @@ import matplotlib
 matplotlib.use("Agg")  # non-interactive backend
 import matplotlib.pyplot as plt
 import seaborn as sns
-import pandas as pd
 
 # ── đảm bảo import src từ project root ──
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, ROOT)
 
 from src.utils.config import load_config
-from src.features.basket import build_basket_matrix, build_basket_subcategory
+from src.data.loader import load_processed
+from src.features.basket import build_basket_sparse
 from src.mining.association import (
     basket_summary,
     top_products,
     find_frequent_itemsets,
     generate_rules,
-    filter_top_rules,
     rules_to_csv_friendly,
+    top_k_rules,
 )
+from src.mining.recommender import RuleIndex
 
 warnings.filterwarnings("ignore")
 
+# cột cleaned.parquet mà stage này cần (loader chỉ đọc đúng các cột này)
+REQUIRED_COLUMNS = ["Order ID", "Product Name", "Sub-Category", "Sales"]
+
 
 def main():
     # ── 1. Load config ──────────────────────────────────────────────
@@ -44,15 +49,22 @@ def main():
     min_support = assoc_cfg.get("min_support", 0.02)
     min_confidence = assoc_cfg.get("min_confidence", 0.4)
     min_lift = assoc_cfg.get("min_lift", 1.1)
+    algorithm = assoc_cfg.get("algorithm", "fpgrowth")
+    n_jobs = assoc_cfg.get("n_jobs", 1)
+    n_partitions = assoc_cfg.get("n_partitions")
+    top_k = assoc_cfg.get("top_k")
+    top_k_metric = assoc_cfg.get("top_k_metric", "lift")
+    top_k_min_count = assoc_cfg.get("top_k_min_count", 2)
 
     # ── 2. Load cleaned data ────────────────────────────────────────
     processed_dir = os.path.join(ROOT, cfg["paths"]["processed_dir"])
     cleaned_path = os.path.join(processed_dir, "cleaned.parquet")
-    df = pd.read_parquet(cleaned_path)
+    df = load_processed(cleaned_path, columns=REQUIRED_COLUMNS, **cfg.get("loading", {}))
     print(f"[INFO] Đã tải dữ liệu đã làm sạch: {df.shape}")
 
     # ── 3. Build basket matrix (Product Name for top products) ─────
-    basket_product = build_basket_matrix(df, item_col="Product Name")
+    # CSR sparse: bộ nhớ tỉ lệ với số cặp (đơn, sản phẩm), không phải #đơn × #sản phẩm
+    basket_product = build_basket_sparse(df, item_col="Product Name")
     summary_product = basket_summary(basket_product)
     print(f"[INFO] Cấp sản phẩm: Đơn={summary_product['n_orders']}, "
           f"Sản phẩm={summary_product['n_products']}, Tỷ lệ rỗng={summary_product['sparsity']}")
@@ -62,28 +74,49 @@ def main():
     print(f"[INFO] Đã tính 20 sản phẩm hàng đầu")
 
     # ── 5. Build basket by Sub-Category (for association rules) ────
-    basket = build_basket_subcategory(df)
+    basket = build_basket_sparse(df, item_col="Sub-Category")
     summary = basket_summary(basket)
     print(f"[INFO] Cấp phân loại phụ: Đơn={summary['n_orders']}, "
           f"Phân loại phụ={summary['n_products']}, Tỷ lệ rỗng={summary['sparsity']}")
 
-    # ── 6. Frequent itemsets (FP-Growth) ────────────────────────────
-    freq = find_frequent_itemsets(basket, min_support=min_support, algorithm="fpgrowth")
-    print(f"[INFO] Số bộ mục thường xuyên: {len(freq)}")
-
-    # ── 7. Rules ────────────────────────────────────────────────────
-    rules = generate_rules(freq, min_confidence=min_confidence, min_lift=1.0)
-    print(f"[INFO] Tổng số luật: {len(rules)}")
+    if top_k:
+        # ── 6–7. Top-K rules: cắt nhánh theo cận trên của metric ─────
+        top_rules = top_k_rules(
+            basket,
+            k=top_k,
+            metric=top_k_metric,
+            min_confidence=min_confidence,
+            min_lift=min_lift,
+            min_count=top_k_min_count,
+        )
+        print(f"[INFO] Top-{top_k} luật theo {top_k_metric}: {len(top_rules)}")
+        serving_rules = top_rules
+    else:
+        # ── 6. Frequent itemsets (FP-Growth / Apriori / Eclat) ──────
+        freq = find_frequent_itemsets(
+            basket,
+            min_support=min_support,
+            algorithm=algorithm,
+            n_jobs=n_jobs,
+            n_partitions=n_partitions,
+        )
+        print(f"[INFO] Số bộ mục thường xuyên: {len(freq)}")
 
-    top_rules = filter_top_rules(rules, min_lift=min_lift, top_n=30)
-    print(f"[INFO] Luật hàng đầu (lift >= {min_lift}): {len(top_rules)}")
+        # ── 7. Rules ────────────────────────────────────────────────
+        # service gợi ý cần mọi luật đạt ngưỡng; generate_rules đã sort theo lift
+        # giảm dần nên top-30 là 30 dòng đầu
+        serving_rules = generate_rules(freq, min_confidence=min_confidence, min_lift=min_lift)
+        top_rules = serving_rules.head(30).reset_index(drop=True)
+        print(f"[INFO] Luật hàng đầu (lift >= {min_lift}): {len(top_rules)}")
 
     # ── 8. Tạo thư mục output ──────────────────────────────────────
     output_dir = os.path.join(ROOT, cfg["paths"].get("output_dir", "outputs"))
     tables_dir = os.path.join(output_dir, "tables")
     figures_dir = os.path.join(output_dir, "figures")
+    models_dir = os.path.join(output_dir, "models")
     os.makedirs(tables_dir, exist_ok=True)
     os.makedirs(figures_dir, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
 
     # ── 8. Export CSV ───────────────────────────────────────────────
     df_top.to_csv(os.path.join(tables_dir, "top_products.csv"), index=False)
@@ -93,6 +126,9 @@ def main():
     top_rules_csv.to_csv(os.path.join(tables_dir, "top_rules.csv"), index=False)
     print(f"[SAVED] {tables_dir}/top_rules.csv")
 
+    RuleIndex(serving_rules).save(os.path.join(models_dir, "rule_index.pkl"))
+    print(f"[SAVED] {models_dir}/rule_index.pkl ({len(serving_rules)} luật)")
+
     # ── 9. Figures ──────────────────────────────────────────────────
     # 9a. Top products bar chart
     fig1, ax1 = plt.subplots(figsize=(12, 6))
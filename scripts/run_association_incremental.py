@@ -0,0 +1,103 @@
+"""
+scripts/run_association_incremental.py
+======================================
+Cập nhật Association Rules theo kiểu FUP với các đơn hàng mới.
+
+  # lần đầu (hoặc khi đổi min_support): dựng kho count từ cleaned.parquet
+  python scripts/run_association_incremental.py --rebuild
+
+  # hằng ngày: chỉ xử lý delta
+  python scripts/run_association_incremental.py --delta data/raw/new_orders.csv
+
+Output:
+  - outputs/tables/top_rules.csv
+  - outputs/models/rule_index.pkl   (cho scripts/serve_recommender.py)
+"""
+
+import argparse
+import os
+import sys
+import time
+import warnings
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils.config import load_config
+from src.data.loader import load_processed
+from src.features.basket import build_basket_sparse
+from src.mining.association import generate_rules, rules_to_csv_friendly
+from src.mining.incremental import ItemsetCountStore
+from src.mining.recommender import RuleIndex
+
+warnings.filterwarnings("ignore")
+
+
+def _read_orders(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental association rules (FUP)")
+    parser.add_argument("--delta", help="CSV/parquet chứa các đơn hàng mới")
+    parser.add_argument("--rebuild", action="store_true", help="Dựng lại kho từ cleaned.parquet")
+    args = parser.parse_args()
+
+    # ── 1. Load config ──────────────────────────────────────────────
+    cfg = load_config(os.path.join(ROOT, "configs", "params.yaml"))
+    assoc_cfg = cfg.get("association", {})
+    inc_cfg = assoc_cfg.get("incremental", {})
+    min_support = assoc_cfg.get("min_support", 0.02)
+    min_confidence = assoc_cfg.get("min_confidence", 0.4)
+    min_lift = assoc_cfg.get("min_lift", 1.1)
+    item_col = inc_cfg.get("item_col", "Sub-Category")
+    store_dir = os.path.join(ROOT, inc_cfg.get("store_dir", "data/processed/assoc_store"))
+
+    # ── 2. Mở kho count (dựng lại nếu cần) ─────────────────────────
+    store = ItemsetCountStore.load(store_dir) if ItemsetCountStore.exists(store_dir) else None
+    if store is not None and (store.min_support != min_support or store.item_col != item_col):
+        print("[WARN] min_support/item_col trong config khác kho đã lưu → dựng lại")
+        store = None
+
+    start = time.perf_counter()
+    if store is None or args.rebuild:
+        cleaned_path = os.path.join(ROOT, cfg["paths"]["processed_dir"], "cleaned.parquet")
+        store = ItemsetCountStore(store_dir, min_support, item_col)
+        df = load_processed(cleaned_path, columns=["Order ID", item_col, "Sales"])
+        info = store.initialize(build_basket_sparse(df, item_col=item_col))
+        print(f"[INFO] Đã dựng kho count: {info}")
+    elif args.delta:
+        info = store.update(build_basket_sparse(_read_orders(args.delta), item_col=item_col))
+        print(f"[INFO] Đã cập nhật FUP: {info}")
+    else:
+        print("[INFO] Không có --delta; sinh lại rules từ kho hiện tại")
+    print(f"[INFO] Thời gian cập nhật kho: {time.perf_counter() - start:.2f}s")
+
+    # ── 3. Rules từ count đã làm mới ───────────────────────────────
+    freq = store.frequent_itemsets()
+    print(f"[INFO] Số bộ mục thường xuyên: {len(freq)} / {store.n_transactions} đơn")
+
+    # như run_association.py: service gợi ý dùng mọi luật đạt ngưỡng, CSV lấy top-30
+    serving_rules = generate_rules(freq, min_confidence=min_confidence, min_lift=min_lift)
+    top_rules = serving_rules.head(30).reset_index(drop=True)
+    print(f"[INFO] Luật hàng đầu (lift >= {min_lift}): {len(top_rules)}")
+
+    # ── 4. Export CSV + index gợi ý ────────────────────────────────
+    output_dir = os.path.join(ROOT, cfg["paths"].get("output_dir", "outputs"))
+    tables_dir = os.path.join(output_dir, "tables")
+    models_dir = os.path.join(output_dir, "models")
+    os.makedirs(tables_dir, exist_ok=True)
+    os.makedirs(models_dir, exist_ok=True)
+    rules_to_csv_friendly(top_rules).to_csv(os.path.join(tables_dir, "top_rules.csv"), index=False)
+    print(f"[SAVED] {tables_dir}/top_rules.csv")
+
+    RuleIndex(serving_rules).save(os.path.join(models_dir, "rule_index.pkl"))
+    print(f"[SAVED] {models_dir}/rule_index.pkl ({len(serving_rules)} luật)")
+
+    print("\n[DONE] Incremental association rules complete.")
+
+
+if __name__ == "__main__":
+    main()
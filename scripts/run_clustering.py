@@ -4,6 +4,8 @@ scripts/run_clustering.py
 Chạy pipeline Customer Segmentation từ CLI.
 Output:
   - outputs/tables/cluster_stats.csv
+  - outputs/tables/cluster_quality.csv (engine=minibatch)
+  - outputs/tables/elbow_scores.csv
   - outputs/models/kmeans.pkl
   - outputs/figures/elbow.png
   - outputs/figures/cluster_scatter.png
@@ -26,12 +28,15 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, ROOT)
 
 from src.utils.config import load_config
+from src.data.loader import load_processed
 from src.features.rfm import build_rfm
+from src.features.rfm_state import RFMState
 from src.mining.clustering import (
     cap_outliers_iqr,
     scale_rfm,
     elbow_scores,
     train_kmeans,
+    compare_with_full_kmeans,
     assign_clusters,
     cluster_stats,
     label_clusters,
@@ -41,20 +46,34 @@ from src.mining.clustering import (
 
 warnings.filterwarnings("ignore")
 
+# cột cleaned.parquet mà stage này cần (loader chỉ đọc đúng các cột này)
+REQUIRED_COLUMNS = ["Customer ID", "Order ID", "Order Date", "Sales"]
+
 
 def main():
     # ── 1. Load config ──────────────────────────────────────────────
     cfg = load_config(os.path.join(ROOT, "configs", "params.yaml"))
     seed = cfg.get("seed", 42)
-    n_clusters = cfg.get("clustering", {}).get("n_clusters", 4)
+    clust_cfg = cfg.get("clustering", {})
+    n_clusters = clust_cfg.get("n_clusters", 4)
+    engine = clust_cfg.get("engine", "kmeans")
+    batch_size = clust_cfg.get("batch_size", 4096)
+    quality_sample = clust_cfg.get("quality_sample", 100_000)
+    elbow_cfg = clust_cfg.get("elbow", {})
+    rfm_cfg = cfg.get("rfm", {})
+    state_dir = os.path.join(ROOT, rfm_cfg.get("state_dir", "data/processed/rfm_state"))
 
     # ── 2. Load cleaned data & build RFM ────────────────────────────
     processed_dir = os.path.join(ROOT, cfg["paths"]["processed_dir"])
-    cleaned_path = os.path.join(processed_dir, "cleaned.parquet")
-    df = pd.read_parquet(cleaned_path)
-    print(f"[INFO] Đã tải dữ liệu đã làm sạch: {df.shape}")
-
-    rfm = build_rfm(df)
+    if rfm_cfg.get("use_state", False) and RFMState.exists(state_dir):
+        # O(delta): state đã được gộp bởi scripts/update_rfm_state.py
+        rfm = RFMState.load(state_dir).to_rfm(rfm_cfg.get("snapshot_date"))
+        print(f"[INFO] Đã tải RFM từ state incremental: {state_dir}")
+    else:
+        cleaned_path = os.path.join(processed_dir, "cleaned.parquet")
+        df = load_processed(cleaned_path, columns=REQUIRED_COLUMNS, **cfg.get("loading", {}))
+        print(f"[INFO] Đã tải dữ liệu đã làm sạch: {df.shape}")
+        rfm = build_rfm(df)
     print(f"[INFO] Kích thước RFM: {rfm.shape}")
 
     # ── 3. Cap outliers ─────────────────────────────────────────────
@@ -67,13 +86,30 @@ def main():
     print("[INFO] Đã chuẩn hóa RFM bằng StandardScaler")
 
     # ── 5. Elbow & Silhouette ───────────────────────────────────────
-    scores = elbow_scores(X, k_range=range(2, 11), random_state=seed)
-    print(f"[INFO] Đã tính điểm Elbow cho k=2..10")
+    scores = elbow_scores(
+        X,
+        k_range=range(elbow_cfg.get("k_min", 2), elbow_cfg.get("k_max", 10) + 1),
+        random_state=seed,
+        engine=engine,
+        batch_size=batch_size,
+        n_jobs=elbow_cfg.get("n_jobs", 1),
+        silhouette=elbow_cfg.get("silhouette", "sample"),
+        sample_size=elbow_cfg.get("sample_size", 10_000),
+        criterion=elbow_cfg.get("criterion", "silhouette"),
+        patience=elbow_cfg.get("patience"),
+    )
+    print(f"[INFO] Đã tính điểm Elbow cho k={scores['k'][0]}..{scores['k'][-1]} (engine={engine})")
 
     # ── 6. Train KMeans ─────────────────────────────────────────────
-    km = train_kmeans(X, n_clusters=n_clusters, random_state=seed)
+    km = train_kmeans(X, n_clusters=n_clusters, random_state=seed, engine=engine, batch_size=batch_size)
     labels = km.labels_
-    print(f"[INFO] Đã huấn luyện KMeans với k={n_clusters}")
+    print(f"[INFO] Đã huấn luyện KMeans với k={n_clusters} (engine={engine})")
+
+    quality = None
+    if engine != "kmeans":
+        quality = compare_with_full_kmeans(X, km, sample_size=quality_sample, random_state=seed)
+        print(f"[INFO] So với KMeans full-batch: ARI={quality['ari']}, "
+              f"chênh lệch inertia={quality['inertia_gap']:.2%}")
 
     # ── 7. Assign clusters to RFM ───────────────────────────────────
     rfm_clustered = assign_clusters(rfm_capped, labels)
@@ -100,6 +136,15 @@ def main():
     stats.to_csv(os.path.join(tables_dir, "cluster_stats.csv"), index=False)
     print(f"[SAVED] {tables_dir}/cluster_stats.csv")
 
+    pd.DataFrame(scores).to_csv(os.path.join(tables_dir, "elbow_scores.csv"), index=False)
+    print(f"[SAVED] {tables_dir}/elbow_scores.csv")
+
+    if quality is not None:
+        pd.DataFrame([{"engine": engine, **quality}]).to_csv(
+            os.path.join(tables_dir, "cluster_quality.csv"), index=False
+        )
+        print(f"[SAVED] {tables_dir}/cluster_quality.csv")
+
     # Save RFM with clusters for later use
     csv_path = os.path.join(tables_dir, "rfm_clustered.csv")
     rfm_final.to_csv(csv_path, index=False)
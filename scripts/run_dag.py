@@ -0,0 +1,70 @@
+"""
+scripts/run_dag.py
+==================
+Chạy toàn bộ pipeline dạng DAG (src/pipeline/dag.py):
+pipeline → {association, clustering → modeling, forecasting}.
+Stage có script, input và section params.yaml không đổi sẽ được bỏ qua;
+các nhánh độc lập chạy song song.
+
+  python scripts/run_dag.py                     # chạy những gì đã cũ
+  python scripts/run_dag.py --dry-run           # chỉ in kế hoạch
+  python scripts/run_dag.py --only modeling     # modeling + các stage nó phụ thuộc
+  python scripts/run_dag.py --force             # chạy lại tất cả
+
+Output:
+  - trạng thái cache: dag.state_file (mặc định data/processed/dag_state.json)
+  - log từng stage: dag.log_dir (mặc định outputs/logs/<stage>.log)
+"""
+
+import argparse
+import os
+import sys
+import time
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils.config import load_config
+from src.pipeline.dag import DagRunner, default_stages
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DAG pipeline runner")
+    parser.add_argument("--only", nargs="+", help="chỉ chạy các stage này (kèm stage phụ thuộc)")
+    parser.add_argument("--force", action="store_true", help="bỏ qua cache, chạy lại")
+    parser.add_argument("--dry-run", action="store_true", help="chỉ in kế hoạch")
+    args = parser.parse_args()
+
+    cfg = load_config(os.path.join(ROOT, "configs", "params.yaml"))
+    dag_cfg = cfg.get("dag", {})
+    runner = DagRunner(
+        default_stages(cfg),
+        cfg,
+        root=ROOT,
+        state_file=os.path.join(ROOT, dag_cfg.get("state_file", "data/processed/dag_state.json")),
+        log_dir=os.path.join(ROOT, dag_cfg.get("log_dir", "outputs/logs")),
+        max_workers=dag_cfg.get("max_workers", 3),
+    )
+
+    if args.dry_run:
+        for name, action in runner.plan(args.only):
+            deps = ", ".join(runner.deps[name]) or "-"
+            print(f"[PLAN] {name:<12} {action:<5} (phụ thuộc: {deps})")
+        return
+
+    def on_event(res):
+        tag = {"ran": "DONE", "skipped": "SKIP", "failed": "FAIL", "blocked": "BLOCKED"}[res["status"]]
+        extra = f" → xem {res['log']}" if res["status"] == "failed" else ""
+        print(f"[{tag}] {res['stage']} ({res['seconds']}s){extra}")
+
+    start = time.perf_counter()
+    results = runner.run(args.only, force=args.force, on_event=on_event)
+    n_failed = sum(r["status"] in ("failed", "blocked") for r in results)
+    print(f"\n[INFO] DAG xong trong {time.perf_counter() - start:.1f}s: "
+          f"{sum(r['status'] == 'ran' for r in results)} chạy, "
+          f"{sum(r['status'] == 'skipped' for r in results)} bỏ qua, {n_failed} lỗi")
+    sys.exit(1 if n_failed else 0)
+
+
+if __name__ == "__main__":
+    main()
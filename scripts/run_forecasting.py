@@ -6,6 +6,8 @@ Outputs:
   - outputs/tables/forecast_metrics.csv
   - outputs/figures/forecast_plot.png
   - outputs/figures/actual_vs_pred.png
+  - outputs/tables/batch_forecasts.csv, batch_fits.csv (forecasting.batch)
+  - outputs/tables/backtest_origins.csv, backtest_metrics.csv (forecasting.backtest)
 """
 
 import os
@@ -23,7 +25,12 @@ sys.path.insert(0, ROOT)
 
 from src.utils.config import load_config
 from src.models import forecasting
+from src.models.batch_forecasting import batch_forecast
+from src.models.exp_smoothing import forecast_holt_winters
+from src.models.arima_search import format_order, load_cache, save_cache, select_order
+from src.features.time_features import HIERARCHY, TimeSeriesCube
 from src.evaluation import metrics
+from src.evaluation.backtest import backtest
 
 warnings.filterwarnings("ignore")
 
@@ -32,10 +39,20 @@ def main():
     cfg = load_config(os.path.join(ROOT, "configs", "params.yaml"))
     fc_cfg = cfg.get("forecasting", {})
     date_col = fc_cfg.get("date_col", "date")
-    value_col = fc_cfg.get("value_col", "revenue")
+    value_col = fc_cfg.get("value_col", "sales")
     test_periods = fc_cfg.get("test_periods", 6)
     forecast_horizon = fc_cfg.get("forecast_horizon", 12)
     arima_order = tuple(fc_cfg.get("arima_order", (1, 1, 1)))
+    seasonal_order = (0, 0, 0, 0)
+
+    # chọn bậc ARIMA tự động (thay arima_order); cache theo hash chuỗi
+    search_cfg = dict(fc_cfg.get("order_search", {}))
+    search_enabled = search_cfg.pop("enabled", False)
+    search_n_jobs = search_cfg.pop("n_jobs", -1)
+    order_cache_path = os.path.join(ROOT, search_cfg.pop("cache_path", "outputs/models/arima_orders.json"))
+    order_cache = load_cache(order_cache_path) if search_enabled else None
+    hw_cfg = dict(fc_cfg.get("holt_winters", {}))
+    hw_enabled = hw_cfg.pop("enabled", True)
 
     # load data
     # timeseries file is generated by preprocessing script and lives in processed directory
@@ -44,7 +61,8 @@ def main():
     # parse dates
     df[date_col] = pd.to_datetime(df[date_col])
     df = df.set_index(date_col).sort_index()
-    ts = df[value_col].asfreq("MS")
+    # timeseries_monthly.csv dùng ngày cuối tháng (resample "M")
+    ts = df[value_col].asfreq(fc_cfg.get("freq", "M"))
     print(f"[INFO] đã tải chuỗi thời gian với {len(ts)} bản ghi")
 
     # split train / test chronologically
@@ -61,19 +79,39 @@ def main():
 
     # ARIMA
     try:
-        arima_model = forecasting.train_arima(train, order=arima_order)
+        search_seconds = 0.0
+        if search_enabled:
+            search = select_order(train, n_jobs=search_n_jobs, cache=order_cache, **search_cfg)
+            arima_order, seasonal_order = tuple(search["order"]), tuple(search["seasonal_order"])
+            search_seconds = 0.0 if search["cached"] else search["seconds"]
+            print(f"[INFO] bậc ARIMA: {format_order(search)} (AIC {search['aic']}, "
+                  f"{search['n_fits']} ứng viên, {search['seconds']}s"
+                  f"{', cache' if search['cached'] else ''})")
+        arima_model = forecasting.train_arima(train, order=arima_order, seasonal_order=seasonal_order)
         arima_pred = forecasting.forecast_arima(arima_model, len(test))
         res = metrics.forecast_metrics(test, arima_pred)
         res["model"] = "arima"
+        res["order"] = format_order({"order": arima_order, "seasonal_order": seasonal_order})
+        res["search_seconds"] = search_seconds
         results.append(res)
     except Exception as e:
         print(f"[CẢNH BÁO] ARIMA thất bại: {e}")
 
+    # Holt-Winters NumPy (src/models/exp_smoothing.py)
+    if hw_enabled:
+        try:
+            hw_pred = forecast_holt_winters(train, len(test), **hw_cfg)
+            res = metrics.forecast_metrics(test, hw_pred)
+            res["model"] = "holt_winters"
+            results.append(res)
+        except Exception as e:
+            print(f"[CẢNH BÁO] Holt-Winters thất bại: {e}")
+
     # Prophet if available
     if forecasting._HAS_PROPHET:
         df_prop = train.reset_index().rename(columns={value_col: "y", date_col: "ds"})
         prop_model = forecasting.train_prophet(df_prop, date_col="ds", value_col="y")
-        prop_pred = forecasting.forecast_prophet(prop_model, periods=len(test), freq="MS")
+        prop_pred = forecasting.forecast_prophet(prop_model, periods=len(test), freq=ts.index.freqstr)
         prop_pred.index = test.index  # align
         res = metrics.forecast_metrics(test, prop_pred)
         res["model"] = "prophet"
@@ -100,6 +138,8 @@ def main():
         best_pred = naive_pred
     elif best == "arima":
         best_pred = arima_pred
+    elif best == "holt_winters":
+        best_pred = hw_pred
     elif best == "prophet":
         best_pred = prop_pred
     else:
@@ -128,6 +168,63 @@ def main():
     plt.close(fig2)
     print("[LƯU] biểu đồ thực tế_vs_dự đoán")
 
+    # ── rolling-origin backtest trên chuỗi tổng ──
+    bt_cfg = fc_cfg.get("backtest", {})
+    if bt_cfg.get("enabled", False):
+        per_origin, bt_summary = backtest(
+            ts,
+            models=tuple(bt_cfg.get("models", ["naive", "arima"])),
+            horizon=bt_cfg.get("horizon", test_periods),
+            n_origins=bt_cfg.get("n_origins", 6),
+            step=bt_cfg.get("step", 1),
+            window=bt_cfg.get("window", "expanding"),
+            window_size=bt_cfg.get("window_size"),
+            min_train=bt_cfg.get("min_train", 12),
+            arima_order=arima_order,
+            seasonal_order=seasonal_order,
+            refit_every=bt_cfg.get("refit_every", 3),
+            n_jobs=bt_cfg.get("n_jobs", -1),
+            holt_winters=hw_cfg,
+        )
+        print("[INFO] backtest (trung bình qua các origin):")
+        print(bt_summary)
+        per_origin.to_csv(os.path.join(tables_dir, "backtest_origins.csv"), index=False)
+        bt_summary.to_csv(os.path.join(tables_dir, "backtest_metrics.csv"))
+        print("[LƯU] backtest_origins.csv, backtest_metrics.csv")
+
+    # ── batch: mọi chuỗi của cube phân cấp ──
+    batch_cfg = fc_cfg.get("batch", {})
+    cube_path = os.path.join(ROOT, cfg["paths"]["processed_dir"], "ts_cube.parquet")
+    if batch_cfg.get("enabled", False) and os.path.exists(cube_path):
+        freq = batch_cfg.get("freq", "M")
+        levels = cfg.get("timeseries_cube", {}).get("levels", HIERARCHY)
+        cube = TimeSeriesCube.load(cube_path, freqs=[freq], levels=levels)
+        forecasts, fits, stats = batch_forecast(
+            cube.iter_series(freq, level=batch_cfg.get("level")),
+            models=tuple(batch_cfg.get("models", ["naive", "arima"])),
+            horizon=batch_cfg.get("horizon", forecast_horizon),
+            arima_order=arima_order,
+            n_jobs=batch_cfg.get("n_jobs", -1),
+            timeout=batch_cfg.get("timeout", 30),
+            chunk_size=batch_cfg.get("chunk_size", 16),
+            key_names=levels,
+            order_search=search_cfg if search_enabled and batch_cfg.get("auto_order", True) else None,
+            order_cache=order_cache,
+            holt_winters=hw_cfg,
+        )
+        print(f"[INFO] batch: {stats['n_series']} chuỗi, {stats['n_fits']} lần fit "
+              f"({stats['n_ok']} ok, {stats['n_failed']} lỗi, {stats['n_timeout']} quá giờ) "
+              f"trong {stats['seconds']}s → {stats['fits_per_sec']} fit/s {stats['per_model']}")
+        forecasts.to_csv(os.path.join(tables_dir, "batch_forecasts.csv"), index=False)
+        fits.to_csv(os.path.join(tables_dir, "batch_fits.csv"), index=False)
+        print("[LƯU] batch_forecasts.csv, batch_fits.csv")
+    elif batch_cfg.get("enabled", False):
+        print(f"[CẢNH BÁO] Không có {cube_path}; chạy run_pipeline.py trước (timeseries_cube.enabled)")
+
+    if search_enabled:
+        save_cache(order_cache, order_cache_path)
+        print(f"[LƯU] cache bậc ARIMA ({len(order_cache)} chuỗi) -> {order_cache_path}")
+
     print("\n[HOÀN THÀNH] pipeline dự báo đã hoàn tất.")
 
 
@@ -5,6 +5,7 @@ scripts/run_modeling.py
 Output:
   - outputs/models/best_model.pkl
   - outputs/tables/model_metrics.csv
+  - outputs/tables/tuning_trials.csv (modeling.search)
   - outputs/figures/confusion_matrix.png
   - outputs/figures/feature_importance.png
 """
@@ -24,7 +25,8 @@ ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
 sys.path.insert(0, ROOT)
 
 from src.utils.config import load_config
-from src.models import supervised
+from src.data.loader import load_processed, parquet_columns
+from src.models import supervised, tuning
 from src.evaluation import metrics
 
 warnings.filterwarnings("ignore")
@@ -49,11 +51,15 @@ def main():
     test_size = mdl_cfg.get("test_size", 0.2)
     random_state = mdl_cfg.get("random_state", 42)
     criterion = mdl_cfg.get("selection_criterion", "roc_auc")
+    n_jobs = mdl_cfg.get("n_jobs", -1)
+    search_cfg = mdl_cfg.get("search", {})
 
     # load data
     processed_dir = os.path.join(ROOT, cfg["paths"]["processed_dir"])
     input_path = os.path.join(processed_dir, "cluster_input.parquet")
-    df = pd.read_parquet(input_path)
+    # chỉ đọc target + features (bỏ drop_cols ngay ở reader)
+    columns = [c for c in parquet_columns(input_path) if c not in drop_cols]
+    df = load_processed(input_path, columns=columns, memory_map=cfg.get("loading", {}).get("memory_map", False))
     print(f"[INFO] đã tải dữ liệu đầu vào phân cụm: {df.shape}")
     print(df.columns)
     # prepare features
@@ -61,14 +67,6 @@ def main():
     X_train, X_test, y_train, y_test = supervised.split_data(X, y, test_size=test_size, random_state=random_state)
     print(f"[INFO] train/test split: {X_train.shape}, {X_test.shape}")
 
-    # fit models
-    models = supervised.train_models(X_train, y_train, algorithms=algorithms, random_state=random_state)
-    print(f"[INFO] đã huấn luyện các mô hình: {list(models.keys())}")
-
-    # evaluate
-    metrics_df = supervised.evaluate_models(models, X_test, y_test)
-    print(metrics_df)
-
     # output dirs
     output_dir = os.path.join(ROOT, cfg["paths"].get("output_dir", "outputs"))
     models_dir = os.path.join(output_dir, "models")
@@ -78,6 +76,40 @@ def main():
     os.makedirs(tables_dir, exist_ok=True)
     os.makedirs(figures_dir, exist_ok=True)
 
+    # tune (successive halving) – trial đã xong được cache, chạy lại sẽ resume
+    best_params = {}
+    if search_cfg.get("enabled", False):
+        best_params, trials = tuning.tune_models(
+            X_train,
+            y_train,
+            algorithms=algorithms,
+            spaces=search_cfg.get("spaces", {}),
+            cache_path=os.path.join(ROOT, search_cfg.get("cache_path", "outputs/models/tuning_trials.json")),
+            n_candidates=search_cfg.get("n_candidates", 27),
+            factor=search_cfg.get("factor", 3),
+            cv=search_cfg.get("cv", 3),
+            scoring=search_cfg.get("scoring", criterion),
+            random_state=random_state,
+            n_jobs=search_cfg.get("n_jobs", n_jobs),
+        )
+        if not trials.empty:
+            trials.to_csv(os.path.join(tables_dir, "tuning_trials.csv"), index=False)
+            print(f"[INFO] tuning: {len(trials)} trial ({int(trials['cached'].sum())} từ cache)")
+        for name, params in best_params.items():
+            print(f"[INFO] tham số tốt nhất {name}: {params}")
+
+    # fit models
+    models, timings = supervised.train_models(
+        X_train, y_train, algorithms=algorithms, random_state=random_state,
+        n_jobs=n_jobs, return_timings=True, params=best_params,
+    )
+    print(f"[INFO] đã huấn luyện các mô hình: {list(models.keys())}")
+
+    # evaluate (+ luồng / wall / CPU theo model)
+    metrics_df = supervised.evaluate_models(models, X_test, y_test).join(timings)
+    metrics_df["params"] = pd.Series({name: str(best_params.get(name, {})) for name in metrics_df.index})
+    print(metrics_df)
+
     # save metrics
     metrics_df.to_csv(os.path.join(tables_dir, "model_metrics.csv"))
     print(f"[LƯU] metrics vào {tables_dir}/model_metrics.csv")
@@ -1,17 +1,28 @@
 import os
+import shutil
 import sys
 import pandas as pd
 
 sys.path.append(".")
 
 from src.utils.config import load_config
-from src.data.loader import load_csv, basic_info
-from src.data.cleaner import DataCleaner
+from src.data.loader import load_csv, basic_info, iter_parquet
+from src.data.cleaner import DataCleaner, clean_csv_chunked
+from src.data.schema import write_parquet
 
 # NEW
-from src.features.rfm import build_rfm
-from src.features.basket import build_basket_long, build_basket_matrix
-from src.features.time_features import build_monthly_timeseries
+from src.features.rfm import build_rfm, build_rfm_chunked, order_totals_chunked
+from src.features.rfm_state import RFMState, source_fingerprint
+from src.features.basket import build_basket_long, build_basket_chunked
+from src.features.time_features import (
+    HIERARCHY,
+    TimeSeriesCube,
+    build_monthly_timeseries,
+    build_monthly_timeseries_chunked,
+    build_timeseries_cube,
+    build_timeseries_cube_chunked,
+)
+from src.utils.memory import peak_rss_mb
 
 
 def main():
@@ -19,30 +30,97 @@ def main():
 
     raw_path = cfg["paths"]["raw_data"]
     processed_dir = cfg["paths"]["processed_dir"]
+    stream_cfg = cfg.get("streaming", {})
+    rfm_cfg = cfg.get("rfm", {})
+    clean_cfg = cfg.get("cleaning", {})
+    ingest_cfg = cfg.get("ingest", {})
+    schema_cfg = cfg.get("schema", {})
+    cube_cfg = cfg.get("timeseries_cube", {})
 
     os.makedirs(processed_dir, exist_ok=True)
 
-    # =================================================
-    # 1️⃣ LOAD
-    # =================================================
-    print("Đang tải dữ liệu...")
-    df = load_csv(raw_path)
-    basic_info(df)
-
-    # =================================================
-    # 2️⃣ CLEAN
-    # =================================================
-    print("Đang làm sạch...")
-    cleaner = DataCleaner(df)
-    df_clean = (
-        cleaner
-        .remove_duplicates()
-        .fill_missing()
-        .get_data()
-    )
-
     cleaned_path = os.path.join(processed_dir, "cleaned.parquet")
-    df_clean.to_parquet(cleaned_path, index=False)
+    date_cols = clean_cfg.get("date_cols", ["Order Date", "Ship Date"])
+    date_format = clean_cfg.get("date_format", "%d/%m/%Y")
+    dedupe_key = clean_cfg.get("dedupe_key")
+    fill_values = clean_cfg.get("fill_values")
+    fill_default = clean_cfg.get("fill_default", 0)
+    row_group_size = schema_cfg.get("row_group_size", 100_000)
+
+    # streaming / cleaning.chunked: không nạp toàn bộ dữ liệu – làm sạch theo
+    # khối, các bước sau (RFM, basket, chuỗi thời gian, cube) đọc
+    # cleaned.parquet theo row group
+    out_of_core = stream_cfg.get("enabled", False) or clean_cfg.get("chunked", False)
+
+    def chunks(columns):
+        return iter_parquet(cleaned_path, columns=columns, batch_size=row_group_size)
+
+    df_clean = None
+    if out_of_core:
+        # =================================================
+        # 1️⃣+2️⃣ LOAD & CLEAN theo khối (dữ liệu lớn hơn RAM)
+        # =================================================
+        print("Đang làm sạch theo khối...")
+        stats = clean_csv_chunked(
+            raw_path,
+            cleaned_path,
+            key=dedupe_key,
+            fills=fill_values,
+            default=fill_default,
+            date_cols=date_cols,
+            date_format=date_format,
+            categorical=schema_cfg.get("categorical"),
+            block_size_mb=ingest_cfg.get("block_size_mb", 16),
+            row_group_size=row_group_size,
+        )
+        print(f"Làm sạch theo khối: {stats}")
+    else:
+        # =================================================
+        # 1️⃣ LOAD
+        # =================================================
+        print("Đang tải dữ liệu...")
+        if raw_path.endswith(".parquet"):
+            # raw đã chuyển sẵn bằng scripts/ingest_csv.py
+            df = pd.read_parquet(raw_path)
+        else:
+            df = load_csv(
+                raw_path,
+                engine=ingest_cfg.get("engine", "pyarrow"),
+                block_size_mb=ingest_cfg.get("block_size_mb", 16),
+            )
+        basic_info(
+            df,
+            diagnostics=ingest_cfg.get("diagnostics", False),
+            sample_rows=ingest_cfg.get("diagnostics_sample", 10_000),
+        )
+
+        # =================================================
+        # 2️⃣ CLEAN
+        # =================================================
+        print("Đang làm sạch...")
+        # df thô không dùng lại → làm sạch tại chỗ, không copy
+        cleaner = DataCleaner(df, inplace=True)
+        df_clean = (
+            cleaner
+            .remove_duplicates(key=dedupe_key)
+            .fill_missing(fills=fill_values, default=fill_default)
+            .parse_dates(date_cols, fmt=date_format)
+            .apply_schema(
+                categorical=schema_cfg.get("categorical"),
+                downcast=schema_cfg.get("downcast", True),
+            )
+            .get_data()
+        )
+        print(f"Đã loại {cleaner.n_duplicates} dòng trùng")
+        print("Bộ nhớ trước/sau schema (MB):")
+        print(cleaner.memory_report.to_string())
+
+        write_parquet(
+            df_clean,
+            cleaned_path,
+            row_group_size=row_group_size,
+            compression=schema_cfg.get("compression", "snappy"),
+        )
 
     print(f"Đã lưu dữ liệu đã làm sạch -> {cleaned_path}")
 
@@ -53,34 +131,93 @@ def main():
 
     # ---------- RFM ----------
     print("Xây dựng RFM...")
-    rfm = build_rfm(df_clean)
+    if rfm_cfg.get("use_state", False):
+        # state incremental: dựng lần đầu từ dữ liệu sạch, các lần sau chỉ đọc
+        # (delta hằng ngày gộp bằng scripts/update_rfm_state.py --delta, raw
+        # giữ nguyên). State gắn với kích thước + mtime của raw: raw đổi (kể
+        # cả nối thêm đơn) → state cũ bị bỏ và dựng lại từ toàn bộ lịch sử.
+        state_dir = rfm_cfg.get("state_dir", "data/processed/rfm_state")
+        source = source_fingerprint(raw_path)
+        state = RFMState.load(state_dir) if RFMState.exists(state_dir) else None
+        if state is not None and state.source != source:
+            print(f"State RFM tại {state_dir} dựng từ raw khác -> dựng lại")
+            shutil.rmtree(state_dir)
+            state = None
+        if state is None:
+            state = RFMState(state_dir, source=source)
+            if out_of_core:
+                # gộp theo đơn trước: một đơn có thể nằm ở nhiều row group
+                state.update(order_totals_chunked(chunks(["Customer ID", "Order ID", "Order Date", "Sales"])))
+            else:
+                state.update(df_clean)
+        if rfm_cfg.get("windows"):
+            print("Bỏ qua rfm.windows: state incremental chỉ lưu R/F/M toàn kỳ")
+        rfm = state.to_rfm(rfm_cfg.get("snapshot_date"))
+    elif out_of_core:
+        rfm = build_rfm_chunked(
+            chunks(["Customer ID", "Order ID", "Order Date", "Sales"]),
+            windows=rfm_cfg.get("windows"),
+        )
+    else:
+        rfm = build_rfm(df_clean, windows=rfm_cfg.get("windows"))
     rfm_path = os.path.join(processed_dir, "rfm.parquet")
     rfm.to_parquet(rfm_path, index=False)
 
     # ---------- Basket ----------
     print("Xây dựng giỏ hàng...")
-    basket_long = build_basket_long(df_clean)
-    basket_path = os.path.join(processed_dir, "basket.parquet")
-    basket_long.to_parquet(basket_path, index=False)
-
-    # matrix (cho clustering/association)
-    basket_matrix = build_basket_matrix(df_clean)
-    cluster_input_path = os.path.join(processed_dir, "cluster_input.parquet")
-    basket_matrix.to_parquet(cluster_input_path)
+    if out_of_core:
+        # out-of-core: đọc cleaned.parquet theo row group, ghi shard + vocab ra đĩa
+        basket_path = os.path.join(processed_dir, "basket_shards")
+        meta = build_basket_chunked(
+            cleaned_path,
+            basket_path,
+            item_col=stream_cfg.get("item_col", "Product Name"),
+            max_memory_mb=stream_cfg.get("max_memory_mb", 256),
+        )
+        print(f"Basket streaming: {meta['n_rows']} dòng, {meta['n_shards']} shard, "
+              f"{meta['chunk_rows']} dòng/khối")
+    else:
+        # chỉ long-format: ma trận đơn × sản phẩm dạng dense không dựng ở đây
+        # (association dùng build_basket_sparse; cluster_input.parquet do
+        # run_clustering.py ghi)
+        basket_long = build_basket_long(df_clean)
+        basket_path = os.path.join(processed_dir, "basket.parquet")
+        basket_long.to_parquet(basket_path, index=False)
 
     # ---------- Time series ----------
     print("Xây dựng chuỗi thời gian...")
-    ts = build_monthly_timeseries(df_clean)
+    if out_of_core:
+        ts = build_monthly_timeseries_chunked(chunks(["Order Date", "Sales"]))
+    else:
+        ts = build_monthly_timeseries(df_clean)
     ts_path = os.path.join(processed_dir, "timeseries_monthly.csv")
     ts.to_csv(ts_path, index=False)
 
+    cube_path = None
+    if cube_cfg.get("enabled", True):
+        # mọi cấp Region x Category x Sub-Category ở D/W/M, một lần groupby
+        levels = cube_cfg.get("levels", HIERARCHY)
+        freqs = tuple(cube_cfg.get("freqs", ["D", "W", "M"]))
+        if out_of_core:
+            frame = build_timeseries_cube_chunked(
+                chunks(levels + ["Order Date", "Sales"]), levels=levels, freqs=freqs)
+        else:
+            frame = build_timeseries_cube(df_clean, levels=levels, freqs=freqs)
+        cube = TimeSeriesCube(frame, levels=levels)
+        cube_path = os.path.join(processed_dir, "ts_cube.parquet")
+        cube.save(cube_path)
+        print(f"Cube chuỗi thời gian: {len(cube.frame)} dòng, "
+              f"{len(cube.series_keys('M'))} chuỗi/tần suất")
+
     print("\n✅ Tiền xử lý và tạo đặc tính hoàn tất!")
     print("Saved:")
     print("-", cleaned_path)
     print("-", rfm_path)
     print("-", basket_path)
-    print("-", cluster_input_path)
     print("-", ts_path)
+    if cube_path:
+        print("-", cube_path)
+    print(f"Peak RSS: {peak_rss_mb():.0f} MB")
 
 
 if __name__ == "__main__":
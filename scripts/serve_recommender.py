@@ -0,0 +1,53 @@
+"""
+scripts/serve_recommender.py
+============================
+Chạy HTTP server gợi ý cross-sell từ rule index.
+Input:
+  - outputs/models/rule_index.pkl (do run_association.py ghi), hoặc
+  - outputs/tables/top_rules.csv (fallback)
+
+  python scripts/serve_recommender.py --port 8000
+  curl "http://127.0.0.1:8000/recommend?item=Phones&item=Binders&k=3"
+"""
+
+import argparse
+import os
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils.config import load_config
+from src.mining.recommender import RuleIndex, make_server
+
+
+def load_index(cfg: dict) -> RuleIndex:
+    output_dir = os.path.join(ROOT, cfg["paths"].get("output_dir", "outputs"))
+    pkl_path = os.path.join(output_dir, "models", "rule_index.pkl")
+    if os.path.exists(pkl_path):
+        return RuleIndex.load(pkl_path)
+    return RuleIndex.from_csv(os.path.join(output_dir, "tables", "top_rules.csv"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Cross-sell recommendation server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+
+    cfg = load_config(os.path.join(ROOT, "configs", "params.yaml"))
+    index = load_index(cfg)
+    print(f"[INFO] Đã nạp rule index: {len(index)} luật, {len(index.rules)} antecedent")
+
+    server = make_server(index, host=args.host, port=args.port)
+    print(f"[INFO] Đang phục vụ tại http://{args.host}:{args.port}/recommend")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""
+scripts/update_rfm_state.py
+===========================
+Cập nhật state RFM incremental (src/features/rfm_state.py) với đơn hàng mới,
+để run_clustering.py / run_pipeline.py đọc RFM mà không build lại toàn bộ lịch sử.
+
+  # lần đầu (hoặc dựng lại): từ cleaned.parquet
+  python scripts/update_rfm_state.py --rebuild
+
+  # hằng ngày: chỉ gộp delta – O(delta). Đơn mới đi qua --delta, không nối
+  # vào raw: raw đổi thì run_pipeline.py dựng lại state từ toàn bộ lịch sử
+  python scripts/update_rfm_state.py --delta data/raw/new_orders.csv
+
+Output:
+  - data/processed/rfm_state/state.pkl          (snapshot)
+  - data/processed/rfm_state/deltas/part-*.pkl  (các delta sau snapshot)
+  - data/processed/rfm.parquet
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from src.utils.config import load_config
+from src.data.loader import load_processed
+from src.features.rfm_state import RFMState, source_fingerprint
+
+
+def _read_orders(path: str) -> pd.DataFrame:
+    return pd.read_parquet(path) if path.endswith(".parquet") else pd.read_csv(path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Incremental RFM state")
+    parser.add_argument("--delta", help="CSV/parquet chứa các đơn hàng mới")
+    parser.add_argument("--rebuild", action="store_true", help="Dựng lại state từ cleaned.parquet")
+    args = parser.parse_args()
+
+    # ── 1. Load config ──────────────────────────────────────────────
+    cfg = load_config(os.path.join(ROOT, "configs", "params.yaml"))
+    rfm_cfg = cfg.get("rfm", {})
+    processed_dir = os.path.join(ROOT, cfg["paths"]["processed_dir"])
+    state_dir = os.path.join(ROOT, rfm_cfg.get("state_dir", "data/processed/rfm_state"))
+
+    # ── 2. Dựng / cập nhật state ───────────────────────────────────
+    start = time.perf_counter()
+    if args.rebuild or not RFMState.exists(state_dir):
+        shutil.rmtree(state_dir, ignore_errors=True)
+        # ghi fingerprint raw như run_pipeline.py → pipeline dùng lại state này
+        state = RFMState(state_dir, source=source_fingerprint(os.path.join(ROOT, cfg["paths"]["raw_data"])))
+        df = load_processed(
+            os.path.join(processed_dir, "cleaned.parquet"),
+            columns=["Customer ID", "Order ID", "Order Date", "Sales"],
+        )
+        info = state.update(df)
+        print(f"[INFO] Đã dựng state RFM: {info}")
+    elif args.delta:
+        state = RFMState.load(state_dir)
+        info = state.update(_read_orders(args.delta))
+        print(f"[INFO] Đã gộp delta: {info}")
+    else:
+        state = RFMState.load(state_dir)
+        print("[INFO] Không có --delta; xuất lại RFM từ state hiện tại")
+    print(f"[INFO] Thời gian cập nhật state: {time.perf_counter() - start:.2f}s")
+
+    # ── 3. Export RFM ───────────────────────────────────────────────
+    rfm = state.to_rfm(rfm_cfg.get("snapshot_date"))
+    rfm_path = os.path.join(processed_dir, "rfm.parquet")
+    rfm.to_parquet(rfm_path, index=False)
+    print(f"[SAVED] {rfm_path} ({len(rfm)} khách hàng)")
+
+    print("\n[DONE] RFM state update complete.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,23 +1,196 @@
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
+
+from src.data.dates import DEFAULT_DATE_FORMAT, parse_dates
+from src.data.schema import (
+    DEFAULT_CATEGORICAL,
+    DEFAULT_FILL_VALUES,
+    RAW_COLUMN_TYPES,
+    apply_schema,
+    memory_report,
+    memory_usage_mb,
+)
+
+
+def row_fingerprints(df: pd.DataFrame, key: list = None) -> np.ndarray:
+    """
+    uint64 hash per row over the `key` columns (None = all columns).
+    Comparing fingerprints avoids factorizing every long string column.
+    """
+    cols = list(key) if key else list(df.columns)
+    return pd.util.hash_pandas_object(df[cols], index=False).to_numpy()
+
+
+class FingerprintSet:
+    """
+    Set of uint64 fingerprints kept as sorted runs of doubling size
+    (log-structured merge): `add` only merges runs of similar length, so
+    adding n fingerprints over many chunks costs O(n log n) in total instead
+    of re-merging the whole set per chunk.
+    """
+
+    def __init__(self):
+        self.runs = []
+
+    def __len__(self):
+        return sum(run.size for run in self.runs)
+
+    def contains(self, fp: np.ndarray) -> np.ndarray:
+        # sorted queries -> searchsorted walks each run in order (cache friendly)
+        order = np.argsort(fp)
+        query = fp[order]
+        hit = np.zeros(fp.shape[0], dtype=bool)
+        for run in self.runs:
+            pos = np.minimum(np.searchsorted(run, query), run.size - 1)
+            hit |= run[pos] == query
+        found = np.empty_like(hit)
+        found[order] = hit
+        return found
+
+    def add(self, fp: np.ndarray) -> None:
+        """Add fingerprints not yet in the set (caller filters known ones)."""
+        run = np.unique(fp)
+        while self.runs and self.runs[-1].size <= run.size:
+            run = np.sort(np.concatenate([self.runs.pop(), run]), kind="stable")  # timsort: merge of two runs
+        if run.size:
+            self.runs.append(run)
 
 
 class DataCleaner:
     """
     Basic cleaning utilities
-    (week 1: placeholder only)
+
+    Chained operations work on self.df; inplace=True skips the up-front
+    copy (the caller's frame is modified).
     """
 
-    def __init__(self, df: pd.DataFrame):
-        self.df = df.copy()
+    def __init__(self, df: pd.DataFrame, inplace: bool = False):
+        self.df = df if inplace else df.copy()
+        self.memory_report = None
+        self.n_duplicates = 0
 
-    def remove_duplicates(self):
-        self.df = self.df.drop_duplicates()
+    def remove_duplicates(self, key: list = None, seen: FingerprintSet = None):
+        """
+        Drop duplicate rows (keep first) on the `key` columns, e.g. ["Row ID"]
+        or ["Order ID", "Product ID"]; None = all columns.
+
+        `seen` = FingerprintSet of earlier chunks (chunked mode); rows
+        matching it are dropped too and the kept rows are added to it.
+        """
+        fp = row_fingerprints(self.df, key)
+        dup = pd.Series(fp).duplicated().to_numpy()
+        if seen is not None:
+            dup |= seen.contains(fp)
+            seen.add(fp[~dup])
+
+        self.n_duplicates = int(dup.sum())
+        if self.n_duplicates:
+            self.df = self.df[~dup]
+        return self
+
+    def fill_missing(self, fills: dict = None, default=0):
+        """
+        Fill NaN per column: `fills` (schema, e.g. {"Postal Code": 0}) first,
+        then `default` for remaining columns (None = leave NaN).
+        Only columns that have NaN are touched; datetime columns keep NaT
+        (fillna(0) would turn them into object), categoricals get the value
+        as a new category.
+        """
+        fills = DEFAULT_FILL_VALUES if fills is None else fills
+        has_na = self.df.isna().any()
+        for col in has_na[has_na].index:
+            value = fills.get(col, default)
+            s = self.df[col]
+            if value is None or pd.api.types.is_datetime64_any_dtype(s):
+                continue
+            if isinstance(s.dtype, pd.CategoricalDtype) and value not in s.cat.categories:
+                s = s.cat.add_categories([value])
+            self.df[col] = s.fillna(value)
         return self
 
-    def fill_missing(self):
-        # TODO: update later
-        self.df = self.df.fillna(0)
+    def parse_dates(self, cols=("Order Date", "Ship Date"), fmt: str = DEFAULT_DATE_FORMAT):
+        # parse once here; cleaned.parquet then stores datetime64 and the
+        # feature builders skip re-parsing
+        self.df = parse_dates(self.df, list(cols), fmt=fmt)
+        return self
+
+    def apply_schema(self, categorical: list = None, downcast: bool = True):
+        # categorical strings + lossless numeric downcast; before/after
+        # memory is kept in self.memory_report
+        before, dtypes = memory_usage_mb(self.df), self.df.dtypes
+        self.df = apply_schema(self.df, categorical=categorical, downcast=downcast)
+        self.memory_report = memory_report(before, self.df, dtypes)
         return self
 
     def get_data(self):
         return self.df
+
+
+def clean_csv_chunked(
+    csv_path: str,
+    parquet_path: str,
+    key: list = None,
+    fills: dict = None,
+    default=0,
+    date_cols: list = ("Order Date", "Ship Date"),
+    date_format: str = DEFAULT_DATE_FORMAT,
+    categorical: list = None,
+    block_size_mb: int = 16,
+    row_group_size: int = 100_000,
+) -> dict:
+    """
+    Streaming clean for inputs larger than memory: CSV blocks (or parquet
+    row groups, e.g. a raw file from scripts/ingest_csv.py) -> DataCleaner
+    (dedupe with a cross-chunk fingerprint set, fills, dates) -> parquet.
+
+    Categorical columns are dictionary-encoded at the Arrow level so every
+    chunk shares one parquet schema; numeric downcast is skipped (types
+    could differ between chunks).
+    Returns: {"n_rows_in", "n_rows_out", "n_duplicates", "n_chunks"}
+    """
+    if categorical is None:
+        categorical = DEFAULT_CATEGORICAL
+    if csv_path.endswith(".parquet"):
+        reader = pq.ParquetFile(csv_path).iter_batches(batch_size=row_group_size)
+    else:
+        reader = pa_csv.open_csv(
+            csv_path,
+            read_options=pa_csv.ReadOptions(use_threads=True, block_size=block_size_mb * 1024 ** 2),
+            convert_options=pa_csv.ConvertOptions(column_types=RAW_COLUMN_TYPES),
+        )
+
+    seen = FingerprintSet()
+    writer, schema = None, None
+    stats = {"n_rows_in": 0, "n_rows_out": 0, "n_duplicates": 0, "n_chunks": 0}
+    try:
+        for batch in reader:
+            cleaner = (
+                DataCleaner(batch.to_pandas(), inplace=True)
+                .remove_duplicates(key=key, seen=seen)
+                .fill_missing(fills=fills, default=default)
+                .parse_dates(date_cols, fmt=date_format)
+            )
+            chunk = cleaner.get_data()
+
+            table = pa.Table.from_pandas(chunk, preserve_index=False)
+            for col in categorical:
+                if col in table.column_names:
+                    idx = table.column_names.index(col)
+                    table = table.set_column(idx, col, pc.dictionary_encode(table[col]))
+            if writer is None:
+                schema = table.schema
+                writer = pq.ParquetWriter(parquet_path, schema, use_dictionary=True)
+            writer.write_table(table.cast(schema), row_group_size=row_group_size)
+
+            stats["n_rows_in"] += batch.num_rows
+            stats["n_rows_out"] += table.num_rows
+            stats["n_duplicates"] += cleaner.n_duplicates
+            stats["n_chunks"] += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    return stats
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_DATE_FORMAT = "%d/%m/%Y"
+
+
+def parse_date_column(values: pd.Series, fmt: str = DEFAULT_DATE_FORMAT) -> pd.Series:
+    """
+    Parse a date column to datetime64 once.
+
+    - already datetime64 -> returned as is (no re-parse)
+    - strings -> each unique string is parsed once with an explicit `fmt`
+      (orders repeat the same date on many rows), then broadcast back
+    - strings not matching `fmt` fall back to dayfirst parsing, invalid -> NaT
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+
+    codes, uniques = pd.factorize(values)
+    if len(uniques) == 0:
+        return pd.Series(pd.NaT, index=values.index, name=values.name, dtype="datetime64[ns]")
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object), format=fmt, errors="coerce")
+
+    missed = parsed.isna().to_numpy()
+    if missed.any():
+        parsed[missed] = pd.to_datetime(
+            pd.Series(uniques[missed], dtype=object).astype(str),
+            dayfirst=True,
+            errors="coerce",
+            format="mixed",
+        ).to_numpy()
+
+    # code -1 (NaN) -> NaT
+    result = parsed.to_numpy(dtype="datetime64[ns]").take(codes, mode="clip")
+    result[codes < 0] = np.datetime64("NaT")
+    return pd.Series(result, index=values.index, name=values.name)
+
+
+def parse_dates(df: pd.DataFrame, cols: list, fmt: str = DEFAULT_DATE_FORMAT) -> pd.DataFrame:
+    """
+    Parse the given date columns in place (columns missing from df are skipped).
+    """
+    for col in cols:
+        if col in df.columns:
+            df[col] = parse_date_column(df[col], fmt=fmt)
+    return df
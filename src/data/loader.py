@@ -1,19 +1,159 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.parquet as pq
 
+from src.data.dates import DEFAULT_DATE_FORMAT
+from src.data.schema import DEFAULT_CATEGORICAL, RAW_COLUMN_TYPES
 
-def load_csv(path: str) -> pd.DataFrame:
+
+def _csv_options(block_size_mb: int, column_types: dict):
+    read_options = pa_csv.ReadOptions(use_threads=True, block_size=block_size_mb * 1024 ** 2)
+    convert_options = pa_csv.ConvertOptions(column_types=column_types)
+    return read_options, convert_options
+
+
+def load_csv(path: str, engine: str = "pyarrow", block_size_mb: int = 16,
+             column_types: dict = None) -> pd.DataFrame:
     """
     Load raw csv dataset
+
+    - engine="pyarrow": multi-threaded parse of block_size_mb blocks with
+      explicit column types (RAW_COLUMN_TYPES), same frame as pd.read_csv
+    - engine="pandas" : plain pd.read_csv with type inference
+    """
+    if engine == "pandas":
+        return pd.read_csv(path)
+
+    read_options, convert_options = _csv_options(block_size_mb, column_types or RAW_COLUMN_TYPES)
+    table = pa_csv.read_csv(path, read_options=read_options, convert_options=convert_options)
+    return table.to_pandas()
+
+
+def csv_to_parquet(
+    csv_path: str,
+    parquet_path: str,
+    date_cols: list = ("Order Date", "Ship Date"),
+    date_format: str = DEFAULT_DATE_FORMAT,
+    categorical: list = None,
+    block_size_mb: int = 16,
+    row_group_size: int = 100_000,
+) -> dict:
     """
-    df = pd.read_csv(path)
-    return df
+    Stream a large CSV straight into compact parquet without building a
+    pandas frame: each parsed block gets its dates converted to timestamps
+    and high-repetition strings dictionary-encoded, then is appended to the
+    parquet file. Memory stays around a few blocks.
 
+    Dates not matching date_format become null.
+    Returns: {"n_rows", "n_batches"}
+    """
+    if categorical is None:
+        categorical = DEFAULT_CATEGORICAL
+    read_options, convert_options = _csv_options(block_size_mb, RAW_COLUMN_TYPES)
+    reader = pa_csv.open_csv(csv_path, read_options=read_options, convert_options=convert_options)
+
+    writer, n_rows, n_batches = None, 0, 0
+    try:
+        for batch in reader:
+            columns = []
+            for name, column in zip(batch.schema.names, batch.columns):
+                if name in date_cols:
+                    column = pc.strptime(column, format=date_format, unit="ns", error_is_null=True)
+                elif name in categorical:
+                    column = pc.dictionary_encode(column)
+                columns.append(column)
+            table = pa.Table.from_arrays(columns, names=batch.schema.names)
+            if writer is None:
+                writer = pq.ParquetWriter(parquet_path, table.schema, use_dictionary=True)
+            writer.write_table(table, row_group_size=row_group_size)
+            n_rows += table.num_rows
+            n_batches += 1
+    finally:
+        if writer is not None:
+            writer.close()
+    return {"n_rows": n_rows, "n_batches": n_batches}
+
+
+def parquet_columns(path: str) -> list:
+    """
+    Column names of a parquet file (read from the footer only)
+    """
+    return pq.read_schema(path).names
 
-def basic_info(df: pd.DataFrame):
+
+def iter_parquet(path: str, columns: list = None, batch_size: int = 100_000):
+    """
+    Yield a parquet file as pandas frames of at most batch_size rows
+    (row group by row group), so only one batch is decoded at a time.
+    """
+    for batch in pq.ParquetFile(path).iter_batches(batch_size=batch_size, columns=columns):
+        yield batch.to_pandas()
+
+
+def _build_filters(date_range=None, filters=None, date_col: str = "Order Date") -> list:
+    """
+    Translate date_range / {col: values} into pyarrow filter tuples (AND-ed).
+    """
+    expr = []
+    if date_range:
+        start, end = date_range
+        if start is not None:
+            expr.append((date_col, ">=", pd.Timestamp(start)))
+        if end is not None:
+            expr.append((date_col, "<=", pd.Timestamp(end)))
+    for col, values in (filters or {}).items():
+        if isinstance(values, (list, tuple, set)):
+            expr.append((col, "in", list(values)))
+        else:
+            expr.append((col, "==", values))
+    return expr
+
+
+def load_processed(
+    path: str,
+    columns: list = None,
+    date_range=None,
+    filters: dict = None,
+    memory_map: bool = False,
+    date_col: str = "Order Date",
+) -> pd.DataFrame:
+    """
+    Load a processed parquet file reading only what the stage needs
+
+    - columns    : projection, only these columns are decoded (None = all)
+    - date_range : (start, end) inclusive on date_col, pushed down to the
+                   reader (row groups outside the range are skipped via stats)
+    - filters    : {col: value | [values]}, e.g. {"Region": ["West"]}
+    - memory_map : memory-map the file instead of reading it into a buffer
+
+    Filter columns do not need to be part of `columns`.
+    Date filters require a datetime64 date_col (see DataCleaner.parse_dates).
+    """
+    expr = _build_filters(date_range, filters, date_col)
+    table = pq.read_table(
+        path,
+        columns=columns,
+        filters=expr or None,
+        memory_map=memory_map,
+    )
+    return table.to_pandas()
+
+
+def basic_info(df: pd.DataFrame, diagnostics: bool = False, sample_rows: int = 10_000):
     """
     Print basic info for quick EDA
+
+    Shape/columns always; missing values and head only with diagnostics=True,
+    computed on a random sample of sample_rows rows for large frames.
     """
     print("Shape:", df.shape)
     print("\nColumns:", df.columns.tolist())
-    print("\nMissing values:\n", df.isna().sum())
+    if not diagnostics:
+        return
+
+    sample = df.sample(sample_rows, random_state=0) if len(df) > sample_rows else df
+    label = f" (sample {len(sample)} rows)" if len(sample) < len(df) else ""
+    print(f"\nMissing values{label}:\n", sample.isna().sum())
     print("\nHead:\n", df.head())
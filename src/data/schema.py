@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+# explicit column types of the raw Superstore CSV (no type inference on read);
+# dates stay strings here and are parsed with the configured format
+RAW_COLUMN_TYPES = {
+    "Row ID": pa.int64(),
+    "Order ID": pa.string(),
+    "Order Date": pa.string(),
+    "Ship Date": pa.string(),
+    "Ship Mode": pa.string(),
+    "Customer ID": pa.string(),
+    "Customer Name": pa.string(),
+    "Segment": pa.string(),
+    "Country": pa.string(),
+    "City": pa.string(),
+    "State": pa.string(),
+    "Postal Code": pa.float64(),
+    "Region": pa.string(),
+    "Product ID": pa.string(),
+    "Category": pa.string(),
+    "Sub-Category": pa.string(),
+    "Product Name": pa.string(),
+    "Sales": pa.float64(),
+}
+
+# per-column fill values for DataCleaner.fill_missing (others use its default)
+DEFAULT_FILL_VALUES = {
+    "Postal Code": 0,
+}
+
+# high-repetition string columns of the Superstore dataset
+DEFAULT_CATEGORICAL = [
+    "Ship Mode",
+    "Customer Name",
+    "Segment",
+    "Country",
+    "City",
+    "State",
+    "Region",
+    "Category",
+    "Sub-Category",
+    "Product Name",
+]
+
+
+def _downcast_numeric(s: pd.Series) -> pd.Series:
+    """
+    Lossless numeric downcast:
+    - int   -> smallest int type holding min/max
+    - float -> int if every value is integral (e.g. Postal Code after fillna),
+               else float32 only if the round trip is exact, else unchanged
+    """
+    if pd.api.types.is_integer_dtype(s):
+        return pd.to_numeric(s, downcast="integer")
+
+    values = s.to_numpy()
+    if np.isnan(values).any():
+        return s
+    if np.array_equal(values, np.round(values)):
+        return pd.to_numeric(s, downcast="integer")
+    as_f32 = values.astype(np.float32)
+    if np.array_equal(as_f32.astype(np.float64), values):
+        return pd.Series(as_f32, index=s.index, name=s.name)
+    return s
+
+
+def apply_schema(df: pd.DataFrame, categorical: list = None, downcast: bool = True) -> pd.DataFrame:
+    """
+    Cast columns in place:
+    - `categorical` string columns -> category (dictionary-encoded in parquet)
+    - numeric columns -> lossless downcast
+    """
+    if categorical is None:
+        categorical = DEFAULT_CATEGORICAL
+
+    for col in categorical:
+        if col not in df.columns:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            # e.g. dictionary columns from csv_to_parquet (first-seen order)
+            df[col] = df[col].cat.reorder_categories(sorted(df[col].cat.categories))
+        else:
+            df[col] = df[col].astype("category")
+
+    if downcast:
+        for col in df.columns:
+            if pd.api.types.is_numeric_dtype(df[col]) and not pd.api.types.is_bool_dtype(df[col]):
+                df[col] = _downcast_numeric(df[col])
+    return df
+
+
+def memory_usage_mb(df: pd.DataFrame) -> pd.Series:
+    """Deep memory usage per column in MB."""
+    return df.memory_usage(deep=True, index=False) / 1024 ** 2
+
+
+def memory_report(before: pd.Series, after_df: pd.DataFrame, before_dtypes: pd.Series) -> pd.DataFrame:
+    """
+    Before/after table per column (dtype + MB) plus a TOTAL row.
+    `before` / `before_dtypes` are captured before apply_schema.
+    """
+    after = memory_usage_mb(after_df)
+    report = pd.DataFrame({
+        "dtype_before": before_dtypes.astype(str),
+        "dtype_after": after_df.dtypes.astype(str),
+        "mb_before": before,
+        "mb_after": after,
+    })
+    report.loc["TOTAL"] = ["", "", before.sum(), after.sum()]
+    report["ratio"] = (report["mb_after"] / report["mb_before"]).round(3)
+    return report.round({"mb_before": 3, "mb_after": 3})
+
+
+def write_parquet(df: pd.DataFrame, path: str, row_group_size: int = 100_000,
+                  compression: str = "snappy") -> None:
+    """
+    Parquet with dictionary encoding for every column and a fixed row-group
+    size (readers can then skip/iterate row groups).
+    """
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    pq.write_table(
+        table,
+        path,
+        row_group_size=row_group_size,
+        use_dictionary=True,
+        compression=compression,
+    )
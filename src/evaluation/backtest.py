@@ -0,0 +1,180 @@
+"""
+Rolling-origin backtest – đánh giá dự báo trên nhiều mốc cắt
+============================================================
+Với mỗi mốc cắt (origin) c: train = chuỗi trước c (expanding: từ đầu,
+sliding: cửa sổ cố định), test = `horizon` kỳ sau c; tính forecast_metrics
+cho từng mô hình.
+
+ARIMA tái sử dụng trạng thái giữa các origin liên tiếp:
+- append : thêm quan sát mới vào kết quả đã fit, giữ nguyên tham số
+           (expanding; sliding dùng apply trên cửa sổ mới) – không tối ưu lại
+- warm   : fit lại với start_params = tham số của origin trước (hội tụ nhanh)
+refit_every = k → fit warm mỗi k origin, các origin còn lại append.
+Các origin được chia thành khối liên tiếp, mỗi khối (× mô hình) chạy
+song song; trong một khối trạng thái được truyền từ origin này sang origin kế.
+"""
+
+from __future__ import annotations
+
+import time
+import warnings
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed, effective_n_jobs
+
+from src.evaluation.metrics import forecast_metrics
+from src.models import forecasting
+from src.models.exp_smoothing import forecast_holt_winters
+
+WINDOWS = ("expanding", "sliding")
+
+
+def rolling_origins(n: int, horizon: int, n_origins: int = None, step: int = 1,
+                    min_train: int = 12) -> List[int]:
+    """
+    Các mốc cắt (số quan sát train) tăng dần; origin cuối = n - horizon để
+    mọi test đủ `horizon` kỳ. n_origins=None → mọi mốc từ min_train.
+    """
+    cutoffs = list(range(n - horizon, min_train - 1, -step))
+    if n_origins:
+        cutoffs = cutoffs[:n_origins]
+    if not cutoffs:
+        raise ValueError(f"Chuỗi {n} kỳ quá ngắn cho horizon={horizon}, min_train={min_train}")
+    return cutoffs[::-1]
+
+
+def _fit_arima(train: pd.Series, state, order: tuple, seasonal_order: tuple, refit: bool,
+               window: str, new_obs: pd.Series):
+    """Fit ARIMA cho một origin; trả về (kết quả, chế độ)."""
+    if state is None:
+        return forecasting.train_arima(train, order=order, seasonal_order=seasonal_order), "fit"
+    if refit:
+        return forecasting.train_arima(train, order=order, seasonal_order=seasonal_order,
+                                       start_params=state.params), "warm"
+    if window == "expanding":
+        return state.append(new_obs, refit=False), "append"
+    return state.apply(train, refit=False), "apply"
+
+
+def _backtest_block(series: pd.Series, cutoffs: List[int], model: str, horizon: int,
+                    window: str, window_size: int, arima_order: tuple,
+                    seasonal_order: tuple, refit_every: int, holt_winters: dict) -> list:
+    """Worker: chạy một mô hình trên một khối origin liên tiếp."""
+    rows = []
+    state, prev_cut = None, None
+    for i, cut in enumerate(cutoffs):
+        start = 0 if window == "expanding" else cut - window_size
+        train = series.iloc[start:cut]
+        test = series.iloc[cut:cut + horizon]
+
+        t0 = time.perf_counter()
+        mode, error = "fit", ""
+        try:
+            with warnings.catch_warnings():
+                warnings.simplefilter("ignore")
+                if model == "naive":
+                    pred = forecasting.naive_forecast(train, horizon)
+                elif model == "arima":
+                    refit = bool(refit_every) and i % refit_every == 0
+                    new_obs = series.iloc[prev_cut:cut] if prev_cut is not None else None
+                    state, mode = _fit_arima(train, state, arima_order, seasonal_order,
+                                             refit, window, new_obs)
+                    pred = forecasting.forecast_arima(state, horizon)
+                elif model == "holt_winters":
+                    pred = forecast_holt_winters(train, horizon, **holt_winters)
+                elif model == "prophet":
+                    df = train.rename("y").rename_axis("ds").reset_index()
+                    fitted = forecasting.train_prophet(df, date_col="ds", value_col="y")
+                    pred = forecasting.forecast_prophet(fitted, periods=horizon,
+                                                        freq=series.index.freqstr)
+                else:
+                    raise ValueError(f"Mô hình không hỗ trợ: {model}")
+                scores = forecast_metrics(test.to_numpy(), np.asarray(pred, dtype=np.float64))
+            prev_cut = cut
+        except Exception as e:
+            scores = {"mae": np.nan, "rmse": np.nan, "mape": np.nan}
+            error = f"{type(e).__name__}: {e}"
+            # lỗi → origin sau fit lại từ đầu
+            state, prev_cut = None, None
+
+        rows.append({
+            "model": model,
+            "origin": series.index[cut - 1],
+            "train_size": len(train),
+            **scores,
+            "mode": mode,
+            "seconds": round(time.perf_counter() - t0, 4),
+            "error": error,
+        })
+    return rows
+
+
+def backtest(
+    series: pd.Series,
+    models: tuple = ("naive", "arima"),
+    horizon: int = 6,
+    n_origins: int = 6,
+    step: int = 1,
+    window: str = "expanding",
+    window_size: int = None,
+    min_train: int = 12,
+    arima_order: Tuple[int, int, int] = (1, 1, 1),
+    seasonal_order: Tuple[int, int, int, int] = (0, 0, 0, 0),
+    refit_every: int = 3,
+    n_jobs: int = -1,
+    holt_winters: dict = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Rolling-origin backtest.
+
+    series      : chuỗi có index thời gian đều (freq được suy ra nếu thiếu)
+    window      : "expanding" | "sliding" (sliding: window_size kỳ, mặc định
+                  = số kỳ train của origin đầu)
+    refit_every : 0 = chỉ fit ở origin đầu mỗi khối rồi append;
+                  1 = fit warm mọi origin; k = fit warm mỗi k origin
+
+    Returns:
+        per_origin : model, origin, train_size, mae, rmse, mape, mode, seconds, error
+        summary    : theo model – trung bình mae/rmse/mape, n_origins, n_failed, seconds
+    """
+    if window not in WINDOWS:
+        raise ValueError(f"window phải thuộc {WINDOWS}")
+    if "prophet" in models and not forecasting._HAS_PROPHET:
+        warnings.warn("Chưa cài Prophet; bỏ qua mô hình prophet")
+        models = tuple(m for m in models if m != "prophet")
+
+    series = series.astype("float64")
+    if series.index.freq is None:
+        series = series.asfreq(pd.infer_freq(series.index))
+
+    cutoffs = rolling_origins(len(series), horizon, n_origins, step, min_train)
+    if window == "sliding":
+        window_size = window_size or cutoffs[0]
+        if cutoffs[0] < window_size:
+            raise ValueError(f"window_size={window_size} lớn hơn số kỳ train của origin đầu")
+
+    # khối origin liên tiếp: ít khối → nhiều warm start, nhiều khối → song song hơn
+    n_blocks = max(1, min(len(cutoffs), effective_n_jobs(n_jobs)))
+    blocks = [list(b) for b in np.array_split(cutoffs, n_blocks)]
+
+    results = Parallel(n_jobs=n_jobs, backend="loky")(
+        delayed(_backtest_block)(series, block, model, horizon, window, window_size,
+                                 tuple(arima_order), tuple(seasonal_order), refit_every,
+                                 holt_winters or {})
+        for model in models
+        for block in blocks
+    )
+    per_origin = pd.DataFrame([r for rows in results for r in rows])
+    per_origin = per_origin.sort_values(["model", "origin"]).reset_index(drop=True)
+
+    summary = per_origin.groupby("model").agg(
+        mae=("mae", "mean"),
+        rmse=("rmse", "mean"),
+        mape=("mape", "mean"),
+        n_origins=("origin", "size"),
+        n_failed=("error", lambda e: int((e != "").sum())),
+        seconds=("seconds", "sum"),
+    )
+    return per_origin, summary
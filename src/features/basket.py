@@ -1,4 +1,11 @@
+import glob
+import json
+import os
+from typing import Iterator, NamedTuple
+
+import numpy as np
 import pandas as pd
+from scipy import sparse
 
 
 # =====================================================
@@ -38,7 +45,7 @@ def build_basket_matrix(df: pd.DataFrame, item_col: str = "Product Name") -> pd.
 
     basket = (
         df
-        .groupby(["Order ID", item_col])["Sales"]
+        .groupby(["Order ID", item_col], observed=True)["Sales"]
         .sum()
         .unstack(fill_value=0)
     )
@@ -51,6 +58,267 @@ def build_basket_matrix(df: pd.DataFrame, item_col: str = "Product Name") -> pd.
     return basket
 
 
+# =====================================================
+# SPARSE FORMAT (CSR, không pivot dense)
+# =====================================================
+class SparseBasket(NamedTuple):
+    """
+    Basket matrix dạng sparse
+
+    matrix = scipy CSR bool, shape (#orders, #items)
+    orders = vocab code → Order ID   (row i  ↔ orders[i])
+    items  = vocab code → item label (col j  ↔ items[j])
+    """
+
+    matrix: sparse.csr_matrix
+    orders: pd.Index
+    items: pd.Index
+
+    def to_frame(self) -> pd.DataFrame:
+        """
+        Chuyển sang DataFrame SparseDtype(bool) (index = Order ID),
+        dùng được trực tiếp với mlxtend mà không densify.
+        """
+        frame = pd.DataFrame.sparse.from_spmatrix(
+            self.matrix.astype(np.uint8), index=self.orders, columns=self.items
+        )
+        return frame.astype(pd.SparseDtype(bool, False))
+
+
+def encode_transactions(df: pd.DataFrame, item_col: str = "Product Name") -> tuple:
+    """
+    Factorize Order ID và item_col thành mã số nguyên.
+
+    Returns: (order_codes, item_codes, orders, items)
+    Mã -1 (giá trị thiếu) được giữ nguyên để hàm gọi tự lọc.
+    """
+    order_codes, orders = pd.factorize(df["Order ID"], sort=True)
+    item_codes, items = pd.factorize(df[item_col], sort=True)
+    # cột category (schema) → uniques là Categorical; vocab giữ nhãn thường
+    orders, items = np.asarray(orders), np.asarray(items)
+    return order_codes, item_codes, pd.Index(orders, name="Order ID"), pd.Index(items, name=item_col)
+
+
+def build_basket_sparse(df: pd.DataFrame, item_col: str = "Product Name") -> SparseBasket:
+    """
+    Basket matrix dạng CSR (thay cho pivot dense của build_basket_matrix)
+
+    Cùng ngữ nghĩa với build_basket_matrix: ô = 1 khi tổng Sales của
+    (Order ID, item) > 0, nhưng bộ nhớ chỉ tỉ lệ với số cặp khác 0.
+    """
+    order_codes, item_codes, orders, items = encode_transactions(df, item_col)
+
+    valid = (order_codes >= 0) & (item_codes >= 0)
+    n_items = max(len(items), 1)
+    pair = order_codes[valid].astype(np.int64) * n_items + item_codes[valid]
+    sales = df["Sales"].to_numpy(dtype=np.float64, na_value=0.0)[valid]
+
+    # gộp các dòng trùng (Order ID, item) rồi giữ cặp có tổng Sales > 0
+    keys, inverse = np.unique(pair, return_inverse=True)
+    totals = np.bincount(inverse, weights=sales, minlength=len(keys))
+    keys = keys[totals > 0]
+
+    matrix = sparse.csr_matrix(
+        (np.ones(len(keys), dtype=bool), (keys // n_items, keys % n_items)),
+        shape=(len(orders), len(items)),
+    )
+    return SparseBasket(matrix, orders, items)
+
+
+def basket_to_csr(basket) -> tuple:
+    """
+    Chuẩn hoá mọi dạng basket về (CSR bool, items).
+
+    Nhận SparseBasket, DataFrame SparseDtype hoặc DataFrame dense 0/1
+    (có/không cột Order ID).
+    """
+    if isinstance(basket, SparseBasket):
+        return basket.matrix, basket.items
+
+    mat = basket.drop(columns=["Order ID"], errors="ignore")
+    if len(mat.columns) and all(isinstance(t, pd.SparseDtype) for t in mat.dtypes):
+        csr = mat.sparse.to_coo().tocsr().astype(bool)
+    else:
+        csr = sparse.csr_matrix(mat.to_numpy() != 0)
+    csr.eliminate_zeros()
+    return csr, pd.Index(mat.columns)
+
+
+# =====================================================
+# STREAMING / OUT-OF-CORE (CSV hoặc parquet → shards trên đĩa)
+# =====================================================
+_STREAM_COLUMNS = ["Order ID", "Sales"]
+
+
+def _estimate_row_bytes(source: str, columns: list, n_sample: int = 2000) -> float:
+    """Ước lượng số byte/dòng (pandas, deep) của các cột cần đọc."""
+    if source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        batch = next(pq.ParquetFile(source).iter_batches(batch_size=n_sample, columns=columns), None)
+        sample = batch.to_pandas() if batch is not None else pd.DataFrame(columns=columns)
+    else:
+        sample = pd.read_csv(source, usecols=columns, nrows=n_sample)
+    if sample.empty:
+        return 1.0
+    return float(sample.memory_usage(deep=True, index=False).sum()) / len(sample)
+
+
+def _iter_chunks(source: str, columns: list, chunk_rows: int) -> Iterator[pd.DataFrame]:
+    """Đọc source theo khối chunk_rows dòng (CSV: chunksize, parquet: theo row group)."""
+    if source.endswith(".parquet"):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunk_rows, columns=columns):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, usecols=columns, chunksize=chunk_rows)
+
+
+def _encode_incremental(values: pd.Series, vocab: dict) -> np.ndarray:
+    """
+    Gán mã nguyên cho values theo vocab dùng chung giữa các chunk
+    (giá trị mới nhận mã kế tiếp); NaN → -1.
+    """
+    local, uniques = pd.factorize(values)
+    mapping = np.fromiter(
+        (vocab.setdefault(u, len(vocab)) for u in uniques), dtype=np.int64, count=len(uniques)
+    )
+    return np.where(local >= 0, mapping[np.maximum(local, 0)], -1)
+
+
+def build_basket_chunked(
+    source: str,
+    out_dir: str,
+    item_col: str = "Product Name",
+    max_memory_mb: float = 256,
+    chunk_rows: int | None = None,
+) -> dict:
+    """
+    Xây basket theo từng khối, không nạp toàn bộ dữ liệu vào RAM.
+
+    source: raw CSV hoặc parquet (đọc theo row group).
+    Mỗi khối được mã hoá Order ID / item bằng vocab tăng dần rồi ghi shard
+    long-format (order_code, item_code, sales) vào out_dir/shards/. Cuối
+    cùng ghi vocab (orders.parquet, items.parquet) và meta.json.
+
+    chunk_rows mặc định suy ra từ max_memory_mb (ước lượng byte/dòng với
+    hệ số dư x4 cho bản sao trung gian) → RAM đỉnh phẳng theo kích thước
+    input; chỉ vocab tăng theo số đơn / item khác nhau.
+
+    Dùng load_basket_long / load_basket_sparse để đọc lại.
+    """
+    columns = _STREAM_COLUMNS[:1] + [item_col] + _STREAM_COLUMNS[1:]
+    if chunk_rows is None:
+        row_bytes = _estimate_row_bytes(source, columns)
+        chunk_rows = max(int(max_memory_mb * 1024 ** 2 / (4 * row_bytes)), 1000)
+
+    shard_dir = os.path.join(out_dir, "shards")
+    os.makedirs(shard_dir, exist_ok=True)
+    for old in glob.glob(os.path.join(shard_dir, "part-*.parquet")):
+        os.remove(old)
+
+    order_vocab: dict = {}
+    item_vocab: dict = {}
+    n_rows = 0
+    n_shards = 0
+
+    for chunk in _iter_chunks(source, columns, chunk_rows):
+        n_rows += len(chunk)
+        order_codes = _encode_incremental(chunk["Order ID"], order_vocab)
+        item_codes = _encode_incremental(chunk[item_col], item_vocab)
+        valid = (order_codes >= 0) & (item_codes >= 0)
+
+        shard = (
+            pd.DataFrame({
+                "order_code": order_codes[valid],
+                "item_code": item_codes[valid].astype(np.int32),
+                "sales": pd.to_numeric(chunk["Sales"], errors="coerce").fillna(0.0).to_numpy()[valid],
+            })
+            .groupby(["order_code", "item_code"], sort=False, as_index=False)["sales"]
+            .sum()
+        )
+        shard.to_parquet(os.path.join(shard_dir, f"part-{n_shards:05d}.parquet"), index=False)
+        n_shards += 1
+
+    pd.DataFrame({"Order ID": list(order_vocab)}).to_parquet(os.path.join(out_dir, "orders.parquet"), index=False)
+    pd.DataFrame({item_col: list(item_vocab)}).to_parquet(os.path.join(out_dir, "items.parquet"), index=False)
+
+    meta = {
+        "source": source,
+        "item_col": item_col,
+        "chunk_rows": chunk_rows,
+        "n_rows": n_rows,
+        "n_shards": n_shards,
+        "n_orders": len(order_vocab),
+        "n_items": len(item_vocab),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+def _read_shards(out_dir: str) -> pd.DataFrame:
+    """Gộp các shard thành bảng cặp (order_code, item_code, sales) duy nhất."""
+    parts = sorted(glob.glob(os.path.join(out_dir, "shards", "part-*.parquet")))
+    pairs = pd.concat([pd.read_parquet(p) for p in parts], ignore_index=True) if parts else (
+        pd.DataFrame({"order_code": [], "item_code": [], "sales": []})
+    )
+    # một đơn có thể nằm ở nhiều chunk → cộng dồn lại
+    return pairs.groupby(["order_code", "item_code"], as_index=False)["sales"].sum()
+
+
+def load_basket_long(out_dir: str) -> pd.DataFrame:
+    """
+    Đọc shards thành long format như build_basket_long:
+    Order ID | item_col (sort theo Order ID)
+    """
+    orders = pd.read_parquet(os.path.join(out_dir, "orders.parquet")).iloc[:, 0].to_numpy()
+    items_df = pd.read_parquet(os.path.join(out_dir, "items.parquet"))
+    item_col = items_df.columns[0]
+    pairs = _read_shards(out_dir)
+
+    basket = pd.DataFrame({
+        "Order ID": orders[pairs["order_code"].to_numpy(dtype=np.int64)],
+        item_col: items_df[item_col].to_numpy()[pairs["item_code"].to_numpy(dtype=np.int64)],
+    })
+    return basket.sort_values("Order ID").reset_index(drop=True)
+
+
+def load_basket_sparse(out_dir: str) -> SparseBasket:
+    """
+    Đọc shards thành SparseBasket, cùng kết quả với build_basket_sparse
+    (vocab được sắp lại theo nhãn, chỉ giữ cặp có tổng Sales > 0).
+    """
+    orders = pd.read_parquet(os.path.join(out_dir, "orders.parquet")).iloc[:, 0]
+    items_df = pd.read_parquet(os.path.join(out_dir, "items.parquet"))
+    items = items_df.iloc[:, 0]
+    pairs = _read_shards(out_dir)
+    pairs = pairs[pairs["sales"] > 0]
+
+    # mã theo thứ tự xuất hiện → mã theo thứ tự nhãn đã sort
+    order_sort = np.argsort(orders.to_numpy(), kind="stable")
+    item_sort = np.argsort(items.to_numpy(), kind="stable")
+    order_rank = np.empty(len(orders), dtype=np.int64)
+    order_rank[order_sort] = np.arange(len(orders))
+    item_rank = np.empty(len(items), dtype=np.int64)
+    item_rank[item_sort] = np.arange(len(items))
+
+    matrix = sparse.csr_matrix(
+        (
+            np.ones(len(pairs), dtype=bool),
+            (order_rank[pairs["order_code"].to_numpy(dtype=np.int64)],
+             item_rank[pairs["item_code"].to_numpy(dtype=np.int64)]),
+        ),
+        shape=(len(orders), len(items)),
+    )
+    return SparseBasket(
+        matrix,
+        pd.Index(orders.to_numpy()[order_sort], name="Order ID"),
+        pd.Index(items.to_numpy()[item_sort], name=items_df.columns[0]),
+    )
+
+
 # =====================================================
 # SUB-CATEGORY BASKET (dùng cho Association Rules)
 # =====================================================
@@ -1,37 +1,118 @@
+import numpy as np
 import pandas as pd
 
+from src.data.dates import parse_date_column
 
-def build_rfm(df: pd.DataFrame) -> pd.DataFrame:
+_NS_PER_DAY = 86_400 * 10**9
+
+
+def _nunique_per_group(group_codes: np.ndarray, value_codes: np.ndarray, n_groups: int) -> np.ndarray:
+    """Number of distinct values per group via sort-dedupe of (group, value) keys."""
+    keep = value_codes >= 0
+    n_values = int(value_codes.max()) + 1 if keep.any() else 1
+    keys = np.unique(group_codes[keep].astype(np.int64) * n_values + value_codes[keep])
+    return np.bincount(keys // n_values, minlength=n_groups)
+
+
+def build_rfm(df: pd.DataFrame, windows: list = None) -> pd.DataFrame:
     """
     Build RFM features:
     - Recency
     - Frequency
     - Monetary
+
+    Single pass on factorized customer codes (no frame copy, no per-group
+    Python call). `windows` (e.g. [90, 180, 365]) adds Frequency_{w}d and
+    Monetary_{w}d computed over orders in the last w days before the snapshot.
     """
 
-    df = df.copy()
+    dates = parse_date_column(df["Order Date"])
 
-    # ===== FIX DATE PARSING =====
-    df["Order Date"] = pd.to_datetime(
-        df["Order Date"],
-        dayfirst=True,
-        errors="coerce"
-    )
+    # rows with a valid date and customer
+    cust_codes, customers = pd.factorize(df["Customer ID"], sort=True)
+    dates_ns = dates.to_numpy(dtype="datetime64[ns]").view(np.int64)
+    valid = ~np.isnat(dates.to_numpy(dtype="datetime64[ns]")) & (cust_codes >= 0)
+
+    cust_codes = cust_codes[valid]
+    dates_ns = dates_ns[valid]
+    order_codes = pd.factorize(df["Order ID"])[0][valid]
+    sales = np.nan_to_num(df["Sales"].to_numpy(dtype=np.float64)[valid])
+
+    # customers whose rows all had invalid dates drop out (as in groupby after dropna)
+    present = np.bincount(cust_codes, minlength=len(customers)) > 0
+    remap = np.cumsum(present) - 1
+    cust_codes = remap[cust_codes]
+    customers = customers[present]
+    n = len(customers)
+
+    if n == 0:
+        # no valid rows (empty / all-NaT input): empty frame, same columns and dtypes
+        rfm = pd.DataFrame({
+            "Customer ID": pd.Series(dtype=object),
+            "Recency": pd.Series(dtype="int64"),
+            "Frequency": pd.Series(dtype="int64"),
+            "Monetary": pd.Series(dtype="float64"),
+        })
+        for w in windows or []:
+            rfm[f"Frequency_{w}d"] = pd.Series(dtype="int64")
+            rfm[f"Monetary_{w}d"] = pd.Series(dtype="float64")
+        return rfm
+
+    snapshot_ns = dates_ns.max() + _NS_PER_DAY
 
-    df = df.dropna(subset=["Order Date"])
+    last_ns = np.full(n, np.iinfo(np.int64).min, dtype=np.int64)
+    np.maximum.at(last_ns, cust_codes, dates_ns)
 
-    snapshot_date = df["Order Date"].max() + pd.Timedelta(days=1)
+    rfm = pd.DataFrame({
+        "Customer ID": customers,
+        "Recency": (snapshot_ns - last_ns) // _NS_PER_DAY,
+        "Frequency": _nunique_per_group(cust_codes, order_codes, n),
+        "Monetary": np.bincount(cust_codes, weights=sales, minlength=n),
+    })
 
-    rfm = (
-        df.groupby("Customer ID")
-        .agg({
-            "Order Date": lambda x: (snapshot_date - x.max()).days,
-            "Order ID": "nunique",
-            "Sales": "sum"
+    for w in windows or []:
+        in_window = dates_ns >= snapshot_ns - w * _NS_PER_DAY
+        rfm[f"Frequency_{w}d"] = _nunique_per_group(cust_codes[in_window], order_codes[in_window], n)
+        rfm[f"Monetary_{w}d"] = np.bincount(cust_codes[in_window], weights=sales[in_window], minlength=n)
+
+    return rfm
+
+
+def _order_totals(df: pd.DataFrame) -> pd.DataFrame:
+    """One row per (Customer ID, Order ID): latest Order Date and summed Sales."""
+    dates = parse_date_column(df["Order Date"])
+    keep = (dates.notna() & df["Customer ID"].notna()).to_numpy()
+    return (
+        pd.DataFrame({
+            "Customer ID": np.asarray(df["Customer ID"])[keep],
+            "Order ID": np.asarray(df["Order ID"])[keep],
+            "Order Date": dates.to_numpy()[keep],
+            "Sales": df["Sales"].to_numpy(dtype=np.float64, na_value=0.0)[keep],
         })
+        .groupby(["Customer ID", "Order ID"], sort=False, dropna=False)
+        .agg({"Order Date": "max", "Sales": "sum"})
         .reset_index()
     )
 
-    rfm.columns = ["Customer ID", "Recency", "Frequency", "Monetary"]
 
-    return rfm
+def order_totals_chunked(chunks) -> pd.DataFrame:
+    """
+    Per-order totals (Customer ID, Order ID, Order Date, Sales) over an
+    iterable of frames (e.g. iter_parquet batches); orders that span chunks
+    are merged. Memory scales with the number of orders, not rows.
+    """
+    parts = [_order_totals(chunk) for chunk in chunks]
+    if not parts:
+        return pd.DataFrame({"Customer ID": [], "Order ID": [],
+                             "Order Date": pd.to_datetime([]), "Sales": []})
+    return (
+        pd.concat(parts, ignore_index=True)
+        .groupby(["Customer ID", "Order ID"], sort=False, dropna=False)
+        .agg({"Order Date": "max", "Sales": "sum"})
+        .reset_index()
+    )
+
+
+def build_rfm_chunked(chunks, windows: list = None) -> pd.DataFrame:
+    """build_rfm without holding all rows: runs on order_totals_chunked(chunks)."""
+    return build_rfm(order_totals_chunked(chunks), windows=windows)
@@ -0,0 +1,252 @@
+"""
+Incremental RFM – state theo khách hàng cập nhật từ delta đơn hàng
+==================================================================
+Lưu cho mỗi khách hàng: ngày mua gần nhất, số đơn phân biệt, tổng chi
+tiêu; kèm sketch các cặp (Customer ID, Order ID) đã thấy (hash uint64, đã
+sort) để Frequency vẫn là số đơn *phân biệt* khi gộp delta.
+Recency được tính lại theo snapshot tại thời điểm xuất (to_rfm).
+
+Mỗi lần update chỉ tốn O(delta): mapping Customer ID → mã được giữ qua các
+lần update, khoá sketch mới thành một đoạn sort riêng (không merge lại cả
+sketch) và chỉ phần thay đổi được ghi ra đĩa (deltas/part-*.pkl). Snapshot
+state.pkl chỉ được ghi lại khi số delta đạt compact_every.
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from src.data.dates import parse_date_column
+from src.features.rfm import _NS_PER_DAY
+
+# hằng số trộn hash (golden ratio 64-bit)
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+_NO_DATE = np.iinfo(np.int64).min
+
+
+def _pair_keys(customers: pd.Series, orders: pd.Series) -> np.ndarray:
+    """Hash uint64 của cặp (customer, order) – độc lập thứ tự dòng/batch."""
+    h_cust = pd.util.hash_array(customers.astype(str).to_numpy())
+    h_order = pd.util.hash_array(orders.astype(str).to_numpy())
+    with np.errstate(over="ignore"):
+        return h_cust * _MIX + h_order
+
+
+def source_fingerprint(path: str) -> str:
+    """
+    Fingerprint rẻ của file input (kích thước + mtime, không đọc nội dung)
+    để gắn state với raw đã dựng nó; file thiếu → 'missing'.
+    """
+    if not os.path.exists(path):
+        return "missing"
+    st = os.stat(path)
+    return f"{st.st_size}:{st.st_mtime_ns}"
+
+
+def _dump(obj, path: str) -> None:
+    """joblib.dump qua file tạm + os.replace (không để lại file ghi dở)."""
+    tmp = path + ".tmp"
+    joblib.dump(obj, tmp)
+    os.replace(tmp, path)
+
+
+class RFMState:
+    """
+    State RFM persist trên đĩa:
+
+    - state_dir/state.pkl         : snapshot đầy đủ
+    - state_dir/deltas/part-*.pkl : thay đổi của từng update sau snapshot
+
+    Nội dung:
+    - customers : Customer ID theo mã nội bộ (+ dict ngược giữ trong bộ nhớ)
+    - last_ns   : ngày mua gần nhất (int64 ns)
+    - frequency : số đơn phân biệt
+    - monetary  : tổng Sales
+    - sketch    : các đoạn hash (customer, order) đã thấy, mỗi đoạn sort tăng dần
+    - max_ns    : ngày đặt hàng lớn nhất đã thấy (snapshot mặc định = +1 ngày)
+    - source    : fingerprint của input dựng state (source_fingerprint của
+                  raw), để phát hiện state cũ khi input đổi
+    """
+
+    def __init__(self, state_dir: str, source: str = None, compact_every: int = 32):
+        self.state_dir = state_dir
+        self.source = source
+        self.compact_every = compact_every
+        self.customers: list = []
+        self.last_ns = np.empty(0, dtype=np.int64)
+        self.frequency = np.empty(0, dtype=np.int64)
+        self.monetary = np.empty(0, dtype=np.float64)
+        self.sketch: list = []
+        self.max_ns = _NO_DATE
+        self._codes: dict = {}
+        self._n_deltas = 0
+
+    # ------------------------------------------------------------------
+    # Persist
+    # ------------------------------------------------------------------
+    @classmethod
+    def exists(cls, state_dir: str) -> bool:
+        return os.path.exists(os.path.join(state_dir, "state.pkl"))
+
+    def _delta_paths(self) -> list:
+        return sorted(glob.glob(os.path.join(self.state_dir, "deltas", "part-*.pkl")))
+
+    @classmethod
+    def load(cls, state_dir: str, compact_every: int = 32) -> "RFMState":
+        """Snapshot + replay các delta đã ghi sau đó."""
+        state = cls(state_dir, compact_every=compact_every)
+        snapshot = joblib.load(os.path.join(state_dir, "state.pkl"))
+        state.source = snapshot.get("source")
+        state._apply(snapshot)
+        for path in state._delta_paths():
+            state._apply(joblib.load(path))
+            state._n_deltas += 1
+        return state
+
+    def save(self) -> None:
+        """Ghi snapshot đầy đủ (sketch gộp thành một đoạn) và xoá các delta."""
+        os.makedirs(self.state_dir, exist_ok=True)
+        merged = np.sort(np.concatenate(self.sketch)) if self.sketch else np.empty(0, dtype=np.uint64)
+        self.sketch = [merged] if merged.size else []
+        _dump(
+            {
+                "customers": self.customers,
+                "codes": np.arange(len(self.customers), dtype=np.int64),
+                "last_ns": self.last_ns,
+                "frequency": self.frequency,
+                "monetary": self.monetary,
+                "keys": merged,
+                "max_ns": self.max_ns,
+                "source": self.source,
+            },
+            os.path.join(self.state_dir, "state.pkl"),
+        )
+        for path in self._delta_paths():
+            os.remove(path)
+        self._n_deltas = 0
+
+    def _persist(self, delta: dict) -> None:
+        """Ghi một delta; snapshot mới khi chưa có hoặc đủ compact_every delta."""
+        if not self.exists(self.state_dir) or self._n_deltas + 1 >= self.compact_every:
+            self.save()
+            return
+        delta_dir = os.path.join(self.state_dir, "deltas")
+        os.makedirs(delta_dir, exist_ok=True)
+        _dump(delta, os.path.join(delta_dir, f"part-{self._n_deltas:06d}.pkl"))
+        self._n_deltas += 1
+
+    # ------------------------------------------------------------------
+    # Update
+    # ------------------------------------------------------------------
+    def _contains(self, keys: np.ndarray) -> np.ndarray:
+        """keys nào đã có trong sketch (searchsorted trên từng đoạn)."""
+        seen = np.zeros(keys.shape[0], dtype=bool)
+        for part in self.sketch:
+            pos = np.minimum(np.searchsorted(part, keys), part.size - 1)
+            seen |= part[pos] == keys
+        return seen
+
+    def _apply(self, delta: dict) -> None:
+        """Gộp một delta (hoặc snapshot) đã aggregate theo mã khách hàng."""
+        for c in delta["customers"]:
+            self._codes[c] = len(self.customers)
+            self.customers.append(c)
+        grow = len(self.customers) - self.last_ns.shape[0]
+        if grow:
+            self.last_ns = np.concatenate([self.last_ns, np.full(grow, _NO_DATE)])
+            self.frequency = np.concatenate([self.frequency, np.zeros(grow, dtype=np.int64)])
+            self.monetary = np.concatenate([self.monetary, np.zeros(grow)])
+
+        codes = delta["codes"]
+        # mã trong một delta là duy nhất → gán theo chỉ số, không cần ufunc.at
+        self.last_ns[codes] = np.maximum(self.last_ns[codes], delta["last_ns"])
+        self.frequency[codes] += delta["frequency"]
+        self.monetary[codes] += delta["monetary"]
+        if delta["keys"].size:
+            self.sketch.append(delta["keys"])
+        self.max_ns = max(self.max_ns, int(delta["max_ns"]))
+
+    def update(self, df: pd.DataFrame) -> dict:
+        """
+        Gộp một batch đơn hàng vào state – O(delta): aggregate theo khách
+        hàng của batch, tra sketch bằng searchsorted, ghi một file delta.
+
+        Dòng thuộc cặp (customer, order) đã có trong sketch bị bỏ qua, nên
+        áp lại cùng một delta không làm đếm trùng (giả định mỗi đơn đến
+        đầy đủ trong một batch).
+        """
+        dates = parse_date_column(df["Order Date"]).to_numpy(dtype="datetime64[ns]")
+        valid = ~np.isnat(dates) & df["Customer ID"].notna().to_numpy()
+
+        customers = df["Customer ID"][valid]
+        keys = _pair_keys(customers, df["Order ID"][valid])
+        seen = self._contains(keys)
+        n_skipped = int(seen.sum())
+
+        keys = keys[~seen]
+        customers = customers[~seen]
+        dates_ns = dates[valid][~seen].view(np.int64)
+        sales = np.nan_to_num(df["Sales"].to_numpy(dtype=np.float64)[valid][~seen])
+
+        # mã nội bộ: khách cũ giữ mã, khách mới nối vào cuối – chỉ tra các
+        # khách khác nhau của batch trong mapping
+        local, uniques = pd.factorize(customers)
+        uniques = np.asarray(uniques, dtype=object).tolist()
+        mapped = np.fromiter((self._codes.get(c, -1) for c in uniques), dtype=np.int64, count=len(uniques))
+        is_new = mapped < 0
+        n_old = len(self.customers)
+        mapped[is_new] = n_old + np.arange(int(is_new.sum()))
+        codes = mapped[local]
+
+        new_keys, first = np.unique(keys, return_index=True)
+        touched, inverse = np.unique(codes, return_inverse=True)
+        last = np.full(len(touched), _NO_DATE, dtype=np.int64)
+        np.maximum.at(last, inverse, dates_ns)
+        delta = {
+            "customers": [c for c, new in zip(uniques, is_new) if new],
+            "codes": touched,
+            "last_ns": last,
+            "frequency": np.bincount(inverse[first], minlength=len(touched)),
+            "monetary": np.bincount(inverse, weights=sales, minlength=len(touched)),
+            "keys": new_keys,
+            "max_ns": int(dates_ns.max()) if dates_ns.size else _NO_DATE,
+        }
+        self._apply(delta)
+        if new_keys.size or not self.exists(self.state_dir):
+            self._persist(delta)
+
+        return {
+            "n_rows": int(valid.sum()),
+            "n_skipped_rows": n_skipped,
+            "n_new_orders": int(new_keys.size),
+            "n_new_customers": len(delta["customers"]),
+            "n_customers": len(self.customers),
+        }
+
+    # ------------------------------------------------------------------
+    # Xuất RFM
+    # ------------------------------------------------------------------
+    def to_rfm(self, snapshot_date=None) -> pd.DataFrame:
+        """
+        RFM cùng định dạng build_rfm (sort theo Customer ID).
+        snapshot_date=None → ngày đặt hàng lớn nhất + 1 ngày (như build_rfm);
+        truyền ngày cụ thể (vd hôm nay) để Recency trượt theo thời gian.
+        """
+        if snapshot_date is None:
+            snapshot_ns = self.max_ns + _NS_PER_DAY
+        else:
+            snapshot_ns = pd.Timestamp(snapshot_date).value
+
+        rfm = pd.DataFrame({
+            "Customer ID": self.customers,
+            "Recency": (snapshot_ns - self.last_ns) // _NS_PER_DAY,
+            "Frequency": self.frequency,
+            "Monetary": self.monetary,
+        })
+        return rfm.sort_values("Customer ID", kind="stable").reset_index(drop=True)
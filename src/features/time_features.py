@@ -1,5 +1,9 @@
+import numpy as np
 import pandas as pd
 
+from src.data.dates import parse_date_column
+from src.data.schema import write_parquet
+
 
 def build_monthly_timeseries(df: pd.DataFrame) -> pd.DataFrame:
     """
@@ -17,14 +21,11 @@ def build_monthly_timeseries(df: pd.DataFrame) -> pd.DataFrame:
         - Prophet
     """
 
-    df = df.copy()
-
-    # ===== Robust datetime parsing (FIX CRASH) =====
-    df["Order Date"] = pd.to_datetime(
-        df["Order Date"],
-        dayfirst=True,     # handle dd/mm/yyyy
-        errors="coerce"    # avoid crash
-    )
+    # ===== Datetime (already parsed by DataCleaner.parse_dates -> no-op) =====
+    df = pd.DataFrame({
+        "Order Date": parse_date_column(df["Order Date"]),
+        "Sales": df["Sales"],
+    })
 
     # drop invalid rows
     df = df.dropna(subset=["Order Date"])
@@ -44,3 +45,210 @@ def build_monthly_timeseries(df: pd.DataFrame) -> pd.DataFrame:
     ts = ts.sort_values("date").reset_index(drop=True)
 
     return ts
+
+
+def build_monthly_timeseries_chunked(chunks) -> pd.DataFrame:
+    """
+    build_monthly_timeseries over an iterable of frames (e.g. iter_parquet
+    batches): monthly sums per chunk are added up, then months without
+    sales are filled with 0 as resample does.
+    """
+    parts = [build_monthly_timeseries(chunk) for chunk in chunks]
+    if not parts:
+        return pd.DataFrame({"date": pd.to_datetime([]), "sales": []})
+    ts = pd.concat(parts, ignore_index=True).groupby("date")["sales"].sum()
+    if len(ts):
+        ts = ts.reindex(pd.date_range(ts.index.min(), ts.index.max(), freq="M"), fill_value=0.0)
+    ts = ts.rename_axis("date").reset_index()
+    return ts
+
+
+# =====================================================
+# HIERARCHICAL CUBE (Region x Category x Sub-Category, D/W/M)
+# =====================================================
+HIERARCHY = ["Region", "Category", "Sub-Category"]
+
+# key value of a rolled-up level (e.g. Region=West, Category=ALL, ...)
+ALL = "__all__"
+
+# period used for each output frequency; dates are period end (as resample)
+_PERIODS = {"D": "D", "W": "W-SUN", "M": "M"}
+
+
+def _period_end(dates: pd.Series, freq: str) -> pd.Series:
+    """Map dates to the end date of their D / W / M period."""
+    return dates.dt.to_period(_PERIODS[freq]).dt.end_time.dt.normalize()
+
+
+def _full_range(start, end, freq: str) -> pd.DatetimeIndex:
+    """All period-end dates between start and end (inclusive)."""
+    periods = pd.period_range(start, end, freq=_PERIODS[freq])
+    return periods.to_timestamp(how="end").normalize()
+
+
+def _daily_base(df: pd.DataFrame, levels: list, value_col: str, date_col: str) -> pd.DataFrame:
+    """Sum value_col per finest key x day (the only pass over raw rows)."""
+    dates = parse_date_column(df[date_col])
+    valid = dates.notna()
+    return (
+        pd.DataFrame({
+            **{k: df.loc[valid, k].astype(str) for k in levels},
+            "day": dates[valid].dt.normalize(),
+            "sales": df.loc[valid, value_col].astype("float64"),
+        })
+        .groupby(levels + ["day"], sort=False)["sales"]
+        .sum()
+        .reset_index()
+    )
+
+
+def _rollup(base: pd.DataFrame, levels: list, freqs: tuple) -> pd.DataFrame:
+    """Every level x frequency rolled up from the daily base table."""
+    # period end of each distinct day, computed once per frequency
+    days = pd.Series(base["day"].unique())
+    parts = []
+    for freq in freqs:
+        period_of_day = pd.Series(_period_end(days, freq).to_numpy(), index=days.to_numpy())
+        base["date"] = base["day"].map(period_of_day)
+        for n in range(len(levels) + 1):
+            keys = levels[:n]
+            part = base.groupby(keys + ["date"], sort=False)["sales"].sum().reset_index()
+            for k in levels[n:]:
+                part[k] = ALL
+            part["freq"] = freq
+            part["level"] = n
+            parts.append(part)
+
+    cube = pd.concat(parts, ignore_index=True)
+    cube = cube[["freq", "level"] + levels + ["date", "sales"]]
+    cube = cube.sort_values(["freq", "level"] + levels + ["date"]).reset_index(drop=True)
+    for col in ["freq"] + levels:
+        cube[col] = cube[col].astype("category")
+    cube["level"] = cube["level"].astype("int8")
+    return cube
+
+
+def build_timeseries_cube(
+    df: pd.DataFrame,
+    levels: list = None,
+    freqs: tuple = ("D", "W", "M"),
+    value_col: str = "Sales",
+    date_col: str = "Order Date",
+) -> pd.DataFrame:
+    """
+    Build every level of the hierarchy (total, Region, Region x Category,
+    Region x Category x Sub-Category) at every frequency.
+
+    The raw data is grouped once (finest keys x day); coarser levels and
+    frequencies are rolled up from that small daily table.
+
+    Output (long format, only non-empty periods):
+        freq | level | Region | Category | Sub-Category | date | sales
+    Rolled-up keys hold ALL; `level` = number of real keys (0 = total).
+    """
+    if levels is None:
+        levels = HIERARCHY
+    return _rollup(_daily_base(df, levels, value_col, date_col), levels, freqs)
+
+
+def build_timeseries_cube_chunked(
+    chunks,
+    levels: list = None,
+    freqs: tuple = ("D", "W", "M"),
+    value_col: str = "Sales",
+    date_col: str = "Order Date",
+) -> pd.DataFrame:
+    """
+    build_timeseries_cube over an iterable of frames: each chunk is reduced
+    to its daily base table, the partial tables are summed, then rolled up.
+    Memory scales with keys x days, not rows.
+    """
+    if levels is None:
+        levels = HIERARCHY
+    parts = [_daily_base(chunk, levels, value_col, date_col) for chunk in chunks]
+    base = (
+        pd.concat(parts, ignore_index=True)
+        .groupby(levels + ["day"], sort=False)["sales"]
+        .sum()
+        .reset_index()
+    )
+    return _rollup(base, levels, freqs)
+
+
+class TimeSeriesCube:
+    """
+    Slicing over a cube from build_timeseries_cube.
+
+    Rows are sorted by (freq, level, keys, date), so each series is a
+    contiguous block; an index (freq, key) -> (start, stop) makes get()
+    a dict lookup + array slice, with no re-aggregation.
+
+        cube = TimeSeriesCube(build_timeseries_cube(df))
+        cube.get("M")                          # company-wide monthly
+        cube.get("W", "West", "Technology")    # trailing levels = ALL
+        for key, ts in cube.iter_series("M", level=3): ...
+    """
+
+    def __init__(self, frame: pd.DataFrame, levels: list = None):
+        self.levels = levels or HIERARCHY
+        self.frame = frame
+        self._dates = frame["date"].to_numpy()
+        self._sales = frame["sales"].to_numpy()
+
+        key_cols = ["freq"] + self.levels
+        keys = frame[key_cols].astype(str).to_numpy()
+        change = (keys[1:] != keys[:-1]).any(axis=1)
+        starts = np.concatenate([[0], np.flatnonzero(change) + 1])
+        stops = np.concatenate([starts[1:], [len(frame)]])
+        levels_col = frame["level"].to_numpy()
+        self._index = {tuple(keys[s]): (s, e) for s, e in zip(starts, stops)}
+        self._level = {tuple(keys[s]): int(levels_col[s]) for s in starts}
+        self._bounds = {
+            freq: (frame.loc[frame["freq"] == freq, "date"].min(),
+                   frame.loc[frame["freq"] == freq, "date"].max())
+            for freq in frame["freq"].unique()
+        }
+
+    def _key(self, freq: str, key: tuple) -> tuple:
+        key = tuple(str(k) for k in key)
+        return (freq,) + key + (ALL,) * (len(self.levels) - len(key))
+
+    def series_keys(self, freq: str, level: int = None) -> list:
+        """Hierarchy keys (without freq) available at `freq` (optionally one level)."""
+        return [
+            k[1:] for k, lvl in self._level.items()
+            if k[0] == freq and (level is None or lvl == level)
+        ]
+
+    def get(self, freq: str, *key, fill: bool = True) -> pd.Series:
+        """
+        Series for one key. fill=True reindexes to every period between the
+        first and last date of the cube at this freq (missing -> 0, as resample).
+        """
+        full_key = self._key(freq, key)
+        if full_key not in self._index:
+            raise KeyError(f"Không có chuỗi {full_key}")
+        start, stop = self._index[full_key]
+        ts = pd.Series(self._sales[start:stop], index=pd.DatetimeIndex(self._dates[start:stop], name="date"),
+                       name="sales")
+        if fill:
+            ts = ts.reindex(_full_range(*self._bounds[freq], freq), fill_value=0.0)
+            ts.index.name = "date"
+        return ts
+
+    def iter_series(self, freq: str, level: int = None, fill: bool = True):
+        """Yield (key, Series) for every series at `freq` (optionally one level)."""
+        for key in self.series_keys(freq, level):
+            yield key, self.get(freq, *key, fill=fill)
+
+    def save(self, path: str, row_group_size: int = 100_000) -> None:
+        write_parquet(self.frame, path, row_group_size=row_group_size)
+
+    @classmethod
+    def load(cls, path: str, freqs: list = None, levels: list = None) -> "TimeSeriesCube":
+        """Load the parquet cube, optionally only some frequencies (pushed down)."""
+        filters = [("freq", "in", list(freqs))] if freqs else None
+        frame = pd.read_parquet(path, filters=filters)
+        if freqs:
+            frame["freq"] = frame["freq"].cat.remove_unused_categories()
+        return cls(frame.reset_index(drop=True), levels=levels)
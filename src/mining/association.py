@@ -1,30 +1,36 @@
 """
 Association Rules – Market Basket Analysis
 ===========================================
-Sử dụng mlxtend (Apriori / FP-Growth) để tìm frequent itemsets & sinh rules.
+Sử dụng mlxtend (Apriori / FP-Growth) hoặc Eclat nội bộ (tidset dạng bitset
+uint64) để tìm frequent itemsets & sinh rules.
 """
 
 from __future__ import annotations
 
+import numpy as np
 import pandas as pd
-from mlxtend.frequent_patterns import apriori, fpgrowth, association_rules
+from joblib import Parallel, delayed, effective_n_jobs
+from mlxtend.frequent_patterns import apriori, fpgrowth
+
+from src.features.basket import SparseBasket, basket_to_csr
 
 
 # ------------------------------------------------------------------
 # 1. Thống kê tổng quan basket
 # ------------------------------------------------------------------
-def basket_summary(basket_matrix: pd.DataFrame) -> dict:
+def basket_summary(basket_matrix: pd.DataFrame | SparseBasket) -> dict:
     """
-    Nhận basket matrix (Order ID × Product, 0/1)
+    Nhận basket matrix (Order ID × Product, 0/1) – dense, SparseDtype
+    hoặc SparseBasket
     Trả về dict: n_orders, n_products, sparsity
     """
-    # Bỏ cột Order ID nếu có
-    mat = basket_matrix.drop(columns=["Order ID"], errors="ignore")
+    # Bỏ cột Order ID nếu có (xử lý trong basket_to_csr)
+    mat, _ = basket_to_csr(basket_matrix)
 
     n_orders = mat.shape[0]
     n_products = mat.shape[1]
     n_cells = n_orders * n_products
-    n_ones = mat.sum().sum()
+    n_ones = mat.nnz
     sparsity = 1 - (n_ones / n_cells) if n_cells > 0 else 0.0
 
     return {
@@ -37,12 +43,13 @@ def basket_summary(basket_matrix: pd.DataFrame) -> dict:
 # ------------------------------------------------------------------
 # 2. Top sản phẩm bán chạy (theo số đơn hàng xuất hiện)
 # ------------------------------------------------------------------
-def top_products(basket_matrix: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
+def top_products(basket_matrix: pd.DataFrame | SparseBasket, top_n: int = 20) -> pd.DataFrame:
     """
     Trả DataFrame: Product Name | order_count  (sorted desc)
     """
-    mat = basket_matrix.drop(columns=["Order ID"], errors="ignore")
-    counts = mat.sum().sort_values(ascending=False).head(top_n)
+    mat, items = basket_to_csr(basket_matrix)
+    col_counts = np.asarray(mat.sum(axis=0)).ravel().astype(np.int64)
+    counts = pd.Series(col_counts, index=items).sort_values(ascending=False).head(top_n)
     df_top = counts.reset_index()
     df_top.columns = ["Product Name", "order_count"]
     return df_top
@@ -51,16 +58,45 @@ def top_products(basket_matrix: pd.DataFrame, top_n: int = 20) -> pd.DataFrame:
 # ------------------------------------------------------------------
 # 3. Tìm frequent itemsets
 # ------------------------------------------------------------------
+_ALGORITHMS = ("apriori", "fpgrowth", "eclat")
+
 def find_frequent_itemsets(
-    basket_matrix: pd.DataFrame,
+    basket_matrix: pd.DataFrame | SparseBasket,
     min_support: float = 0.02,
     algorithm: str = "fpgrowth",
+    n_jobs: int = 1,
+    n_partitions: int | None = None,
 ) -> pd.DataFrame:
     """
-    algorithm: 'apriori' hoặc 'fpgrowth'
+    algorithm: 'apriori', 'fpgrowth' hoặc 'eclat' (miner nội bộ, chạy trực
+    tiếp trên CSR nên không cần DataFrame bool của mlxtend)
+    basket_matrix: dense 0/1, DataFrame SparseDtype hoặc SparseBasket
+    (dạng sparse được đưa thẳng vào mlxtend, không densify)
+    n_jobs / n_partitions: khác 1 / None → chế độ SON song song (xem
+    son_frequent_itemsets), pass cục bộ dùng đúng `algorithm`; kết quả
+    giống hệt đường tuần tự.
     Trả về DataFrame frequent itemsets (itemsets, support)
     """
-    mat = basket_matrix.drop(columns=["Order ID"], errors="ignore").astype(bool)
+    if algorithm not in _ALGORITHMS:
+        raise ValueError(f"algorithm phải thuộc {_ALGORITHMS}")
+
+    if n_jobs != 1 or n_partitions is not None:
+        mat, items = basket_to_csr(basket_matrix)
+        return son_frequent_itemsets(
+            mat, items, min_support=min_support, n_jobs=n_jobs, n_partitions=n_partitions,
+            algorithm=algorithm,
+        )
+
+    if algorithm == "eclat":
+        mat, items = basket_to_csr(basket_matrix)
+        return eclat(mat, items, min_support=min_support)
+
+    if isinstance(basket_matrix, SparseBasket):
+        mat = basket_matrix.to_frame()
+    else:
+        mat = basket_matrix.drop(columns=["Order ID"], errors="ignore")
+        if not all(isinstance(t, pd.SparseDtype) for t in mat.dtypes):
+            mat = mat.astype(bool)
 
     if algorithm == "apriori":
         freq = apriori(mat, min_support=min_support, use_colnames=True)
@@ -71,27 +107,419 @@ def find_frequent_itemsets(
     return freq
 
 
+# ------------------------------------------------------------------
+# 3b. Eclat – vertical mining trên tidset bitset (uint64)
+# ------------------------------------------------------------------
+_POPCOUNT_U8 = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+
+def _popcount(bits: np.ndarray) -> np.ndarray:
+    """Đếm số bit 1 theo từng hàng của mảng uint64 (…, n_words)."""
+    if hasattr(np, "bitwise_count"):  # numpy >= 2.0
+        return np.bitwise_count(bits).sum(axis=-1, dtype=np.int64)
+    u8 = bits.view(np.uint8).reshape(*bits.shape[:-1], -1)
+    return _POPCOUNT_U8[u8].sum(axis=-1, dtype=np.int64)
+
+
+def _min_count(min_support: float, n_transactions: int) -> int:
+    """
+    Số đơn tối thiểu c sao cho c / n >= min_support (cùng phép so sánh
+    float với mlxtend), tối thiểu 1.
+    """
+    c = int(np.ceil(min_support * n_transactions))
+    while c > 0 and (c - 1) / n_transactions >= min_support:
+        c -= 1
+    while c / n_transactions < min_support:
+        c += 1
+    return max(c, 1)
+
+
+def _pack_tidsets(mat, columns: np.ndarray) -> np.ndarray:
+    """
+    Tidset của các cột (items) dưới dạng bitset: shape (len(columns), n_words),
+    bit r của hàng j = 1 khi đơn r chứa item columns[j].
+    """
+    n_words = max((mat.shape[0] + 63) // 64, 1)
+    coo = mat[:, columns].tocoo()
+    rows = coo.row.astype(np.int64)
+    bits = np.zeros(len(columns) * n_words, dtype=np.uint64)
+    # mỗi (item, đơn) là duy nhất nên cộng dồn các bit không bị nhớ
+    np.add.at(
+        bits,
+        coo.col.astype(np.int64) * n_words + (rows >> 6),
+        np.left_shift(np.uint64(1), (rows & 63).astype(np.uint64)),
+    )
+    return bits.reshape(len(columns), n_words)
+
+
+def _eclat_codes(mat, min_count: int, max_len: int | None = None) -> tuple:
+    """
+    Eclat DFS trên CSR bool. Trả về (list itemset dạng tuple mã cột, mảng count).
+    """
+    item_counts = np.asarray(mat.sum(axis=0)).ravel().astype(np.int64)
+    frequent = np.flatnonzero(item_counts >= min_count)
+    # duyệt item theo support tăng dần → các phép giao phía sau nhỏ hơn
+    frequent = frequent[np.argsort(item_counts[frequent], kind="stable")]
+
+    itemsets: list = []
+    counts: list = []
+
+    def _extend(prefix: tuple, bits: np.ndarray, codes: np.ndarray, cnts: np.ndarray):
+        for i in range(len(codes)):
+            itemset = prefix + (int(codes[i]),)
+            itemsets.append(itemset)
+            counts.append(int(cnts[i]))
+            if i + 1 == len(codes) or (max_len is not None and len(itemset) >= max_len):
+                continue
+            inter = bits[i] & bits[i + 1:]
+            c = _popcount(inter)
+            keep = c >= min_count
+            if keep.any():
+                _extend(itemset, inter[keep], codes[i + 1:][keep], c[keep])
+
+    if len(frequent):
+        _extend((), _pack_tidsets(mat, frequent), frequent, item_counts[frequent])
+    return itemsets, np.asarray(counts, dtype=np.int64)
+
+
+def _itemsets_frame(itemsets: list, counts: np.ndarray, items: pd.Index, n_transactions: int) -> pd.DataFrame:
+    """
+    Đóng gói kết quả mã số nguyên thành DataFrame (support, itemsets) giống
+    mlxtend; thứ tự ổn định: support giảm dần, rồi độ dài, rồi mã item.
+    """
+    labels = list(items)
+    keys = [tuple(sorted(s)) for s in itemsets]
+    order = sorted(range(len(keys)), key=lambda i: (-counts[i], len(keys[i]), keys[i]))
+    freq = pd.DataFrame({
+        "support": [counts[i] / n_transactions for i in order],
+        "itemsets": [frozenset([labels[c] for c in keys[i]]) for i in order],
+    })
+    return freq
+
+
+def eclat(
+    mat,
+    items: pd.Index,
+    min_support: float = 0.02,
+    max_len: int | None = None,
+) -> pd.DataFrame:
+    """
+    Eclat nội bộ trên basket CSR (đơn × item).
+
+    Mỗi item giữ tidset dạng bitset uint64; support của itemset mở rộng là
+    popcount của phép AND – toàn bộ lớp tương đương được giao cùng lúc
+    bằng NumPy. Trả về DataFrame (support, itemsets) như mlxtend.
+    """
+    n = mat.shape[0]
+    if n == 0:
+        return pd.DataFrame({"support": [], "itemsets": []})
+    itemsets, counts = _eclat_codes(mat, _min_count(min_support, n), max_len=max_len)
+    return _itemsets_frame(itemsets, counts, items, n)
+
+
+# ------------------------------------------------------------------
+# 3c. SON – chia đơn hàng thành partition, mine song song 2 pass
+# ------------------------------------------------------------------
+def _count_itemsets(mat, itemsets: list, block: int = 4096) -> np.ndarray:
+    """
+    Đếm số đơn (hàng của mat) chứa từng itemset (tuple mã cột).
+    Giao các tidset bitset theo lô cùng độ dài để giới hạn bộ nhớ.
+    """
+    counts = np.zeros(len(itemsets), dtype=np.int64)
+    if not itemsets or mat.shape[0] == 0:
+        return counts
+
+    columns = np.unique(np.fromiter((c for s in itemsets for c in s), dtype=np.int64))
+    bits = _pack_tidsets(mat, columns)
+
+    by_len: dict = {}
+    for pos, s in enumerate(itemsets):
+        by_len.setdefault(len(s), []).append(pos)
+
+    for size, positions in by_len.items():
+        positions = np.asarray(positions)
+        codes = np.asarray([itemsets[p] for p in positions], dtype=np.int64).reshape(len(positions), size)
+        local = np.searchsorted(columns, codes)
+        for start in range(0, len(positions), block):
+            rows = local[start:start + block]
+            inter = bits[rows[:, 0]].copy()
+            for j in range(1, size):
+                inter &= bits[rows[:, j]]
+            counts[positions[start:start + block]] = _popcount(inter)
+    return counts
+
+
+# ngưỡng count cục bộ tối thiểu của SON: partition nhỏ hơn mức này bị gộp
+# (ngưỡng 1 biến mọi itemset của partition thành ứng viên)
+_SON_MIN_LOCAL_COUNT = 2
+
+
+def _son_local(mat, min_support: float, algorithm: str = "eclat") -> set:
+    """Pass 1: itemset phổ biến cục bộ trong một partition (theo `algorithm`)."""
+    # floor (không phải ceil) để không bao giờ bỏ sót ứng viên vì làm tròn
+    local_min = max(int(np.floor(min_support * mat.shape[0])), 1)
+    if algorithm == "eclat":
+        itemsets, _ = _eclat_codes(mat, local_min)
+        return {tuple(sorted(s)) for s in itemsets}
+
+    # mlxtend trên partition: cột = mã item, ngưỡng tương đương count >= local_min
+    frame = pd.DataFrame.sparse.from_spmatrix(
+        mat.astype(np.uint8), columns=range(mat.shape[1])
+    ).astype(pd.SparseDtype(bool, False))
+    local_support = (local_min - 0.5) / mat.shape[0]
+    miner = apriori if algorithm == "apriori" else fpgrowth
+    freq = miner(frame, min_support=local_support, use_colnames=True)
+    return {tuple(sorted(int(c) for c in s)) for s in freq["itemsets"]}
+
+
+def _son_partitions(n: int, min_support: float, requested: int) -> int:
+    """Số partition sao cho mỗi partition có ngưỡng count cục bộ >= _SON_MIN_LOCAL_COUNT."""
+    min_rows = int(np.ceil(_SON_MIN_LOCAL_COUNT / min_support)) if min_support > 0 else n
+    return max(1, min(requested, n // max(min_rows, 1)))
+
+
+def son_frequent_itemsets(
+    mat,
+    items: pd.Index,
+    min_support: float = 0.02,
+    n_jobs: int = -1,
+    n_partitions: int | None = None,
+    algorithm: str = "eclat",
+) -> pd.DataFrame:
+    """
+    Thuật toán SON (Savasere–Omiecinski–Navathe) trên basket CSR.
+
+    - Pass 1: chia các đơn (hàng, đã sort theo Order ID) thành n_partitions
+      khối liên tiếp, mine cục bộ song song bằng `algorithm` → hợp ứng viên.
+      Số partition bị giảm khi cần để mỗi khối có ít nhất
+      ceil(_SON_MIN_LOCAL_COUNT / min_support) đơn.
+      Itemset phổ biến toàn cục luôn phổ biến trong ít nhất một khối.
+    - Pass 2: đếm support toàn cục của các ứng viên song song trên từng
+      khối, cộng lại và lọc theo cùng ngưỡng với đường tuần tự.
+    """
+    n = mat.shape[0]
+    if n == 0:
+        return pd.DataFrame({"support": [], "itemsets": []})
+
+    workers = effective_n_jobs(n_jobs)
+    n_parts = _son_partitions(n, min_support, n_partitions or workers)
+    bounds = np.linspace(0, n, n_parts + 1, dtype=np.int64)
+    chunks = [mat[bounds[i]:bounds[i + 1]] for i in range(n_parts)]
+
+    with Parallel(n_jobs=workers) as parallel:
+        local = parallel(delayed(_son_local)(chunk, min_support, algorithm) for chunk in chunks)
+        candidates = sorted(set().union(*local))
+        partial = parallel(delayed(_count_itemsets)(chunk, candidates) for chunk in chunks)
+
+    counts = np.sum(partial, axis=0) if candidates else np.zeros(0, dtype=np.int64)
+    keep = np.flatnonzero(counts >= _min_count(min_support, n))
+    return _itemsets_frame([candidates[i] for i in keep], counts[keep], items, n)
+
+
 
 # ------------------------------------------------------------------
 # 4. Sinh association rules
 # ------------------------------------------------------------------
+# dung sai khi so ngưỡng: support là count / n nên tỉ số "đúng bằng" ngưỡng
+# (vd 6/30 = 0.2) không bị loại vì sai số làm tròn
+_EPS = 1e-12
+
+_RULE_COLUMNS = [
+    "antecedents", "consequents", "antecedent support", "consequent support",
+    "support", "confidence", "lift", "representativity", "leverage",
+    "conviction", "zhangs_metric", "jaccard", "certainty", "kulczynski",
+]
+
+
+class _ItemsetIndex:
+    """
+    Tra support theo itemset mã số nguyên (mỗi độ dài một bảng).
+
+    Khi n_items ** k vừa int64, mỗi itemset đã sort được mã hoá thành một
+    khoá mixed-radix và tra bằng searchsorted trên mảng khoá đã sort;
+    ngược lại dùng dict (hash) theo tuple.
+    """
+
+    def __init__(self, n_items: int):
+        self.base = max(n_items, 1)
+        self.tables: dict = {}
+
+    def _fits(self, k: int) -> bool:
+        return k * np.log2(self.base) < 62
+
+    def _keys(self, rows: np.ndarray) -> np.ndarray:
+        keys = np.zeros(len(rows), dtype=np.int64)
+        for j in range(rows.shape[1]):
+            keys = keys * self.base + rows[:, j]
+        return keys
+
+    def add(self, rows: np.ndarray, supports: np.ndarray) -> None:
+        k = rows.shape[1]
+        if self._fits(k):
+            keys = self._keys(rows)
+            order = np.argsort(keys)
+            self.tables[k] = (keys[order], supports[order])
+        else:
+            self.tables[k] = dict(zip(map(tuple, rows.tolist()), supports.tolist()))
+
+    def lookup(self, rows: np.ndarray) -> np.ndarray:
+        """Support của từng hàng (NaN nếu itemset không có trong bảng)."""
+        k = rows.shape[1]
+        table = self.tables.get(k)
+        if table is None:
+            return np.full(len(rows), np.nan)
+        if isinstance(table, dict):
+            return np.fromiter(
+                (table.get(t, np.nan) for t in map(tuple, rows.tolist())), dtype=float, count=len(rows)
+            )
+        keys, supports = table
+        query = self._keys(rows)
+        pos = np.minimum(np.searchsorted(keys, query), len(keys) - 1)
+        return np.where(keys[pos] == query, supports[pos], np.nan)
+
+
+def _encode_itemsets(freq_itemsets: pd.DataFrame) -> tuple:
+    """
+    frozenset nhãn → mảng mã (sorted) theo từng độ dài.
+    Returns: (labels, {k: (rows (m, k), supports (m,))})
+    """
+    itemsets = freq_itemsets["itemsets"].tolist()
+    labels = sorted(set().union(*itemsets), key=str)
+    vocab = {label: code for code, label in enumerate(labels)}
+    supports = freq_itemsets["support"].to_numpy(dtype=float)
+
+    groups: dict = {}
+    for pos, s in enumerate(itemsets):
+        groups.setdefault(len(s), []).append(pos)
+
+    by_len = {}
+    for k, positions in groups.items():
+        rows = np.sort(
+            np.asarray([[vocab[x] for x in itemsets[p]] for p in positions], dtype=np.int64).reshape(-1, k),
+            axis=1,
+        )
+        by_len[k] = (rows, supports[positions])
+    return labels, by_len
+
+
 def generate_rules(
     freq_itemsets: pd.DataFrame,
     min_confidence: float = 0.4,
     min_lift: float = 1.0,
+    top_n: int | None = None,
 ) -> pd.DataFrame:
     """
     Sinh rules từ frequent itemsets, lọc theo confidence & lift.
+
+    Itemsets được mã hoá thành mảng số nguyên; với mỗi độ dài k và mỗi
+    cách tách (antecedent | consequent), support các vế được tra bằng
+    _ItemsetIndex và toàn bộ metric tính bằng NumPy. Lọc min_confidence /
+    min_lift và chọn top_n (theo lift) diễn ra trước khi tạo rule, chỉ
+    các rule giữ lại mới được decode về frozenset tên sản phẩm.
+    Cột output giống mlxtend association_rules.
     """
     if freq_itemsets.empty:
         return pd.DataFrame()
 
-    rules = association_rules(
-        freq_itemsets, metric="confidence", min_threshold=min_confidence, num_itemsets=len(freq_itemsets)
-    )
-    rules = rules[rules["lift"] >= min_lift]
-    rules.sort_values("lift", ascending=False, inplace=True)
-    rules.reset_index(drop=True, inplace=True)
+    labels, by_len = _encode_itemsets(freq_itemsets)
+    index = _ItemsetIndex(len(labels))
+    for rows, supports in by_len.values():
+        index.add(rows, supports)
+
+    fields = ("k", "row", "mask", "sAC", "sA", "sC")
+    parts: list = []   # mỗi phần: dict fields → mảng, theo thứ tự sinh
+    n_pending = 0
+    lift_floor = -np.inf
+
+    def _collect() -> dict:
+        return {f: np.concatenate([p[f] for p in parts]) for f in fields}
+
+    for k, (rows, sAC_k) in by_len.items():
+        if k < 2:
+            continue
+        for mask in range(1, 2 ** k - 1):
+            ante_pos = [j for j in range(k) if mask >> j & 1]
+            cons_pos = [j for j in range(k) if not mask >> j & 1]
+            sA_k = index.lookup(rows[:, ante_pos])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                conf = sAC_k / sA_k
+            keep = conf >= min_confidence - _EPS
+            if not keep.any():
+                continue
+            sC_k = index.lookup(rows[:, cons_pos])
+            with np.errstate(divide="ignore", invalid="ignore"):
+                lift = conf / sC_k
+            keep &= (lift >= min_lift - _EPS) & (lift >= lift_floor)
+            idx = np.flatnonzero(keep)
+            if not len(idx):
+                continue
+            parts.append({
+                "k": np.full(len(idx), k), "row": idx, "mask": np.full(len(idx), mask),
+                "sAC": sAC_k[idx], "sA": sA_k[idx], "sC": sC_k[idx],
+            })
+            n_pending += len(idx)
+
+            # top_n: gộp định kỳ, chỉ giữ top_n rule (giữ thứ tự sinh) và
+            # nâng ngưỡng lift để các rule thua chắc chắn bị bỏ từ đầu
+            if top_n is not None and n_pending > max(4 * top_n, 65536):
+                merged = _collect()
+                lift_all = merged["sAC"] / merged["sA"] / merged["sC"]
+                best = np.sort(np.argsort(-lift_all, kind="stable")[:top_n])
+                parts = [{f: merged[f][best] for f in fields}]
+                n_pending = len(best)
+                if len(best) == top_n:
+                    lift_floor = lift_all[best].min()
+
+    if not parts:
+        return pd.DataFrame(columns=_RULE_COLUMNS)
+
+    cand = _collect()
+    sAC, sA, sC = cand["sAC"], cand["sA"], cand["sC"]
+    lift = sAC / sA / sC
+
+    # sort theo lift giảm dần (ổn định) và cắt top_n trước khi decode
+    order = np.argsort(-lift, kind="stable")
+    if top_n is not None:
+        order = order[:top_n]
+
+    antecedents, consequents = [], []
+    for r in order:
+        mask = cand["mask"][r]
+        row = by_len[cand["k"][r]][0][cand["row"][r]]
+        antecedents.append(frozenset(labels[c] for j, c in enumerate(row) if mask >> j & 1))
+        consequents.append(frozenset(labels[c] for j, c in enumerate(row) if not mask >> j & 1))
+
+    return _rules_frame(antecedents, consequents, sA[order], sC[order], sAC[order])
+
+
+def _rules_frame(antecedents: list, consequents: list, sA, sC, sAC) -> pd.DataFrame:
+    """DataFrame rules với đủ metric như mlxtend association_rules."""
+    sA, sC, sAC = (np.asarray(a, dtype=float) for a in (sA, sC, sAC))
+    conf = sAC / sA
+    lift = conf / sC
+    leverage = sAC - sA * sC
+    with np.errstate(divide="ignore", invalid="ignore"):
+        conviction = np.where(conf < 1.0, (1.0 - sC) / (1.0 - conf), np.inf)
+        zhang_den = np.maximum(sAC * (1 - sA), sA * (sC - sAC))
+        zhangs = np.where(zhang_den == 0, 0, leverage / zhang_den)
+        certainty = np.where(sC == 1, 0, (conf - sC) / (1 - sC))
+
+    rules = pd.DataFrame({
+        "antecedents": antecedents,
+        "consequents": consequents,
+        "antecedent support": sA,
+        "consequent support": sC,
+        "support": sAC,
+        "confidence": conf,
+        "lift": lift,
+        "representativity": np.ones(len(sAC)),
+        "leverage": leverage,
+        "conviction": conviction,
+        "zhangs_metric": zhangs,
+        "jaccard": sAC / (sA + sC - sAC),
+        "certainty": certainty,
+        "kulczynski": (conf + sAC / sC) / 2,
+    }, columns=_RULE_COLUMNS)
     return rules
 
 
@@ -105,6 +533,8 @@ def filter_top_rules(
 ) -> pd.DataFrame:
     """
     Lọc rules có lift >= min_lift và lấy top_n rules theo lift giảm dần.
+    (Khi sinh rules mới, truyền min_lift / top_n thẳng vào generate_rules
+    để rule bị loại không bao giờ được tạo.)
     """
     filtered = rules[rules["lift"] >= min_lift].copy()
     filtered.sort_values("lift", ascending=False, inplace=True)
@@ -121,12 +551,171 @@ def rules_to_csv_friendly(rules: pd.DataFrame) -> pd.DataFrame:
     để export CSV dễ đọc.
     """
     out = rules.copy()
-    if "antecedents" in out.columns:
-        out["antecedents"] = out["antecedents"].apply(
-            lambda s: ", ".join(sorted(s))
-        )
-    if "consequents" in out.columns:
-        out["consequents"] = out["consequents"].apply(
-            lambda s: ", ".join(sorted(s))
-        )
+    for col in ("antecedents", "consequents"):
+        if col in out.columns:
+            # mỗi frozenset khác nhau chỉ join một lần
+            codes, uniques = pd.factorize(out[col])
+            names = np.asarray([", ".join(sorted(s)) for s in uniques], dtype=object)
+            out[col] = names[codes]
     return out
+
+
+# ------------------------------------------------------------------
+# 7. Top-K rules (không cần min_support)
+# ------------------------------------------------------------------
+TOP_K_METRICS = ("lift", "confidence", "support")
+
+
+def top_k_rules(
+    basket_matrix: pd.DataFrame | SparseBasket,
+    k: int = 30,
+    metric: str = "lift",
+    min_confidence: float = 0.1,
+    min_lift: float = 1.0,
+    max_len: int | None = None,
+    min_count: int = 2,
+) -> pd.DataFrame:
+    """
+    Khai thác K rules tốt nhất theo `metric` kiểu TopKRules, không cần đặt
+    min_support.
+
+    - Khởi tạo mọi rule {i} → {j} từ ma trận đồng xuất hiện (A^T A); mỗi
+      rule được mở rộng trái (thêm item vào antecedent) hoặc phải (thêm vào
+      consequent) bằng phép AND tidset bitset trên mọi item cùng lúc.
+    - Heap top-K xếp theo (metric, support). Mỗi nút X → Y có cận trên của
+      metric cho chính nó và mọi rule mở rộng từ nó (support chỉ giảm khi
+      mở rộng):
+        support    : s(XY)
+        confidence : 1
+        lift       : n / s(Y) nếu chỉ còn mở rộng trái (Y cố định),
+                     ngược lại n / min_count
+      Khi heap đầy, nút có (cận trên, support) không vượt rule thứ K bị cắt;
+      hàng đợi duyệt best-first theo cận trên nên dừng khi đầu hàng đợi bị
+      cắt. Với metric support đây chính là ngưỡng support nội bộ tự nâng.
+    - min_count: số đơn tối thiểu của một rule. Lift / confidence không đơn
+      điệu theo support nên sàn này chặn nhánh hiếm (rule từ 1 đơn có lift
+      cực đại nhưng vô nghĩa); item có count < min_count bị bỏ từ đầu.
+
+    Bộ nhớ: bitset chỉ pack cho item có count >= min_count, cặp khởi tạo
+    duyệt thẳng trên mảng COO của A^T A, hàng đợi chỉ giữ mã item (tidset
+    được AND lại khi lấy nút ra).
+    Output sắp xếp theo `metric` giảm dần (hoà → support cao hơn trước).
+    """
+    import heapq
+
+    if metric not in TOP_K_METRICS:
+        raise ValueError(f"metric phải thuộc {TOP_K_METRICS}")
+
+    mat, items = basket_to_csr(basket_matrix)
+    n = mat.shape[0]
+    min_count = max(int(min_count), 1)
+    if n == 0 or k <= 0:
+        return pd.DataFrame(columns=_RULE_COLUMNS)
+
+    item_counts = np.asarray(mat.sum(axis=0)).ravel().astype(np.int64)
+    cols = np.flatnonzero(item_counts >= min_count)
+    if len(cols) < 2:
+        return pd.DataFrame(columns=_RULE_COLUMNS)
+    bits = _pack_tidsets(mat, cols)
+    counts = item_counts[cols]
+
+    def _value(sup_xy, sup_x, sup_y):
+        if metric == "support":
+            return sup_xy / n
+        if metric == "confidence":
+            return sup_xy / sup_x
+        return sup_xy * n / (sup_x * sup_y)
+
+    def _bound(sup_xy, sup_y, right_ok):
+        if metric == "support":
+            return sup_xy / n
+        if metric == "confidence":
+            return 1.0
+        return n / (min_count if right_ok else sup_y)
+
+    top: list = []        # min-heap (value, sup_XY, -seq, X, Y, sup_X, sup_Y)
+    seq = 0
+
+    def _beaten(value, sup_xy) -> bool:
+        """(value, support) không vượt được rule thứ K trong heap."""
+        return len(top) == k and (value, sup_xy) <= top[0][:2]
+
+    def _offer(sup_xy, X, Y, sup_x, sup_y):
+        nonlocal seq
+        conf = sup_xy / sup_x
+        if conf < min_confidence - _EPS or conf * n / sup_y < min_lift - _EPS:
+            return
+        value = _value(sup_xy, sup_x, sup_y)
+        if _beaten(value, sup_xy):
+            return
+        seq += 1
+        entry = (value, sup_xy, -seq, X, Y, sup_x, sup_y)
+        if len(top) < k:
+            heapq.heappush(top, entry)
+        else:
+            heapq.heapreplace(top, entry)
+
+    # hàng đợi mở rộng: max-heap theo (cận trên, support), chỉ giữ mã item
+    # (-bound, -sup_XY, seq, X, Y, sup_X, sup_Y, right_ok)
+    queue: list = []
+
+    def _push(sup_xy, X, Y, sup_x, sup_y, right_ok):
+        nonlocal seq
+        if max_len is not None and len(X) + len(Y) >= max_len:
+            return
+        bound = _bound(sup_xy, sup_y, right_ok)
+        if _beaten(bound, sup_xy):
+            return
+        seq += 1
+        heapq.heappush(queue, (-bound, -sup_xy, seq, X, Y, sup_x, sup_y, right_ok))
+
+    # cặp (i, j), i != j, count >= min_count theo count giảm dần – trên mảng COO
+    co = (mat[:, cols].T.astype(np.int64) @ mat[:, cols].astype(np.int64)).tocoo()
+    keep = (co.row != co.col) & (co.data >= min_count)
+    pair_i, pair_j, pair_count = co.row[keep], co.col[keep], co.data[keep]
+    del co
+    for p in np.argsort(-pair_count, kind="stable"):
+        c, i, j = int(pair_count[p]), int(pair_i[p]), int(pair_j[p])
+        if metric == "support" and _beaten(c / n, c):
+            break
+        _offer(c, (i,), (j,), int(counts[i]), int(counts[j]))
+        _push(c, (i,), (j,), int(counts[i]), int(counts[j]), True)
+
+    while queue:
+        neg_bound, neg_sup = queue[0][:2]
+        if _beaten(-neg_bound, -neg_sup):
+            break
+        _, _, _, X, Y, sup_x, sup_y, right_ok = heapq.heappop(queue)
+        bx = np.bitwise_and.reduce(bits[list(X)], axis=0)
+        by = np.bitwise_and.reduce(bits[list(Y)], axis=0)
+        inter = (bx & by) & bits
+        sup_new = _popcount(inter)
+        used = set(X) | set(Y)
+        for c in np.flatnonzero(sup_new >= min_count).tolist():
+            if c in used:
+                continue
+            sup_c = int(sup_new[c])
+            if c > X[-1]:
+                # mở rộng trái: X ∪ {c} → Y
+                sup_x_new = int(_popcount(bx & bits[c]))
+                _offer(sup_c, X + (c,), Y, sup_x_new, sup_y)
+                _push(sup_c, X + (c,), Y, sup_x_new, sup_y, False)
+            if right_ok and c > Y[-1]:
+                # mở rộng phải: X → Y ∪ {c}
+                sup_y_new = int(_popcount(by & bits[c]))
+                _offer(sup_c, X, Y + (c,), sup_x, sup_y_new)
+                _push(sup_c, X, Y + (c,), sup_x, sup_y_new, True)
+
+    if not top:
+        return pd.DataFrame(columns=_RULE_COLUMNS)
+
+    labels = np.asarray(items, dtype=object)[cols]
+    best = sorted(top, key=lambda e: (-e[0], -e[1], -e[2]))
+    rules = _rules_frame(
+        [frozenset(labels[list(e[3])]) for e in best],
+        [frozenset(labels[list(e[4])]) for e in best],
+        [e[5] / n for e in best],
+        [e[6] / n for e in best],
+        [e[1] / n for e in best],
+    )
+    return rules
@@ -6,12 +6,24 @@ Phân cụm khách hàng dựa trên Recency, Frequency, Monetary.
 
 from __future__ import annotations
 
+import time
+from typing import Iterable
+
 import numpy as np
 import pandas as pd
-from sklearn.cluster import KMeans
+from sklearn.cluster import KMeans, MiniBatchKMeans
 from sklearn.preprocessing import StandardScaler
-from sklearn.metrics import silhouette_score
+from sklearn.metrics import (
+    adjusted_rand_score,
+    calinski_harabasz_score,
+    davies_bouldin_score,
+    silhouette_score,
+)
 import joblib
+from joblib import Parallel, delayed, effective_n_jobs
+
+# engine hợp lệ cho train_kmeans / elbow_scores
+ENGINES = ("kmeans", "minibatch")
 
 
 # ------------------------------------------------------------------
@@ -53,41 +65,240 @@ def scale_rfm(rfm: pd.DataFrame, cols: list = None) -> tuple:
 # ------------------------------------------------------------------
 # 3. Elbow method (tìm k tối ưu)
 # ------------------------------------------------------------------
-def elbow_scores(X: np.ndarray, k_range: range = range(2, 11), random_state: int = 42) -> dict:
+def _make_kmeans(n_clusters: int, random_state: int = 42, engine: str = "kmeans",
+                 batch_size: int = 4096):
     """
-    Tính inertia và silhouette cho các giá trị k.
-    Returns: dict với keys 'k', 'inertia', 'silhouette'
+    Tạo estimator theo engine:
+    - kmeans    : KMeans full-batch (n_init=10) – mỗi vòng lặp duyệt toàn bộ dữ liệu
+    - minibatch : MiniBatchKMeans – mỗi bước chỉ dùng batch_size dòng, phù
+                  hợp hàng chục triệu khách hàng
     """
-    inertias = []
-    silhouettes = []
-    ks = list(k_range)
-    
-    for k in ks:
-        km = KMeans(n_clusters=k, random_state=random_state, n_init=10)
-        labels = km.fit_predict(X)
-        inertias.append(km.inertia_)
-        sil = silhouette_score(X, labels) if k > 1 else 0
-        silhouettes.append(sil)
-    
+    if engine == "kmeans":
+        return KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    if engine == "minibatch":
+        return MiniBatchKMeans(
+            n_clusters=n_clusters,
+            random_state=random_state,
+            batch_size=batch_size,
+            n_init=3,
+        )
+    raise ValueError(f"engine phải thuộc {ENGINES}, nhận '{engine}'")
+
+
+def _stratified_sample(labels: np.ndarray, sample_size: int, random_state: int = 42) -> np.ndarray:
+    """Chỉ số mẫu phân tầng theo cluster (giữ tỉ lệ, mỗi cluster ít nhất 1 điểm)."""
+    n = labels.shape[0]
+    if sample_size >= n:
+        return np.arange(n)
+    rng = np.random.default_rng(random_state)
+    frac = sample_size / n
+    picked = []
+    for label in np.unique(labels):
+        members = np.flatnonzero(labels == label)
+        take = max(int(round(len(members) * frac)), 1)
+        picked.append(rng.choice(members, size=take, replace=False))
+    return np.sort(np.concatenate(picked))
+
+
+def centroid_silhouette(X: np.ndarray, labels: np.ndarray, centers: np.ndarray,
+                        chunk_rows: int = 65536) -> float:
+    """
+    Simplified silhouette O(n·k): a = khoảng cách tới tâm cluster của điểm,
+    b = khoảng cách tới tâm gần nhất khác; s = (b - a) / max(a, b).
+
+    Khoảng cách tính theo ‖x‖² − 2x·c + ‖c‖² trên từng khối chunk_rows dòng
+    → bộ nhớ tạm chunk_rows × k, không tạo mảng n × k × d.
+    """
+    centers = np.asarray(centers, dtype=np.float64)
+    c_sq = (centers ** 2).sum(axis=1)
+    total = 0.0
+    for start in range(0, X.shape[0], chunk_rows):
+        x = np.asarray(X[start:start + chunk_rows], dtype=np.float64)
+        lab = labels[start:start + chunk_rows]
+        sq = (x ** 2).sum(axis=1)[:, None] - 2.0 * (x @ centers.T) + c_sq[None, :]
+        dist = np.sqrt(np.maximum(sq, 0.0))
+        rows = np.arange(x.shape[0])
+        a = dist[rows, lab]
+        dist[rows, lab] = np.inf
+        b = dist.min(axis=1)
+        denom = np.maximum(a, b)
+        total += np.divide(b - a, denom, out=np.zeros_like(a), where=denom > 0).sum()
+    return float(total / X.shape[0])
+
+
+def _score_k(X: np.ndarray, k: int, random_state: int, engine: str, batch_size: int,
+             silhouette: str, sample_size: int) -> dict:
+    """Fit một giá trị k và tính các tiêu chí (chạy trong worker)."""
+    km = _make_kmeans(k, random_state=random_state, engine=engine, batch_size=batch_size)
+    labels = km.fit_predict(X)
+
+    if silhouette == "full":
+        sil = silhouette_score(X, labels)
+    elif silhouette == "sample":
+        idx = _stratified_sample(labels, sample_size, random_state)
+        sil = silhouette_score(X[idx], labels[idx])
+    elif silhouette == "centroid":
+        sil = centroid_silhouette(X, labels, km.cluster_centers_)
+    else:
+        sil = np.nan
+
     return {
-        "k": ks,
-        "inertia": inertias,
-        "silhouette": silhouettes,
+        "k": k,
+        "inertia": km.inertia_,
+        "silhouette": sil,
+        "calinski_harabasz": calinski_harabasz_score(X, labels),
+        "davies_bouldin": davies_bouldin_score(X, labels),
     }
 
 
+# cách tính silhouette trong elbow_scores
+SILHOUETTE_MODES = ("full", "sample", "centroid", "none")
+
+# tiêu chí dừng sớm: True = càng lớn càng tốt
+_CRITERIA = {"silhouette": True, "calinski_harabasz": True, "davies_bouldin": False}
+
+
+def elbow_scores(X: np.ndarray, k_range: range = range(2, 11), random_state: int = 42,
+                 engine: str = "kmeans", batch_size: int = 4096, n_jobs: int = 1,
+                 silhouette: str = "sample", sample_size: int = 10_000,
+                 criterion: str = "silhouette", patience: int = None) -> dict:
+    """
+    Tính inertia, silhouette, Calinski-Harabasz, Davies-Bouldin cho các giá trị k.
+
+    - n_jobs     : số process chạy song song các giá trị k (joblib/loky)
+    - silhouette : "full" (O(n²)), "sample" (mẫu phân tầng sample_size
+                   điểm, mặc định), "centroid" (simplified O(n·k)) hoặc "none"
+                   ("none" không dùng được với criterion="silhouette")
+    - patience   : dừng quét khi `criterion` không cải thiện sau patience
+                   giá trị k liên tiếp (None = quét hết). Với n_jobs > 1 các
+                   k được chạy theo lượt n_jobs giá trị, kiểm tra sau mỗi lượt.
+
+    Returns: dict với keys 'k', 'inertia', 'silhouette', 'calinski_harabasz',
+             'davies_bouldin' (danh sách cắt ngắn nếu dừng sớm)
+    """
+    if criterion not in _CRITERIA:
+        raise ValueError(f"criterion phải thuộc {list(_CRITERIA)}, nhận '{criterion}'")
+    if silhouette not in SILHOUETTE_MODES:
+        raise ValueError(f"silhouette phải thuộc {SILHOUETTE_MODES}, nhận '{silhouette}'")
+    if criterion == "silhouette" and silhouette == "none":
+        # mọi điểm silhouette là NaN → patience dừng quét ngay sau k đầu
+        raise ValueError('criterion="silhouette" cần silhouette khác "none"')
+    ks = list(k_range)
+    wave = effective_n_jobs(n_jobs) if patience else len(ks)
+    higher_better = _CRITERIA[criterion]
+
+    results = []
+    best, since_best = None, 0
+    for start in range(0, len(ks), wave):
+        batch = Parallel(n_jobs=n_jobs)(
+            delayed(_score_k)(X, k, random_state, engine, batch_size, silhouette, sample_size)
+            for k in ks[start:start + wave]
+        )
+        stop = False
+        for res in batch:
+            results.append(res)
+            if not patience:
+                continue
+            value = res[criterion] if higher_better else -res[criterion]
+            if best is None or value > best:
+                best, since_best = value, 0
+            else:
+                since_best += 1
+                if since_best >= patience:
+                    stop = True
+                    break
+        if stop:
+            break
+
+    keys = ["k", "inertia", "silhouette", "calinski_harabasz", "davies_bouldin"]
+    return {key: [res[key] for res in results] for key in keys}
+
+
 # ------------------------------------------------------------------
 # 4. Huấn luyện KMeans
 # ------------------------------------------------------------------
-def train_kmeans(X: np.ndarray, n_clusters: int = 4, random_state: int = 42) -> KMeans:
+def train_kmeans(X: np.ndarray, n_clusters: int = 4, random_state: int = 42,
+                 engine: str = "kmeans", batch_size: int = 4096):
     """
-    Huấn luyện KMeans với số cluster cho trước.
+    Huấn luyện KMeans (hoặc MiniBatchKMeans khi engine="minibatch") với số
+    cluster cho trước.
     """
-    km = KMeans(n_clusters=n_clusters, random_state=random_state, n_init=10)
+    km = _make_kmeans(n_clusters, random_state=random_state, engine=engine, batch_size=batch_size)
     km.fit(X)
     return km
 
 
+def iter_chunks(X: np.ndarray, chunk_rows: int) -> Iterable[np.ndarray]:
+    """Chia ma trận thành các khối chunk_rows dòng (view, không copy)."""
+    for start in range(0, X.shape[0], chunk_rows):
+        yield X[start:start + chunk_rows]
+
+
+def train_kmeans_stream(chunks: Iterable[np.ndarray], n_clusters: int = 4, random_state: int = 42,
+                        batch_size: int = 4096) -> MiniBatchKMeans:
+    """
+    MiniBatchKMeans.partial_fit trên từng khối RFM (vd đọc theo row group
+    parquet) – không cần giữ toàn bộ ma trận trong bộ nhớ.
+    Khối lớn hơn batch_size được cắt nhỏ thành các mini-batch.
+
+    Lưu ý: model không có labels_ cho toàn bộ dữ liệu → dùng predict().
+    Tổng số dòng < n_clusters → ValueError.
+    """
+    km = MiniBatchKMeans(n_clusters=n_clusters, random_state=random_state, batch_size=batch_size)
+    pending = []
+    n_rows = 0
+    for chunk in chunks:
+        chunk = np.asarray(chunk, dtype=np.float64)
+        n_rows += chunk.shape[0]
+        if not hasattr(km, "cluster_centers_"):
+            # partial_fit lần đầu cần >= n_clusters dòng để khởi tạo tâm
+            pending.append(chunk)
+            chunk = np.vstack(pending)
+            if chunk.shape[0] < n_clusters:
+                continue
+            pending = []
+        for batch in iter_chunks(chunk, max(batch_size, n_clusters)):
+            km.partial_fit(batch)
+    if not hasattr(km, "cluster_centers_"):
+        raise ValueError(f"Cần ít nhất n_clusters={n_clusters} dòng để khởi tạo tâm, chỉ có {n_rows} dòng")
+    return km
+
+
+def compare_with_full_kmeans(X: np.ndarray, model, sample_size: int = 100_000,
+                             random_state: int = 42) -> dict:
+    """
+    Đánh giá chất lượng model mini-batch so với KMeans full-batch trên một
+    mẫu ngẫu nhiên (full KMeans trên toàn bộ dữ liệu chính là chi phí cần tránh).
+
+    Returns dict:
+      - ari           : Adjusted Rand Index giữa nhãn 2 model (1 = trùng khớp)
+      - inertia_model : SSE/điểm của model trên mẫu
+      - inertia_full  : SSE/điểm của KMeans full trên mẫu
+      - inertia_gap   : (inertia_model - inertia_full) / inertia_full
+      - fit_seconds_full : thời gian fit KMeans full trên mẫu
+    """
+    rng = np.random.default_rng(random_state)
+    n = X.shape[0]
+    sample = X[rng.choice(n, size=sample_size, replace=False)] if n > sample_size else X
+
+    start = time.perf_counter()
+    full = KMeans(n_clusters=model.n_clusters, random_state=random_state, n_init=10).fit(sample)
+    fit_seconds = time.perf_counter() - start
+
+    labels_model = model.predict(sample)
+    # score() trả về -SSE
+    inertia_model = -model.score(sample) / sample.shape[0]
+    inertia_full = -full.score(sample) / sample.shape[0]
+    return {
+        "sample_size": int(sample.shape[0]),
+        "ari": round(float(adjusted_rand_score(full.labels_, labels_model)), 4),
+        "inertia_model": round(float(inertia_model), 6),
+        "inertia_full": round(float(inertia_full), 6),
+        "inertia_gap": round(float((inertia_model - inertia_full) / inertia_full), 6),
+        "fit_seconds_full": round(fit_seconds, 3),
+    }
+
+
 # ------------------------------------------------------------------
 # 5. Gán nhãn cluster vào RFM DataFrame
 # ------------------------------------------------------------------
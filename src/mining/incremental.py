@@ -0,0 +1,199 @@
+"""
+Incremental Association Rules – FUP (Fast UPdate)
+=================================================
+Lưu support count của các frequent itemsets ra đĩa và cập nhật chỉ với
+các đơn hàng mới (delta), thay vì mine lại toàn bộ lịch sử mỗi ngày.
+
+Với ngưỡng s, lịch sử N đơn và delta n đơn:
+- Itemset đã phổ biến: chỉ cần đếm thêm trên delta.
+- Itemset chưa phổ biến chỉ có thể thành phổ biến nếu count trên delta
+  > s * n → mine delta để lấy ứng viên, rồi rescan lịch sử đúng các
+  ứng viên đó (chỉ các cột item liên quan).
+"""
+
+from __future__ import annotations
+
+import glob
+import os
+
+import joblib
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+from src.features.basket import SparseBasket
+from src.mining.association import _count_itemsets, _eclat_codes, _itemsets_frame, _min_count
+
+
+class ItemsetCountStore:
+    """
+    Kho support count persist trên đĩa (store_dir):
+
+    - state.pkl          : vocab item, tổng số đơn, count các itemset phổ biến
+    - history/part-*.npz : các đơn đã thấy (CSR theo mã item của kho), chỉ
+                           đọc lại khi có ứng viên mới cần rescan
+    """
+
+    def __init__(self, store_dir: str, min_support: float, item_col: str = "Sub-Category"):
+        self.store_dir = store_dir
+        self.min_support = min_support
+        self.item_col = item_col
+        self.items: list = []
+        self.n_transactions = 0
+        self.counts: dict = {}
+        self.n_shards = 0
+
+    # ------------------------------------------------------------------
+    # Persist
+    # ------------------------------------------------------------------
+    @property
+    def _state_path(self) -> str:
+        return os.path.join(self.store_dir, "state.pkl")
+
+    @classmethod
+    def exists(cls, store_dir: str) -> bool:
+        return os.path.exists(os.path.join(store_dir, "state.pkl"))
+
+    @classmethod
+    def load(cls, store_dir: str) -> "ItemsetCountStore":
+        state = joblib.load(os.path.join(store_dir, "state.pkl"))
+        store = cls(store_dir, state["min_support"], state["item_col"])
+        store.items = state["items"]
+        store.n_transactions = state["n_transactions"]
+        store.counts = state["counts"]
+        store.n_shards = state["n_shards"]
+        return store
+
+    def save(self) -> None:
+        os.makedirs(self.store_dir, exist_ok=True)
+        joblib.dump(
+            {
+                "min_support": self.min_support,
+                "item_col": self.item_col,
+                "items": self.items,
+                "n_transactions": self.n_transactions,
+                "counts": self.counts,
+                "n_shards": self.n_shards,
+            },
+            self._state_path,
+        )
+
+    # ------------------------------------------------------------------
+    # Helpers
+    # ------------------------------------------------------------------
+    def _align(self, basket: SparseBasket) -> sparse.csr_matrix:
+        """Đổi cột của basket sang mã item của kho (item mới được thêm vào vocab)."""
+        vocab = {label: code for code, label in enumerate(self.items)}
+        mapping = np.fromiter(
+            (vocab.setdefault(label, len(vocab)) for label in basket.items),
+            dtype=np.int64,
+            count=len(basket.items),
+        )
+        self.items = list(vocab)
+        coo = basket.matrix.tocoo()
+        return sparse.csr_matrix(
+            (np.ones(coo.nnz, dtype=bool), (coo.row, mapping[coo.col])),
+            shape=(basket.matrix.shape[0], len(self.items)),
+        )
+
+    def _append_history(self, mat: sparse.csr_matrix) -> None:
+        history_dir = os.path.join(self.store_dir, "history")
+        os.makedirs(history_dir, exist_ok=True)
+        sparse.save_npz(os.path.join(history_dir, f"part-{self.n_shards:05d}.npz"), mat)
+        self.n_shards += 1
+
+    def _rescan_history(self, itemsets: list) -> np.ndarray:
+        """Đếm itemsets trên toàn bộ lịch sử (targeted: chỉ pack cột liên quan)."""
+        counts = np.zeros(len(itemsets), dtype=np.int64)
+        for path in sorted(glob.glob(os.path.join(self.store_dir, "history", "part-*.npz"))):
+            mat = sparse.load_npz(path).tocsr()
+            # shard cũ có ít cột hơn vocab hiện tại
+            mat.resize((mat.shape[0], len(self.items)))
+            counts += _count_itemsets(mat, itemsets)
+        return counts
+
+    # ------------------------------------------------------------------
+    # Build / update
+    # ------------------------------------------------------------------
+    def initialize(self, basket: SparseBasket) -> dict:
+        """Mine toàn bộ basket ban đầu và ghi kho."""
+        self.items, self.counts, self.n_transactions, self.n_shards = [], {}, 0, 0
+        mat = self._align(basket)
+        self.n_transactions = mat.shape[0]
+        itemsets, counts = _eclat_codes(mat, _min_count(self.min_support, self.n_transactions))
+        self.counts = {tuple(sorted(s)): int(c) for s, c in zip(itemsets, counts)}
+        self._append_history(mat)
+        self.save()
+        return {"n_transactions": self.n_transactions, "n_frequent": len(self.counts)}
+
+    def update(self, delta: SparseBasket) -> dict:
+        """
+        FUP: cập nhật count với các đơn mới (giả định delta không chứa lại
+        các Order ID đã có trong lịch sử).
+        """
+        n_old_items = len(self.items)
+        mat = self._align(delta)
+        n_delta = mat.shape[0]
+        n_total = self.n_transactions + n_delta
+        min_count = _min_count(self.min_support, n_total)
+
+        # 1. itemset đã phổ biến → chỉ đếm thêm trên delta
+        known = list(self.counts)
+        delta_known = _count_itemsets(mat, known)
+        updated = {
+            s: self.counts[s] + int(c)
+            for s, c in zip(known, delta_known)
+            if self.counts[s] + int(c) >= min_count
+        }
+
+        # 2. ứng viên mới: phải có count trên delta > s * n_delta
+        local_min = max(int(np.floor(self.min_support * n_delta)), 1)
+        delta_sets, delta_counts = _eclat_codes(mat, local_min)
+        candidates = {}
+        for s, c in zip(delta_sets, delta_counts):
+            key = tuple(sorted(s))
+            if key not in self.counts:
+                candidates[key] = int(c)
+
+        # 3. rescan lịch sử chỉ cho ứng viên có thể đạt ngưỡng. Cận trên của
+        #    count lịch sử = min count lịch sử của các tập con (k-1): tập con đã
+        #    lưu → count cũ, chưa lưu → < ngưỡng cũ; chứa item mới → 0
+        unseen_max = _min_count(self.min_support, self.n_transactions) - 1 if self.n_transactions else 0
+        need_scan = []
+        for s, c in candidates.items():
+            if max(s) >= n_old_items:
+                continue
+            if len(s) == 1:
+                bound = unseen_max
+            else:
+                bound = min(
+                    self.counts.get(s[:i] + s[i + 1:], unseen_max) for i in range(len(s))
+                )
+            if c + bound >= min_count:
+                need_scan.append(s)
+        history = dict(zip(need_scan, self._rescan_history(need_scan))) if need_scan else {}
+        for s, c in candidates.items():
+            total = c + int(history.get(s, 0))
+            if total >= min_count:
+                updated[s] = total
+
+        n_dropped = sum(1 for s in known if s not in updated)
+        self.counts = updated
+        self.n_transactions = n_total
+        self._append_history(mat)
+        self.save()
+
+        return {
+            "n_delta": n_delta,
+            "n_transactions": n_total,
+            "n_frequent": len(updated),
+            "n_candidates": len(candidates),
+            "n_rescanned": len(need_scan),
+            "n_dropped": n_dropped,
+        }
+
+    def frequent_itemsets(self) -> pd.DataFrame:
+        """DataFrame (support, itemsets) dùng trực tiếp cho generate_rules."""
+        keys = list(self.counts)
+        counts = np.asarray([self.counts[k] for k in keys], dtype=np.int64)
+        return _itemsets_frame(keys, counts, pd.Index(self.items), self.n_transactions)
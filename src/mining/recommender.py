@@ -0,0 +1,190 @@
+"""
+Cross-sell Recommendation – tra cứu Association Rules theo giỏ hàng
+===================================================================
+RuleIndex ánh xạ mỗi antecedent (itemset) → danh sách consequent đã sắp
+theo lift; recommend() khớp tập con với giỏ hàng hiện tại để gợi ý
+"khách mua X cũng mua Y". Kèm HTTP server nhỏ (thư viện chuẩn) để phục
+vụ tại checkout.
+"""
+
+from __future__ import annotations
+
+import heapq
+import json
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterable, List
+from urllib.parse import parse_qs, urlparse
+
+import joblib
+import pandas as pd
+
+
+class RuleIndex:
+    """
+    Index rules cho tra cứu theo giỏ hàng.
+
+    - rules   : antecedent frozenset → [(-score, -score phụ, key, item,
+                lift, confidence), ...] đã sort (mỗi item consequent 1 dòng)
+    - anchors : item → các antecedent nhận item đó làm anchor; mỗi
+                antecedent chỉ được kiểm tra tập con đúng một lần
+    """
+
+    def __init__(self, rules: pd.DataFrame, score: str = "lift"):
+        self.score = score
+        self.rules: dict = {}
+        self.anchors: dict = {}
+
+        if rules is None or rules.empty:
+            return
+        other = "confidence" if score == "lift" else "lift"
+        for ante, cons, s_main, s_other, lift, conf in zip(
+            rules["antecedents"], rules["consequents"], rules[score], rules[other],
+            rules["lift"], rules["confidence"],
+        ):
+            entries = self.rules.setdefault(frozenset(ante), [])
+            for target in cons:
+                entries.append((-float(s_main), -float(s_other), str(target), target, float(lift), float(conf)))
+        for entries in self.rules.values():
+            entries.sort()
+
+        # anchor = item hiếm nhất của antecedent → item phổ biến không kéo
+        # theo hàng nghìn antecedent phải kiểm tra tập con
+        freq: dict = {}
+        for ante in self.rules:
+            for item in ante:
+                freq[item] = freq.get(item, 0) + 1
+        for ante in self.rules:
+            anchor = min(ante, key=lambda i: (freq[i], str(i)))
+            self.anchors.setdefault(anchor, []).append(ante)
+
+    def __len__(self) -> int:
+        return sum(len(v) for v in self.rules.values())
+
+    @classmethod
+    def from_csv(cls, path: str, score: str = "lift", sep: str = ", ") -> "RuleIndex":
+        """
+        Dựng index từ CSV của rules_to_csv_friendly (vd top_rules.csv).
+        Lưu ý: tên item chứa chính `sep` sẽ bị tách sai – ưu tiên load()
+        từ file pickle do run_association.py ghi.
+        """
+        df = pd.read_csv(path)
+        df["antecedents"] = df["antecedents"].map(lambda s: frozenset(str(s).split(sep)))
+        df["consequents"] = df["consequents"].map(lambda s: frozenset(str(s).split(sep)))
+        return cls(df, score=score)
+
+    def recommend(self, basket_items: Iterable, k: int = 5) -> List[dict]:
+        """
+        Gợi ý tối đa k item chưa có trong giỏ.
+
+        Mọi rule có antecedent ⊆ giỏ đều được xét; mỗi item gợi ý lấy rule
+        có score cao nhất (hoà thì confidence cao hơn). Danh sách của từng
+        antecedent đã sort sẵn nên chỉ cần merge và dừng khi đủ k item.
+        """
+        cart = set(basket_items)
+        matched = [
+            ante
+            for item in cart
+            for ante in self.anchors.get(item, ())
+            if ante <= cart
+        ]
+        streams = [((*e, ante) for e in self.rules[ante]) for ante in matched]
+
+        seen, out = set(), []
+        for _, _, _, target, lift, conf, ante in heapq.merge(*streams):
+            if len(out) >= k:
+                break
+            if target in cart or target in seen:
+                continue
+            seen.add(target)
+            out.append({
+                "item": target,
+                "score": lift if self.score == "lift" else conf,
+                "lift": lift,
+                "confidence": conf,
+                "because": sorted(ante, key=str),
+            })
+        return out
+
+    def save(self, path: str) -> None:
+        joblib.dump(self, path)
+
+    @staticmethod
+    def load(path: str) -> "RuleIndex":
+        return joblib.load(path)
+
+
+# ------------------------------------------------------------------
+# HTTP server (thư viện chuẩn, không thêm dependency)
+# ------------------------------------------------------------------
+def _parse_request(items, k) -> tuple:
+    """Kiểm tra tham số request: items là list str/int, k ≥ 1; sai → ValueError."""
+    if not isinstance(items, list) or not all(
+        isinstance(i, (str, int)) and not isinstance(i, bool) for i in items
+    ):
+        raise ValueError("items phải là danh sách tên sản phẩm (str/int)")
+    k = int(k)
+    if k < 1:
+        raise ValueError("k phải ≥ 1")
+    return items, k
+
+
+def make_server(index: RuleIndex, host: str = "127.0.0.1", port: int = 8000) -> ThreadingHTTPServer:
+    """
+    Server JSON:
+      GET  /recommend?item=A&item=B&k=5
+      POST /recommend   {"items": ["A", "B"], "k": 5}
+      GET  /health
+    """
+
+    class _Handler(BaseHTTPRequestHandler):
+        def _reply(self, status: int, payload: dict):
+            body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _recommend(self, items: list, k: int):
+            start = time.perf_counter()
+            recs = index.recommend(items, k=k)
+            self._reply(200, {
+                "items": items,
+                "recommendations": recs,
+                "latency_ms": round((time.perf_counter() - start) * 1000, 4),
+            })
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/health":
+                self._reply(200, {"status": "ok", "n_rules": len(index)})
+            elif url.path == "/recommend":
+                try:
+                    query = parse_qs(url.query)
+                    items, k = _parse_request(query.get("item", []), query.get("k", ["5"])[0])
+                except (ValueError, TypeError, AttributeError) as e:
+                    self._reply(400, {"error": str(e)})
+                    return
+                self._recommend(items, k)
+            else:
+                self._reply(404, {"error": "not found"})
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/recommend":
+                self._reply(404, {"error": "not found"})
+                return
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = json.loads(self.rfile.read(length) or b"{}")
+                # body không phải object JSON → AttributeError ở .get
+                items, k = _parse_request(payload.get("items", []), payload.get("k", 5))
+            except (ValueError, TypeError, AttributeError) as e:
+                self._reply(400, {"error": str(e)})
+                return
+            self._recommend(items, k)
+
+        def log_message(self, format, *args):  # tắt log mỗi request
+            pass
+
+    return ThreadingHTTPServer((host, port), _Handler)
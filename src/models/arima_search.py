@@ -0,0 +1,195 @@
+"""
+Chọn bậc ARIMA tự động – stepwise theo AIC (kiểu auto.arima)
+============================================================
+1. d chọn bằng KPSS (sai phân tới khi chuỗi dừng, tối đa max_d); D cố định.
+2. Fit đồng thời 4 ứng viên khởi đầu, lấy AIC nhỏ nhất.
+3. Mỗi bước: fit đồng thời mọi láng giềng chưa thử của bậc tốt nhất
+   (p±1, q±1, P±1, Q±1, p và q cùng ±1); dừng khi không cải thiện AIC
+   hoặc hết max_steps.
+Mỗi ứng viên có timeout riêng; kết quả nhớ theo hash của chuỗi + tham số
+tìm kiếm (dict cache, lưu/đọc JSON) nên chạy lại không fit lại.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+import warnings
+from contextlib import nullcontext
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from statsmodels.tsa.arima.model import ARIMA
+from statsmodels.tsa.stattools import kpss
+
+from src.utils.timeout import FitTimeout, time_limit
+
+# (p, q, P, Q) khởi đầu như auto.arima
+_START = [(2, 2, 1, 1), (0, 0, 0, 0), (1, 0, 1, 0), (0, 1, 0, 1)]
+_MOVES = [
+    (1, 0, 0, 0), (-1, 0, 0, 0), (0, 1, 0, 0), (0, -1, 0, 0),
+    (1, 1, 0, 0), (-1, -1, 0, 0),
+    (0, 0, 1, 0), (0, 0, -1, 0), (0, 0, 0, 1), (0, 0, 0, -1),
+]
+
+
+def series_hash(series: pd.Series, **params) -> str:
+    """sha256 của giá trị chuỗi + tham số tìm kiếm (khoá cache)."""
+    h = hashlib.sha256(np.ascontiguousarray(series.to_numpy(dtype=np.float64)).tobytes())
+    h.update(json.dumps(params, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+def ndiffs(values: np.ndarray, max_d: int = 2, alpha: float = 0.05) -> int:
+    """Số lần sai phân tới khi KPSS không bác bỏ tính dừng (p >= alpha)."""
+    x = np.asarray(values, dtype=np.float64)
+    for d in range(max_d + 1):
+        if len(x) < 4 or np.allclose(x, x[0]):
+            return d
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore")
+            p_value = kpss(x, regression="c", nlags="auto")[1]
+        if p_value >= alpha:
+            return d
+        x = np.diff(x)
+    return max_d
+
+
+def _fit_candidate(values: np.ndarray, cand: tuple, d: int, D: int, s: int,
+                   timeout: float) -> dict:
+    """Worker: fit một ứng viên (p, q, P, Q), trả về AIC (inf nếu lỗi/quá giờ)."""
+    p, q, P, Q = cand
+    start = time.perf_counter()
+    status, aic = "ok", np.inf
+    try:
+        with warnings.catch_warnings(), time_limit(timeout):
+            warnings.simplefilter("ignore")
+            res = ARIMA(values, order=(p, d, q),
+                        seasonal_order=(P, D, Q, s) if s else (0, 0, 0, 0)).fit()
+        if timeout and time.perf_counter() - start > timeout:
+            raise FitTimeout(f"quá {timeout}s")
+        aic = float(res.aic) if np.isfinite(res.aic) else np.inf
+    except FitTimeout:
+        status = "timeout"
+    except Exception:
+        status = "failed"
+    return {"cand": cand, "aic": aic, "status": status}
+
+
+def select_order(
+    series: pd.Series,
+    max_p: int = 3,
+    max_q: int = 3,
+    max_P: int = 1,
+    max_Q: int = 1,
+    d: int = None,
+    max_d: int = 2,
+    D: int = 0,
+    seasonal_period: int = 0,
+    max_steps: int = 20,
+    timeout: float = 10.0,
+    n_jobs: int = 1,
+    cache: dict = None,
+) -> dict:
+    """
+    Stepwise search (p,d,q)(P,D,Q,s) theo AIC.
+
+    seasonal_period : s (vd 12 cho dữ liệu tháng); 0/1 → không mùa vụ.
+                      Chuỗi ngắn hơn 2 chu kỳ cũng bỏ phần mùa vụ.
+    n_jobs          : số process fit ứng viên đồng thời (1 = tuần tự)
+    cache           : dict {hash: kết quả}; trúng → trả về ngay (cached=True)
+
+    Returns: {"order", "seasonal_order", "aic", "n_fits", "n_timeouts",
+              "n_failed", "seconds", "cached"}
+    """
+    values = series.to_numpy(dtype=np.float64)
+    s = seasonal_period if seasonal_period and seasonal_period > 1 and len(values) >= 2 * seasonal_period else 0
+    if not s:
+        max_P = max_Q = D = 0
+
+    params = dict(max_p=max_p, max_q=max_q, max_P=max_P, max_Q=max_Q, d=d,
+                  max_d=max_d, D=D, s=s, max_steps=max_steps)
+    key = series_hash(series, **params)
+    if cache is not None and key in cache:
+        return {**cache[key], "cached": True}
+
+    start = time.perf_counter()
+    if d is None:
+        x = values
+        for _ in range(D):
+            x = x[s:] - x[:-s]
+        d = ndiffs(x, max_d=max_d)
+
+    def in_bounds(c):
+        p, q, P, Q = c
+        return 0 <= p <= max_p and 0 <= q <= max_q and 0 <= P <= max_P and 0 <= Q <= max_Q
+
+    visited: dict = {}
+
+    def evaluate(cands, parallel):
+        cands = [c for c in dict.fromkeys(cands) if in_bounds(c) and c not in visited]
+        if parallel is None:
+            results = [_fit_candidate(values, c, d, D, s, timeout) for c in cands]
+        else:
+            results = parallel(delayed(_fit_candidate)(values, c, d, D, s, timeout) for c in cands)
+        for r in results:
+            visited[r["cand"]] = r
+        return bool(cands)
+
+    def best():
+        return min(visited.values(), key=lambda r: r["aic"])
+
+    # n_jobs=1 → tuần tự, không khởi tạo pool; pool dùng lại qua các bước
+    with Parallel(n_jobs=n_jobs, backend="loky") if n_jobs != 1 else nullcontext() as parallel:
+        # ứng viên khởi đầu bị cắt theo giới hạn bậc
+        evaluate([(min(p, max_p), min(q, max_q), min(P, max_P), min(Q, max_Q))
+                  for p, q, P, Q in _START], parallel)
+        for _ in range(max_steps):
+            current = best()
+            neighbours = [tuple(a + b for a, b in zip(current["cand"], m)) for m in _MOVES]
+            if not evaluate(neighbours, parallel) or best() is current:
+                break
+
+    top = best()
+    if not np.isfinite(top["aic"]):
+        raise ValueError("Không ứng viên ARIMA nào fit được")
+    p, q, P, Q = top["cand"]
+    statuses = [r["status"] for r in visited.values()]
+    result = {
+        "order": [p, d, q],
+        "seasonal_order": [P, D, Q, s],
+        "aic": round(top["aic"], 4),
+        "n_fits": len(visited),
+        "n_timeouts": statuses.count("timeout"),
+        "n_failed": statuses.count("failed"),
+        "seconds": round(time.perf_counter() - start, 3),
+    }
+    if cache is not None:
+        cache[key] = result
+    return {**result, "cached": False}
+
+
+def format_order(result: dict) -> str:
+    """'(p,d,q)(P,D,Q,s)' để ghi vào bảng kết quả."""
+    order = "({},{},{})".format(*result["order"])
+    if result["seasonal_order"][3]:
+        order += "({},{},{},{})".format(*result["seasonal_order"])
+    return order
+
+
+def load_cache(path: str) -> dict:
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_cache(cache: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
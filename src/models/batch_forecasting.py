@@ -0,0 +1,242 @@
+"""
+Batch forecasting – fit naive/ARIMA/Prophet cho nhiều chuỗi song song
+=====================================================================
+Mỗi chuỗi (vd một key của TimeSeriesCube) được fit độc lập trong process
+pool (joblib/loky). Mỗi lần fit có giới hạn thời gian (SIGALRM) và lỗi
+được cô lập: chuỗi lỗi/quá giờ chỉ ghi status trong bảng fits, các chuỗi
+khác vẫn chạy. Kết quả là một bảng dự báo tidy + bảng log từng lần fit.
+Holt-Winters NumPy (exp_smoothing) không đi qua pool: các chuỗi cùng trục
+thời gian được xếp thành mảng 2-D và fit một lần.
+"""
+
+from __future__ import annotations
+
+import time
+import warnings
+from typing import Iterable, List, Tuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+
+from src.models import forecasting
+from src.models.exp_smoothing import HoltWinters, season_length
+from src.utils.timeout import FitTimeout, time_limit
+
+MODELS = ("naive", "arima", "prophet", "holt_winters")
+# mô hình fit cả mảng chuỗi trong process chính
+VECTORIZED = ("holt_winters",)
+
+
+def _with_freq(series: pd.Series) -> pd.Series:
+    """Đảm bảo index có freq (ARIMA/naive cần để sinh ngày tương lai)."""
+    series = series.astype("float64")
+    if series.index.freq is None:
+        freq = pd.infer_freq(series.index)
+        if freq is None:
+            raise ValueError("không suy ra được tần suất của chuỗi")
+        series = series.asfreq(freq)
+    return series
+
+
+def forecast_series(series: pd.Series, model: str, horizon: int,
+                    arima_order: Tuple[int, int, int] = (1, 1, 1),
+                    seasonal_order: Tuple[int, int, int, int] = (0, 0, 0, 0)) -> pd.Series:
+    """Fit một mô hình trên toàn bộ chuỗi và dự báo `horizon` kỳ tiếp theo."""
+    if model == "naive":
+        return forecasting.naive_forecast(series, horizon)
+    if model == "arima":
+        fitted = forecasting.train_arima(series, order=arima_order, seasonal_order=seasonal_order)
+        return forecasting.forecast_arima(fitted, horizon)
+    if model == "prophet":
+        df = series.rename("y").rename_axis("ds").reset_index()
+        fitted = forecasting.train_prophet(df, date_col="ds", value_col="y")
+        pred = forecasting.forecast_prophet(fitted, periods=horizon, freq=series.index.freqstr)
+        return pd.Series(pred.to_numpy(), index=pd.DatetimeIndex(pred.index))
+    raise ValueError(f"Mô hình không hỗ trợ: {model}")
+
+
+def _search_order(series: pd.Series, order_search: dict, cache: dict) -> Tuple[tuple, tuple, str, float]:
+    """Chọn bậc ARIMA cho một chuỗi (tuần tự trong worker); lỗi → raise."""
+    from src.models.arima_search import format_order, select_order
+
+    result = select_order(series, n_jobs=1, cache=cache, **order_search)
+    return (tuple(result["order"]), tuple(result["seasonal_order"]), format_order(result),
+            0.0 if result["cached"] else result["seconds"])
+
+
+def _fit_chunk(items: list, models: tuple, horizon: int, arima_order: tuple,
+               timeout: float, order_search: dict = None,
+               order_cache: dict = None) -> Tuple[list, list, dict]:
+    """
+    Worker: fit mọi mô hình cho một nhóm chuỗi.
+    Trả về (các dòng dự báo, các dòng log fit, kết quả chọn bậc mới cho
+    cache) – không bao giờ raise.
+    """
+    rows, fits = [], []
+    cache = dict(order_cache or {})
+    for key, series in items:
+        try:
+            series = _with_freq(series)
+        except Exception as e:
+            fits.extend({"key": key, "model": m, "status": "failed", "error": str(e),
+                         "seconds": 0.0, "order": "", "search_seconds": 0.0} for m in models)
+            continue
+
+        for model in models:
+            start = time.perf_counter()
+            status, error = "ok", ""
+            order, seasonal_order = arima_order, (0, 0, 0, 0)
+            order_str, search_seconds = str(arima_order) if model == "arima" else "", 0.0
+            try:
+                if model == "arima" and order_search is not None:
+                    # tìm bậc ngoài time limit: mỗi ứng viên đã có timeout riêng
+                    order, seasonal_order, order_str, search_seconds = _search_order(
+                        series, order_search, cache)
+                    start = time.perf_counter()
+                with warnings.catch_warnings(), time_limit(timeout):
+                    warnings.simplefilter("ignore")
+                    pred = forecast_series(series, model, horizon, order, seasonal_order)
+                if timeout and time.perf_counter() - start > timeout:
+                    # ngắt bị thư viện nuốt (except Exception bên trong) → vẫn tính quá giờ
+                    raise FitTimeout(f"quá {timeout}s")
+                values = pred.to_numpy(dtype=np.float64)
+                if not np.isfinite(values).all():
+                    raise ValueError("dự báo có NaN/inf")
+                rows.extend((key, model, d, v) for d, v in zip(pred.index, values))
+            except FitTimeout as e:
+                status, error = "timeout", str(e)
+            except Exception as e:
+                status, error = "failed", f"{type(e).__name__}: {e}"
+            fits.append({"key": key, "model": model, "status": status, "error": error,
+                         "seconds": round(time.perf_counter() - start, 4),
+                         "order": order_str, "search_seconds": search_seconds})
+    new_entries = {k: v for k, v in cache.items() if k not in (order_cache or {})}
+    return rows, fits, new_entries
+
+
+def _fit_vectorized(items: list, horizon: int, holt_winters: dict = None) -> Tuple[list, list]:
+    """
+    Holt-Winters cho mọi chuỗi: gom theo trục thời gian (ngày đầu, độ dài,
+    freq), mỗi nhóm fit một lần trên mảng (n_series, T).
+    """
+    params = dict(holt_winters or {})
+    seasonal_periods = params.pop("seasonal_periods", None)
+    rows, fits, groups = [], [], {}
+    for key, series in items:
+        try:
+            series = _with_freq(series)
+        except Exception as e:
+            fits.append({"key": key, "model": "holt_winters", "status": "failed", "error": str(e),
+                         "seconds": 0.0, "order": "", "search_seconds": 0.0})
+            continue
+        axis = (series.index[0], len(series), series.index.freqstr)
+        groups.setdefault(axis, []).append((key, series))
+
+    for (_, _, freq), group in groups.items():
+        start = time.perf_counter()
+        Y = np.vstack([s.to_numpy() for _, s in group])
+        m = season_length(freq) if seasonal_periods is None else seasonal_periods
+        pred = HoltWinters(m, **params).fit(Y).forecast(horizon)
+        dates = pd.date_range(group[0][1].index[-1], periods=horizon + 1, freq=freq)[1:]
+        seconds = round((time.perf_counter() - start) / len(group), 6)
+        for (key, _), values in zip(group, pred):
+            ok = np.isfinite(values).all()
+            if ok:
+                rows.extend((key, "holt_winters", d, v) for d, v in zip(dates, values))
+            fits.append({"key": key, "model": "holt_winters", "status": "ok" if ok else "failed",
+                         "error": "" if ok else "dự báo có NaN/inf", "seconds": seconds,
+                         "order": "", "search_seconds": 0.0})
+    return rows, fits
+
+
+def _expand_keys(df: pd.DataFrame, key_names: List[str] = None) -> pd.DataFrame:
+    """Tách cột key (tuple) thành các cột key_names."""
+    if not key_names:
+        df["series"] = df.pop("key").map(lambda k: "|".join(map(str, k)) if isinstance(k, tuple) else k)
+        return df[["series"] + [c for c in df.columns if c != "series"]]
+    keys = pd.DataFrame(df.pop("key").tolist(), columns=key_names, index=df.index)
+    return pd.concat([keys, df], axis=1)
+
+
+def batch_forecast(
+    series: Iterable,
+    models: tuple = ("naive", "arima"),
+    horizon: int = 6,
+    arima_order: Tuple[int, int, int] = (1, 1, 1),
+    n_jobs: int = -1,
+    timeout: float = 30.0,
+    chunk_size: int = 16,
+    key_names: List[str] = None,
+    order_search: dict = None,
+    order_cache: dict = None,
+    holt_winters: dict = None,
+) -> Tuple[pd.DataFrame, pd.DataFrame, dict]:
+    """
+    Fit `models` cho từng chuỗi trong process pool.
+
+    series     : dict {key: Series} hoặc iterable (key, Series), vd
+                 cube.iter_series("M", level=3)
+    timeout    : giây cho mỗi lần fit (None = không giới hạn)
+    chunk_size : số chuỗi mỗi task (giảm overhead IPC khi có hàng nghìn chuỗi)
+    key_names  : tên cột cho key dạng tuple (vd HIERARCHY); None → cột 'series'
+    order_search : tham số arima_search.select_order → chọn bậc ARIMA riêng cho
+                   từng chuỗi (thay arima_order); order_cache là cache theo
+                   hash chuỗi, được cập nhật tại chỗ với kết quả mới
+    holt_winters : tham số HoltWinters (seasonal_periods None → theo freq)
+
+    Returns:
+        forecasts : key..., model, date, yhat (tidy, một dòng / kỳ dự báo)
+        fits      : key..., model, status (ok/failed/timeout), error, seconds,
+                    order, search_seconds
+        stats     : n_series, n_fits, n_ok, n_failed, n_timeout, seconds, fits_per_sec
+                    (+ per_model: fit/s của từng mô hình)
+    """
+    unknown = set(models) - set(MODELS)
+    if unknown:
+        raise ValueError(f"Mô hình không hỗ trợ: {sorted(unknown)}")
+    if "prophet" in models and not forecasting._HAS_PROPHET:
+        warnings.warn("Chưa cài Prophet; bỏ qua mô hình prophet")
+        models = tuple(m for m in models if m != "prophet")
+
+    items = list(series.items()) if isinstance(series, dict) else list(series)
+    chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+    pooled = tuple(m for m in models if m not in VECTORIZED)
+
+    start = time.perf_counter()
+    results = []
+    if pooled:
+        results = Parallel(n_jobs=n_jobs, backend="loky")(
+            delayed(_fit_chunk)(chunk, pooled, horizon, tuple(arima_order), timeout,
+                                order_search, order_cache)
+            for chunk in chunks
+        )
+    if "holt_winters" in models:
+        results.append(_fit_vectorized(items, horizon, holt_winters) + ({},))
+    seconds = time.perf_counter() - start
+
+    rows = [r for chunk_rows, _, _ in results for r in chunk_rows]
+    fits = [f for _, chunk_fits, _ in results for f in chunk_fits]
+    if order_cache is not None:
+        for _, _, new_entries in results:
+            order_cache.update(new_entries)
+
+    forecasts = pd.DataFrame(rows, columns=["key", "model", "date", "yhat"])
+    fits = pd.DataFrame(fits, columns=["key", "model", "status", "error", "seconds",
+                                       "order", "search_seconds"])
+    status = fits["status"].value_counts()
+    stats = {
+        "n_series": len(items),
+        "n_fits": len(fits),
+        "n_ok": int(status.get("ok", 0)),
+        "n_failed": int(status.get("failed", 0)),
+        "n_timeout": int(status.get("timeout", 0)),
+        "seconds": round(seconds, 3),
+        "fits_per_sec": round(len(fits) / seconds, 2) if seconds > 0 else float("inf"),
+        "per_model": {
+            m: round(len(g) / float(g["seconds"].sum()), 2) if g["seconds"].sum() > 0 else float("inf")
+            for m, g in fits.groupby("model")
+        },
+    }
+    return _expand_keys(forecasts, key_names), _expand_keys(fits, key_names), stats
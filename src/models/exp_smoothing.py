@@ -0,0 +1,167 @@
+"""
+Holt-Winters (ETS cộng tính) thuần NumPy – fit nhiều chuỗi cùng lúc
+===================================================================
+Y là mảng 2-D (n_series, T) các chuỗi cùng trục thời gian. Mỗi bước thời
+gian cập nhật level / trend / mùa vụ cho mọi chuỗi × mọi bộ tham số
+(alpha, beta, gamma) bằng phép toán mảng, nên chi phí Python chỉ là một
+vòng lặp T bước.
+
+Tối ưu tham số theo SSE dự báo 1 bước, batched cho mọi chuỗi:
+1. lưới thô chung cho tất cả chuỗi;
+2. `refine` vòng lưới mịn 3×3×3 quanh bộ tốt nhất *của từng chuỗi*
+   (bước lưới giảm một nửa mỗi vòng).
+Không phụ thuộc statsmodels/Prophet.
+"""
+
+from __future__ import annotations
+
+import itertools
+
+import numpy as np
+import pandas as pd
+
+# số kỳ một chu kỳ mùa vụ theo tần suất pandas
+SEASON_LENGTH = {"D": 7, "W": 52, "M": 12, "MS": 12, "ME": 12, "Q": 4, "QS": 4, "QE": 4}
+
+
+def season_length(freq: str) -> int:
+    """Chu kỳ mùa vụ mặc định cho một freq ('W-SUN' → 52, 'ME' → 12...)."""
+    if not freq:
+        return 0
+    return SEASON_LENGTH.get(freq.split("-")[0], 0)
+
+
+def _initial_state(Y: np.ndarray, m: int, trend: bool):
+    """Level/trend/mùa vụ ban đầu từ 1–2 chu kỳ đầu (hoặc vài điểm đầu nếu không mùa vụ)."""
+    n, T = Y.shape
+    if m:
+        first = np.nanmean(Y[:, :m], axis=1)
+        level = first
+        slope = (np.nanmean(Y[:, m:2 * m], axis=1) - first) / m if trend and T >= 2 * m else np.zeros(n)
+        season = Y[:, :m] - first[:, None]
+    else:
+        level = Y[:, 0].copy()
+        slope = (Y[:, 1] - Y[:, 0]) if trend and T > 1 else np.zeros(n)
+        season = np.zeros((n, 1))
+    season = np.nan_to_num(season)
+    return np.nan_to_num(level), np.nan_to_num(slope), season
+
+
+def _smooth(Y: np.ndarray, alpha: np.ndarray, beta: np.ndarray, gamma: np.ndarray,
+            m: int, trend: bool):
+    """
+    Chạy bộ lọc cho mọi chuỗi × bộ tham số.
+
+    alpha/beta/gamma: shape (n, G) hoặc (1, G). Trả về SSE (n, G) và trạng
+    thái cuối (level (n, G), trend (n, G), season (n, G, m)).
+    NaN trong Y coi là thiếu: trạng thái chỉ trôi theo dự báo.
+    """
+    n, T = Y.shape
+    G = alpha.shape[1]
+    level0, slope0, season0 = _initial_state(Y, m, trend)
+    level = np.repeat(level0[:, None], G, axis=1)
+    slope = np.repeat(slope0[:, None], G, axis=1)
+    width = max(m, 1)
+    season = np.repeat(season0[:, None, :], G, axis=1)
+    sse = np.zeros((n, G))
+
+    for t in range(T):
+        idx = t % width
+        s = season[:, :, idx]
+        yhat = level + slope + s
+        y = Y[:, t][:, None]
+        missing = np.isnan(y)
+        y = np.where(missing, yhat, y)
+        err = y - yhat
+        sse += err * err
+
+        new_level = alpha * (y - s) + (1 - alpha) * (level + slope)
+        if trend:
+            slope = beta * (new_level - level) + (1 - beta) * slope
+        if m:
+            season[:, :, idx] = gamma * (y - new_level) + (1 - gamma) * s
+        level = new_level
+    return sse, level, slope, season
+
+
+class HoltWinters:
+    """
+    Holt-Winters cộng tính cho mảng chuỗi (n_series, T).
+
+    seasonal_periods : m (0 = không mùa vụ; chuỗi ngắn hơn 2m cũng bỏ mùa vụ)
+    trend            : có thành phần xu hướng hay không
+    grid             : số giá trị mỗi tham số trong lưới thô
+    refine           : số vòng lưới mịn quanh nghiệm của từng chuỗi
+    chunk_rows       : số chuỗi xử lý mỗi lượt (giới hạn bộ nhớ n × G × m)
+
+        hw = HoltWinters(seasonal_periods=12).fit(Y)
+        pred = hw.forecast(6)          # (n_series, 6)
+    """
+
+    def __init__(self, seasonal_periods: int = 12, trend: bool = True, grid: int = 5,
+                 refine: int = 2, chunk_rows: int = 2000):
+        self.seasonal_periods = seasonal_periods
+        self.trend = trend
+        self.grid = grid
+        self.refine = refine
+        self.chunk_rows = chunk_rows
+
+    def _coarse_grid(self, m: int) -> np.ndarray:
+        values = np.linspace(0.05, 0.95, self.grid)
+        betas = values if self.trend else [0.0]
+        gammas = values if m else [0.0]
+        return np.array(list(itertools.product(values, betas, gammas)))  # (G, 3)
+
+    def _fit_chunk(self, Y: np.ndarray, m: int):
+        grid = self._coarse_grid(m)
+        params = np.broadcast_to(grid[None], (Y.shape[0],) + grid.shape)  # (n, G, 3)
+        sse = _smooth(Y, params[..., 0], params[..., 1], params[..., 2], m, self.trend)[0]
+        best = params[np.arange(Y.shape[0]), np.argmin(sse, axis=1)]  # (n, 3)
+
+        # lưới mịn quanh nghiệm riêng của từng chuỗi
+        step = 0.9 / max(self.grid - 1, 1) / 2
+        offsets = np.array(list(itertools.product([-1, 0, 1], repeat=3)), dtype=np.float64)
+        active = np.array([True, self.trend, bool(m)])
+        for _ in range(self.refine):
+            cand = best[:, None, :] + offsets[None] * step * active  # (n, 27, 3)
+            cand = np.clip(cand, 0.001, 0.999) * active
+            sse = _smooth(Y, cand[..., 0], cand[..., 1], cand[..., 2], m, self.trend)[0]
+            best = cand[np.arange(Y.shape[0]), np.argmin(sse, axis=1)]
+            step /= 2
+
+        sse, level, slope, season = _smooth(
+            Y, best[:, :1], best[:, 1:2], best[:, 2:3], m, self.trend)
+        return best, sse[:, 0], level[:, 0], slope[:, 0], season[:, 0, :]
+
+    def fit(self, Y) -> "HoltWinters":
+        Y = np.atleast_2d(np.asarray(Y, dtype=np.float64))
+        n, T = Y.shape
+        m = self.seasonal_periods if self.seasonal_periods and T >= 2 * self.seasonal_periods else 0
+        self.m_ = m
+        self.n_obs_ = T
+
+        parts = [self._fit_chunk(Y[i:i + self.chunk_rows], m) for i in range(0, n, self.chunk_rows)]
+        params, sse, level, slope, season = (np.concatenate(p) for p in zip(*parts))
+        self.alpha_, self.beta_, self.gamma_ = params.T
+        self.sse_ = sse
+        self.level_, self.trend_, self.season_ = level, slope, season
+        return self
+
+    def forecast(self, horizon: int) -> np.ndarray:
+        """Dự báo (n_series, horizon) từ trạng thái cuối."""
+        h = np.arange(1, horizon + 1)
+        pred = self.level_[:, None] + h[None] * self.trend_[:, None]
+        if self.m_:
+            pred = pred + self.season_[:, (self.n_obs_ + h - 1) % self.m_]
+        return pred
+
+
+def forecast_holt_winters(series: pd.Series, horizon: int, seasonal_periods: int = None,
+                          trend: bool = True, grid: int = 5, refine: int = 2) -> pd.Series:
+    """Một chuỗi (index có freq) → Series dự báo `horizon` kỳ, cùng dạng naive_forecast."""
+    freq = series.index.freq or pd.infer_freq(series.index)
+    if seasonal_periods is None:
+        seasonal_periods = season_length(freq.name if hasattr(freq, "name") else freq)
+    model = HoltWinters(seasonal_periods, trend=trend, grid=grid, refine=refine).fit(series.to_numpy()[None])
+    idx = pd.date_range(series.index[-1], periods=horizon + 1, freq=freq)[1:]
+    return pd.Series(model.forecast(horizon)[0], index=idx)
@@ -26,10 +26,16 @@ def naive_forecast(series: pd.Series, horizon: int) -> pd.Series:
     return pd.Series([last] * horizon, index=idx)
 
 
-def train_arima(series: pd.Series, order: Tuple[int, int, int] = (1, 1, 1)) -> ARIMA:
-    """Huấn luyện mô hình ARIMA và trả về kết quả đã fit."""
-    model = ARIMA(series, order=order)
-    fitted = model.fit()
+def train_arima(series: pd.Series, order: Tuple[int, int, int] = (1, 1, 1),
+                start_params: Optional[np.ndarray] = None,
+                seasonal_order: Tuple[int, int, int, int] = (0, 0, 0, 0)) -> ARIMA:
+    """Huấn luyện mô hình ARIMA và trả về kết quả đã fit.
+
+    start_params: tham số khởi tạo (vd từ lần fit trước) để hội tụ nhanh hơn.
+    seasonal_order: (P, D, Q, s), vd từ arima_search.select_order.
+    """
+    model = ARIMA(series, order=order, seasonal_order=seasonal_order)
+    fitted = model.fit(start_params=start_params)
     return fitted
 
 
@@ -37,8 +43,11 @@ def forecast_arima(model: ARIMA, steps: int) -> pd.Series:
     """Sinh dự báo từ mô hình ARIMA đã được huấn luyện."""
     res = model.get_forecast(steps=steps)
     pred = res.predicted_mean
-    # đảm bảo tần số giống chỉ mục huấn luyện
-    return pd.Series(pred, index=pd.date_range(model.data.endog.index[-1], periods=steps + 1, freq=model.data.endog.index.freq or "MS")[1:])
+    if isinstance(pred.index, pd.DatetimeIndex):
+        return pred
+    # đảm bảo tần số giống chỉ mục huấn luyện (data.endog là ndarray, index ở row_labels)
+    index = model.data.row_labels
+    return pd.Series(np.asarray(pred), index=pd.date_range(index[-1], periods=steps + 1, freq=index.freq or "MS")[1:])
 
 
 def train_prophet(df: pd.DataFrame, date_col: str = "ds", value_col: str = "y") -> Any:
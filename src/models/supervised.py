@@ -1,6 +1,7 @@
 from __future__ import annotations
 
 import logging
+import time
 from typing import Any, Dict, List, Optional, Tuple
 
 import numpy as np
@@ -18,6 +19,8 @@ except ImportError:
     _HAS_XGB = False
 
 import joblib
+from joblib import Parallel, delayed, effective_n_jobs
+from threadpoolctl import threadpool_limits
 
 logger = logging.getLogger(__name__)
 
@@ -26,12 +29,29 @@ logger = logging.getLogger(__name__)
 # CLASSIFIERS
 # ================================
 
-def _get_classifiers(random_state: int = 42) -> Dict[str, Any]:
-    """Trả về dict chứa các model classification."""
-    
+# trọng số chia ngân sách CPU (model dạng cây song song tốt theo số luồng)
+_CPU_WEIGHTS = {"logistic": 1, "random_forest": 3, "xgboost": 3}
+
+
+def _get_classifiers(
+    random_state: int = 42,
+    threads: Optional[Dict[str, int]] = None,
+    params: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, Any]:
+    """Trả về dict chứa các model classification.
+
+    threads: số luồng cho từng model (RF/XGBoost n_jobs); None → mặc định.
+    params: siêu tham số theo model (vd từ tuning.tune_models) ghi đè mặc định.
+    """
+
+    threads = threads or {}
+
     classifiers: Dict[str, Any] = {
         "logistic": LogisticRegression(max_iter=1000, random_state=random_state),
-        "random_forest": RandomForestClassifier(random_state=random_state),
+        "random_forest": RandomForestClassifier(
+            random_state=random_state,
+            n_jobs=threads.get("random_forest"),
+        ),
     }
 
     if _HAS_XGB:
@@ -39,11 +59,39 @@ def _get_classifiers(random_state: int = 42) -> Dict[str, Any]:
             use_label_encoder=False,
             eval_metric="logloss",
             random_state=random_state,
+            n_jobs=threads.get("xgboost"),
         )
 
+    for name, values in (params or {}).items():
+        if name in classifiers:
+            classifiers[name].set_params(**values)
+
     return classifiers
 
 
+def split_cpu_budget(algorithms: List[str], n_jobs: int = -1) -> Tuple[int, Dict[str, int]]:
+    """
+    Chia `n_jobs` CPU cho các model chạy đồng thời.
+
+    Returns: (số process song song, {model: số luồng}) – mỗi model ít nhất
+    1 luồng; phần dư chia theo _CPU_WEIGHTS. Ít CPU hơn số model → chạy
+    tối đa `budget` model cùng lúc, mỗi model 1 luồng.
+    """
+
+    budget = effective_n_jobs(n_jobs)
+    n_workers = max(1, min(budget, len(algorithms)))
+    if n_workers < len(algorithms) or n_workers == 1:
+        # chạy theo lượt: model nào chạy cũng có trọn phần CPU của một worker
+        per_model = max(1, budget // n_workers)
+        return n_workers, {name: per_model for name in algorithms}
+
+    weights = np.array([_CPU_WEIGHTS.get(name, 1) for name in algorithms], dtype=float)
+    threads = np.maximum(1, np.floor(budget * weights / weights.sum())).astype(int)
+    # luồng còn thừa do làm tròn → model nặng nhất
+    threads[np.argmax(weights)] += max(0, budget - threads.sum())
+    return n_workers, dict(zip(algorithms, threads.tolist()))
+
+
 # ================================
 # FEATURE PREPARATION
 # ================================
@@ -97,37 +145,70 @@ def split_data(
 # TRAIN MODELS
 # ================================
 
+def _fit_timed(name: str, model: Any, X_train, y_train, threads: int) -> Tuple[str, Any, dict]:
+    """Fit một model (trong worker); giới hạn luồng BLAS/OpenMP, đo wall + CPU."""
+
+    logger.info("Training model: %s (%d luồng)", name, threads)
+
+    wall, cpu = time.perf_counter(), time.process_time()
+    with threadpool_limits(limits=threads):
+        model.fit(X_train, y_train)
+
+    return name, model, {
+        "threads": threads,
+        "wall_seconds": round(time.perf_counter() - wall, 3),
+        "cpu_seconds": round(time.process_time() - cpu, 3),
+    }
+
+
 def train_models(
     X_train: pd.DataFrame,
     y_train: pd.Series,
     algorithms: Optional[List[str]] = None,
     random_state: int = 42,
-) -> Dict[str, Any]:
-
-    """Huấn luyện nhiều model classification."""
+    n_jobs: int = 1,
+    return_timings: bool = False,
+    params: Optional[Dict[str, Dict[str, Any]]] = None,
+):
+
+    """Huấn luyện nhiều model classification.
+
+    n_jobs: ngân sách CPU. 1 → tuần tự như cũ; khác 1 → các model fit đồng
+    thời trong process pool (joblib tự memory-map X_train cho các worker),
+    CPU chia theo split_cpu_budget.
+    return_timings=True → trả thêm DataFrame threads / wall_seconds /
+    cpu_seconds theo model (CPU tính trong process fit model).
+    params: siêu tham số theo model (vd cấu hình tốt nhất của tuning).
+    """
 
     if algorithms is None:
         algorithms = ["logistic", "random_forest"]
         if _HAS_XGB:
             algorithms.append("xgboost")
 
-    classifiers = _get_classifiers(random_state)
-
-    trained: Dict[str, Any] = {}
-
+    available = _get_classifiers(random_state)
     for name in algorithms:
-
-        if name not in classifiers:
+        if name not in available:
             logger.warning("Thuật toán %s không khả dụng.", name)
-            continue
+    algorithms = [name for name in algorithms if name in available]
 
-        model = classifiers[name]
+    n_workers, threads = split_cpu_budget(algorithms, n_jobs)
+    classifiers = _get_classifiers(random_state, threads, params)
 
-        logger.info("Training model: %s", name)
+    tasks = [(name, classifiers[name], X_train, y_train, threads[name]) for name in algorithms]
+    if n_workers == 1:
+        results = [_fit_timed(*task) for task in tasks]
+    else:
+        results = Parallel(n_jobs=n_workers, backend="loky", max_nbytes="1M")(
+            delayed(_fit_timed)(*task) for task in tasks
+        )
 
-        model.fit(X_train, y_train)
+    trained: Dict[str, Any] = {name: model for name, model, _ in results}
 
-        trained[name] = model
+    if return_timings:
+        timings = pd.DataFrame.from_dict({name: t for name, _, t in results}, orient="index")
+        timings.index.name = "model"
+        return trained, timings
 
     return trained
 
@@ -192,7 +273,9 @@ def feature_importance(
 
     elif hasattr(model, "coef_"):
 
-        vals = model.coef_.ravel()
+        coef = np.atleast_2d(model.coef_)
+        # đa lớp: (n_classes, n_features) → trung bình |coef| theo lớp
+        vals = coef.ravel() if coef.shape[0] == 1 else np.abs(coef).mean(axis=0)
 
     else:
 
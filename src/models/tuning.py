@@ -0,0 +1,264 @@
+"""
+Tìm siêu tham số bằng successive halving cho các model phân loại
+================================================================
+Mỗi thuật toán: lấy ngẫu nhiên `n_candidates` cấu hình từ không gian tìm
+kiếm (modeling.search.spaces), đánh giá tất cả ở ngân sách nhỏ, giữ lại
+1/factor tốt nhất, tăng ngân sách gấp `factor` lần, lặp tới ngân sách tối đa.
+
+Ngân sách (resource) theo thuật toán:
+- n_samples    : số dòng train (tập con phân tầng lồng nhau giữa các vòng)
+- n_estimators : số cây (random_forest / xgboost)
+
+Các trial trong một vòng chạy song song (joblib/loky, mỗi trial 1 luồng).
+Trial đã xong được lưu JSON theo hash(thuật toán, tham số, ngân sách, dữ
+liệu, cv, scoring) → chạy lại chỉ tính các trial còn thiếu.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import os
+import time
+from typing import Any, Dict, List, Tuple
+
+import numpy as np
+import pandas as pd
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.model_selection import StratifiedKFold, cross_val_score
+
+from src.models.supervised import _get_classifiers
+
+RESOURCES = ("n_samples", "n_estimators")
+
+
+# ================================
+# SEARCH SPACE
+# ================================
+
+def sample_params(space: Dict[str, Any], rng: np.random.Generator) -> Dict[str, Any]:
+    """
+    Một cấu hình ngẫu nhiên từ không gian:
+    - list                                  → chọn một phần tử
+    - {type: uniform|loguniform, low, high} → số thực
+    - {type: int, low, high}                → số nguyên trong [low, high]
+    """
+    params = {}
+    for name, spec in space.items():
+        if isinstance(spec, list):
+            params[name] = spec[rng.integers(len(spec))]
+        elif spec.get("type") == "loguniform":
+            params[name] = float(np.exp(rng.uniform(np.log(spec["low"]), np.log(spec["high"]))))
+        elif spec.get("type") == "uniform":
+            params[name] = float(rng.uniform(spec["low"], spec["high"]))
+        elif spec.get("type") == "int":
+            params[name] = int(rng.integers(spec["low"], spec["high"] + 1))
+        else:
+            raise ValueError(f"Không hiểu không gian tham số {name}: {spec}")
+    return params
+
+
+def rung_resources(min_resource: int, max_resource: int, n_candidates: int,
+                   factor: int) -> List[int]:
+    """Ngân sách từng vòng: max_resource / factor^k, không nhỏ hơn min_resource."""
+    n_rungs = 1 + int(math.floor(math.log(max(n_candidates, 1), factor)))
+    n_rungs = min(n_rungs, 1 + int(math.floor(math.log(max_resource / min_resource, factor))))
+    return [int(max_resource / factor ** (n_rungs - 1 - i)) for i in range(max(n_rungs, 1))]
+
+
+# ================================
+# TRIAL CACHE
+# ================================
+
+def data_fingerprint(X: pd.DataFrame, y: pd.Series) -> str:
+    h = hashlib.sha256(pd.util.hash_pandas_object(X, index=False).to_numpy().tobytes())
+    h.update(pd.util.hash_pandas_object(pd.Series(np.asarray(y)), index=False).to_numpy().tobytes())
+    return h.hexdigest()
+
+
+def trial_key(name: str, params: dict, resource: int, fingerprint: str, cv: int,
+              scoring: str, random_state: int) -> str:
+    payload = [name, params, resource, fingerprint, cv, scoring, random_state]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def load_trials(path: str) -> dict:
+    if path and os.path.exists(path):
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return {}
+
+
+def save_trials(trials: dict, path: str) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(trials, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+# ================================
+# TRIAL
+# ================================
+
+def _run_trial(estimator: Any, params: dict, resource_name: str, resource: int,
+               X, y, order: np.ndarray, cv: int, scoring: str, random_state: int) -> dict:
+    """Worker: cross-validation một cấu hình ở một mức ngân sách."""
+    start = time.perf_counter()
+    model = clone(estimator).set_params(**params)
+    if resource_name == "n_estimators":
+        model.set_params(n_estimators=resource)
+    else:
+        # tập con lồng nhau: vòng sau luôn chứa dữ liệu của vòng trước
+        X, y = X.iloc[order[:resource]], y.iloc[order[:resource]]
+    folds = StratifiedKFold(n_splits=cv, shuffle=True, random_state=random_state)
+    try:
+        scores = cross_val_score(model, X, y, cv=folds, scoring=scoring, n_jobs=1)
+        score, error = float(np.nanmean(scores)), ""
+    except Exception as e:
+        score, error = float("-inf"), f"{type(e).__name__}: {e}"
+    return {"score": score, "seconds": round(time.perf_counter() - start, 3), "error": error}
+
+
+def _stratified_order(y: pd.Series, random_state: int) -> np.ndarray:
+    """Hoán vị xen kẽ theo lớp → mọi tiền tố giữ xấp xỉ tỷ lệ lớp."""
+    rng = np.random.default_rng(random_state)
+    codes = pd.factorize(y)[0]
+    rank = np.empty(len(codes))
+    for c in np.unique(codes):
+        idx = np.flatnonzero(codes == c)
+        rng.shuffle(idx)
+        rank[idx] = (np.arange(len(idx)) + rng.random()) / len(idx)
+    return np.argsort(rank, kind="stable")
+
+
+# ================================
+# SUCCESSIVE HALVING
+# ================================
+
+def successive_halving(
+    name: str,
+    space: Dict[str, Any],
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    resource: str = "n_samples",
+    min_resource: int = None,
+    max_resource: int = None,
+    n_candidates: int = 27,
+    factor: int = 3,
+    cv: int = 3,
+    scoring: str = "accuracy",
+    random_state: int = 42,
+    n_jobs: int = -1,
+    trials: dict = None,
+    fingerprint: str = None,
+    cache_path: str = None,
+) -> Tuple[Dict[str, Any], pd.DataFrame]:
+    """
+    Successive halving cho một thuật toán.
+
+    trials     : cache {trial_key: kết quả}, cập nhật tại chỗ
+    cache_path : lưu trials sau mỗi vòng (dừng giữa chừng vẫn resume được)
+
+    Returns: (tham số tốt nhất, bảng trial: algorithm, rung, resource,
+              params, score, seconds, cached, error)
+    """
+    if resource not in RESOURCES:
+        raise ValueError(f"resource phải thuộc {RESOURCES}")
+    trials = {} if trials is None else trials
+    fingerprint = fingerprint or data_fingerprint(X_train, y_train)
+
+    if resource == "n_samples":
+        max_resource = max_resource or len(X_train)
+        min_resource = min_resource or max(cv * 20, len(X_train) // 10)
+    else:
+        max_resource = max_resource or 300
+        min_resource = min_resource or 10
+    resources = rung_resources(min_resource, max_resource, n_candidates, factor)
+
+    estimator = _get_classifiers(random_state, threads={name: 1})[name]
+    rng = np.random.default_rng(random_state)
+    candidates = list({json.dumps(p, sort_keys=True, default=str): p
+                       for p in (sample_params(space, rng) for _ in range(n_candidates))}.values())
+    order = _stratified_order(y_train, random_state)
+
+    rows = []
+    with Parallel(n_jobs=n_jobs, backend="loky", max_nbytes="1M") as parallel:
+        for rung, r in enumerate(resources):
+            keys = [trial_key(name, p, r, fingerprint, cv, scoring, random_state) for p in candidates]
+            todo = [i for i, k in enumerate(keys) if k not in trials]
+            results = parallel(
+                delayed(_run_trial)(estimator, candidates[i], resource, r, X_train, y_train,
+                                    order, cv, scoring, random_state)
+                for i in todo
+            )
+            for i, res in zip(todo, results):
+                trials[keys[i]] = res
+            if cache_path and todo:
+                save_trials(trials, cache_path)
+
+            scores = []
+            for i, (p, k) in enumerate(zip(candidates, keys)):
+                res = trials[k]
+                scores.append(res["score"])
+                rows.append({"algorithm": name, "rung": rung, "resource": r,
+                             "params": json.dumps(p, sort_keys=True, default=str),
+                             "score": res["score"], "seconds": res["seconds"],
+                             "cached": i not in todo, "error": res["error"]})
+
+            if rung < len(resources) - 1:
+                keep = max(1, int(math.ceil(len(candidates) / factor)))
+                best_idx = np.argsort(scores, kind="stable")[::-1][:keep]
+                candidates = [candidates[i] for i in best_idx]
+
+    best = candidates[int(np.argmax(scores))]
+    if resource == "n_estimators":
+        best = {**best, "n_estimators": resources[-1]}
+    return best, pd.DataFrame(rows)
+
+
+def tune_models(
+    X_train: pd.DataFrame,
+    y_train: pd.Series,
+    algorithms: List[str],
+    spaces: Dict[str, Dict[str, Any]],
+    cache_path: str = None,
+    **kwargs,
+) -> Tuple[Dict[str, Dict[str, Any]], pd.DataFrame]:
+    """
+    Successive halving cho từng thuật toán có không gian trong `spaces`.
+
+    spaces[name] = {"resource": ..., "min_resource": ..., "max_resource": ...,
+                    "params": {tham số: danh sách | phân phối}}
+    kwargs: n_candidates, factor, cv, scoring, random_state, n_jobs
+
+    Returns: ({thuật toán: tham số tốt nhất}, bảng mọi trial)
+    """
+    trials = load_trials(cache_path)
+    fingerprint = data_fingerprint(X_train, y_train)
+    available = _get_classifiers(kwargs.get("random_state", 42))
+
+    best_params, tables = {}, []
+    for name in algorithms:
+        spec = spaces.get(name)
+        if not spec or name not in available:
+            continue
+        best, table = successive_halving(
+            name,
+            spec.get("params", {}),
+            X_train,
+            y_train,
+            resource=spec.get("resource", "n_samples"),
+            min_resource=spec.get("min_resource"),
+            max_resource=spec.get("max_resource"),
+            trials=trials,
+            fingerprint=fingerprint,
+            cache_path=cache_path,
+            **kwargs,
+        )
+        best_params[name] = best
+        tables.append(table)
+
+    return best_params, pd.concat(tables, ignore_index=True) if tables else pd.DataFrame()
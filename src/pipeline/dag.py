@@ -0,0 +1,310 @@
+"""
+Pipeline DAG – chạy các script theo phụ thuộc, bỏ qua stage đã cập nhật
+=======================================================================
+Mỗi stage khai báo script, file input/output và các section params.yaml nó
+đọc. Khoá cache của stage = hash(nội dung script + cây src/ mà script import
++ nội dung input + các section config); nếu khoá trùng lần chạy trước và
+output còn đủ → bỏ qua. Input/output có thể là thư mục (vd rfm.state_dir).
+Các nhánh độc lập (association, clustering → modeling, forecasting) chạy
+song song trong thread pool (mỗi stage là một subprocess).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import List, NamedTuple
+
+# code dùng chung của mọi script → nằm trong khoá của mọi stage
+SOURCE_DIR = "src"
+
+
+class Stage(NamedTuple):
+    """
+    name        : tên stage
+    script      : đường dẫn script (tương đối ROOT)
+    inputs      : file / thư mục input (tương đối ROOT)
+    outputs     : file / thư mục output, gồm cả state/cache stage ghi lại
+                  (tương đối ROOT)
+    config_keys : section params.yaml ảnh hưởng tới stage
+    """
+
+    name: str
+    script: str
+    inputs: List[str]
+    outputs: List[str]
+    config_keys: List[str]
+
+
+# ------------------------------------------------------------------
+# 1. Khai báo stage của project
+# ------------------------------------------------------------------
+def default_stages(cfg: dict) -> List[Stage]:
+    """Các stage scripts/run_*.py với đường dẫn lấy từ cfg['paths']."""
+    paths = cfg["paths"]
+    processed = paths["processed_dir"]
+    output = paths.get("output_dir", "outputs")
+    cleaned = f"{processed}/cleaned.parquet"
+    cube = [f"{processed}/ts_cube.parquet"] if cfg.get("timeseries_cube", {}).get("enabled", True) else []
+    # state RFM: pipeline đọc/dựng lại, clustering đọc (update_rfm_state.py có thể gộp delta)
+    rfm_cfg = cfg.get("rfm", {})
+    rfm_state = [rfm_cfg.get("state_dir", "data/processed/rfm_state")] if rfm_cfg.get("use_state") else []
+
+    mdl_search = cfg.get("modeling", {}).get("search", {})
+    tuning = ([mdl_search.get("cache_path", f"{output}/models/tuning_trials.json"),
+               f"{output}/tables/tuning_trials.csv"] if mdl_search.get("enabled") else [])
+
+    fc_cfg = cfg.get("forecasting", {})
+    fc_search = fc_cfg.get("order_search", {})
+    arima_orders = ([fc_search.get("cache_path", f"{output}/models/arima_orders.json")]
+                    if fc_search.get("enabled") else [])
+    backtest = ([f"{output}/tables/backtest_origins.csv", f"{output}/tables/backtest_metrics.csv"]
+                if fc_cfg.get("backtest", {}).get("enabled") else [])
+    batch = ([f"{output}/tables/batch_forecasts.csv", f"{output}/tables/batch_fits.csv"]
+             if fc_cfg.get("batch", {}).get("enabled") and cube else [])
+
+    return [
+        Stage(
+            "pipeline",
+            "scripts/run_pipeline.py",
+            [paths["raw_data"]] + rfm_state,
+            [cleaned, f"{processed}/rfm.parquet", f"{processed}/timeseries_monthly.csv"] + cube + rfm_state,
+            ["paths", "ingest", "cleaning", "schema", "streaming", "rfm", "timeseries_cube"],
+        ),
+        Stage(
+            "association",
+            "scripts/run_association.py",
+            [cleaned],
+            [f"{output}/tables/top_products.csv", f"{output}/tables/top_rules.csv",
+             f"{output}/models/rule_index.pkl"],
+            ["paths", "association", "loading"],
+        ),
+        Stage(
+            "clustering",
+            "scripts/run_clustering.py",
+            [cleaned] + rfm_state,
+            [f"{output}/tables/cluster_stats.csv", f"{processed}/cluster_input.parquet",
+             f"{output}/models/kmeans.pkl"],
+            ["paths", "seed", "clustering", "rfm", "loading"],
+        ),
+        Stage(
+            "modeling",
+            "scripts/run_modeling.py",
+            [f"{processed}/cluster_input.parquet"],
+            [f"{output}/tables/model_metrics.csv", f"{output}/models/best_model.pkl"] + tuning,
+            ["paths", "modeling", "loading"],
+        ),
+        Stage(
+            "forecasting",
+            "scripts/run_forecasting.py",
+            [f"{processed}/timeseries_monthly.csv"] + cube,
+            [f"{output}/tables/forecast_metrics.csv"] + backtest + batch + arima_orders,
+            ["paths", "forecasting", "timeseries_cube"],
+        ),
+    ]
+
+
+# ------------------------------------------------------------------
+# 2. Hash
+# ------------------------------------------------------------------
+def file_hash(path: str, block: int = 1 << 20) -> str:
+    """
+    sha256 nội dung file (đọc theo khối); thư mục → hash (đường dẫn tương
+    đối + nội dung) mọi file bên trong, bỏ __pycache__; thiếu → 'missing'.
+    """
+    if not os.path.exists(path):
+        return "missing"
+    h = hashlib.sha256()
+    if os.path.isdir(path):
+        for dirpath, dirnames, filenames in os.walk(path):
+            dirnames[:] = sorted(d for d in dirnames if d != "__pycache__")
+            for name in sorted(filenames):
+                full = os.path.join(dirpath, name)
+                h.update(os.path.relpath(full, path).replace(os.sep, "/").encode())
+                h.update(file_hash(full, block).encode())
+        return h.hexdigest()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(block), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def stage_key(stage: Stage, cfg: dict, root: str) -> str:
+    """Khoá cache: script + cây src/ + input + section config (json sort_keys)."""
+    h = hashlib.sha256()
+    h.update(file_hash(os.path.join(root, stage.script)).encode())
+    h.update(file_hash(os.path.join(root, SOURCE_DIR)).encode())
+    for path in stage.inputs:
+        h.update(path.encode())
+        h.update(file_hash(os.path.join(root, path)).encode())
+    section = {key: cfg.get(key) for key in stage.config_keys}
+    h.update(json.dumps(section, sort_keys=True, default=str).encode())
+    return h.hexdigest()
+
+
+# ------------------------------------------------------------------
+# 3. Runner
+# ------------------------------------------------------------------
+class DagRunner:
+    """
+    Chạy các stage theo thứ tự phụ thuộc (stage B phụ thuộc A khi một input
+    của B là output của A).
+
+    state_file lưu khoá của lần chạy thành công gần nhất mỗi stage;
+    log của từng stage ghi vào log_dir/<stage>.log.
+    """
+
+    def __init__(self, stages: List[Stage], cfg: dict, root: str, state_file: str,
+                 log_dir: str, max_workers: int = 3):
+        self.stages = {s.name: s for s in stages}
+        self.cfg = cfg
+        self.root = root
+        self.state_file = state_file
+        self.log_dir = log_dir
+        self.max_workers = max_workers
+        self._lock = threading.Lock()
+
+        producers = {out: s.name for s in stages for out in s.outputs}
+        self.deps = {
+            s.name: sorted({producers[i] for i in s.inputs if i in producers and producers[i] != s.name})
+            for s in stages
+        }
+        self.state = self._load_state()
+
+    def _load_state(self) -> dict:
+        if os.path.exists(self.state_file):
+            with open(self.state_file, "r", encoding="utf-8") as f:
+                return json.load(f)
+        return {}
+
+    def _save_state(self) -> None:
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp = self.state_file + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.state, f, indent=2, sort_keys=True)
+        os.replace(tmp, self.state_file)
+
+    def is_up_to_date(self, name: str) -> bool:
+        stage = self.stages[name]
+        if self.state.get(name, {}).get("key") != stage_key(stage, self.cfg, self.root):
+            return False
+        return all(os.path.exists(os.path.join(self.root, out)) for out in stage.outputs)
+
+    def _selected(self, only: list = None) -> set:
+        """Stage được chọn + toàn bộ stage tổ tiên của chúng."""
+        if not only:
+            return set(self.stages)
+        unknown = set(only) - set(self.stages)
+        if unknown:
+            raise ValueError(f"Stage không tồn tại: {sorted(unknown)}")
+        selected, stack = set(), list(only)
+        while stack:
+            name = stack.pop()
+            if name not in selected:
+                selected.add(name)
+                stack.extend(self.deps[name])
+        return selected
+
+    def _run_stage(self, name: str, force: bool) -> dict:
+        stage = self.stages[name]
+        # khoá tính lúc stage sẵn sàng → input đã là output mới của upstream
+        key = stage_key(stage, self.cfg, self.root)
+        if not force and self.is_up_to_date(name):
+            return {"stage": name, "status": "skipped", "seconds": 0.0}
+
+        os.makedirs(self.log_dir, exist_ok=True)
+        log_path = os.path.join(self.log_dir, f"{name}.log")
+        start = time.perf_counter()
+        with open(log_path, "w", encoding="utf-8") as log:
+            proc = subprocess.run(
+                [sys.executable, os.path.join(self.root, stage.script)],
+                cwd=self.root,
+                stdout=log,
+                stderr=subprocess.STDOUT,
+            )
+        seconds = round(time.perf_counter() - start, 2)
+
+        missing = [o for o in stage.outputs if not os.path.exists(os.path.join(self.root, o))]
+        if proc.returncode != 0 or missing:
+            return {"stage": name, "status": "failed", "seconds": seconds, "log": log_path,
+                    "returncode": proc.returncode, "missing": missing}
+
+        if set(stage.inputs) & set(stage.outputs):
+            # stage tự ghi lại input của nó (vd state RFM) → khoá theo nội dung sau khi chạy
+            key = stage_key(stage, self.cfg, self.root)
+        with self._lock:
+            self.state[name] = {"key": key, "finished": time.strftime("%Y-%m-%d %H:%M:%S")}
+            self._save_state()
+        return {"stage": name, "status": "ran", "seconds": seconds, "log": log_path}
+
+    def plan(self, only: list = None) -> list:
+        """
+        Dry-run theo cùng quy tắc với run(): "run" = khoá/output hiện tại đã
+        cũ; "maybe" = chỉ upstream sẽ chạy lại – run() quyết định theo hash
+        input sau khi upstream xong (output upstream không đổi → bỏ qua).
+        """
+        selected = self._selected(only)
+        actions = {}
+        order = self._topological(selected)
+        for name in order:
+            if not self.is_up_to_date(name):
+                actions[name] = "run"
+            elif any(actions.get(d) in ("run", "maybe") for d in self.deps[name]):
+                actions[name] = "maybe"
+            else:
+                actions[name] = "skip"
+        return [(name, actions[name]) for name in order]
+
+    def _topological(self, selected: set) -> list:
+        order, done = [], set()
+        while len(order) < len(selected):
+            ready = [n for n in self.stages if n in selected and n not in done
+                     and all(d in done for d in self.deps[n] if d in selected)]
+            if not ready:
+                raise ValueError("DAG có chu trình")
+            order.extend(ready)
+            done.update(ready)
+        return order
+
+    def run(self, only: list = None, force: bool = False, on_event=None) -> list:
+        """
+        Chạy DAG. Stage lỗi → các stage phụ thuộc bị đánh dấu 'blocked',
+        nhánh độc lập vẫn chạy tiếp.
+        """
+        selected = self._selected(only)
+        pending = set(selected)
+        finished: dict = {}
+        results = []
+        running = {}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while pending or running:
+                for name in sorted(pending):
+                    deps = [d for d in self.deps[name] if d in selected]
+                    if any(finished.get(d) in ("failed", "blocked") for d in deps):
+                        pending.discard(name)
+                        finished[name] = "blocked"
+                        res = {"stage": name, "status": "blocked", "seconds": 0.0}
+                        results.append(res)
+                        if on_event:
+                            on_event(res)
+                    elif all(d in finished for d in deps):
+                        pending.discard(name)
+                        running[pool.submit(self._run_stage, name, force)] = name
+                if not running:
+                    continue
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for fut in done:
+                    running.pop(fut)
+                    res = fut.result()
+                    finished[res["stage"]] = res["status"]
+                    results.append(res)
+                    if on_event:
+                        on_event(res)
+        return results
@@ -0,0 +1,18 @@
+import sys
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb() -> float:
+    """
+    Peak resident set size of the current process in MB (ru_maxrss);
+    NaN where the resource module is unavailable.
+    """
+    if resource is None:
+        return float("nan")
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak / 1024 ** 2 if sys.platform == "darwin" else peak / 1024
@@ -0,0 +1,35 @@
+import signal
+import threading
+from contextlib import contextmanager
+
+
+class FitTimeout(TimeoutError):
+    """A block ran longer than its time limit."""
+
+
+@contextmanager
+def time_limit(seconds: float = None):
+    """
+    Interrupt the block after `seconds` with SIGALRM (raises FitTimeout).
+    Only works on Unix in the main thread (loky workers run tasks there);
+    elsewhere, or with seconds=None, the block runs without a limit.
+    """
+    usable = (
+        seconds
+        and hasattr(signal, "SIGALRM")
+        and threading.current_thread() is threading.main_thread()
+    )
+    if not usable:
+        yield
+        return
+
+    def _raise(signum, frame):
+        raise FitTimeout(f"quá {seconds}s")
+
+    previous = signal.signal(signal.SIGALRM, _raise)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)